@@ -0,0 +1,195 @@
+"""
+Contorno adaptativo por quadtree.
+En lugar de evaluar f(x, y) en una malla densa fija, se parte de una malla gruesa y se subdividen
+recursivamente solo las celdas cuyas esquinas quedan a ambos lados del nivel N. Así la resolución
+se concentra cerca de la curva y se necesitan muchas menos evaluaciones que con una malla densa equivalente.
+Las celdas finales se contornean con marching squares y los segmentos se encadenan en polilíneas.
+"""
+
+import numpy as np
+
+from contours import SegmentStore
+
+# Aristas de una celda como pares de esquinas, siempre de la coordenada menor a la mayor.
+# Esquinas: 0 = (x0, y0), 1 = (x1, y0), 2 = (x1, y1), 3 = (x0, y1)
+# Aristas: 0 = abajo, 1 = derecha, 2 = arriba, 3 = izquierda
+_EDGES = ((0, 1), (1, 2), (3, 2), (0, 3))
+# Las dos aristas que tocan cada esquina (para separar los puntos silla)
+_CORNER_EDGES = ((0, 3), (0, 1), (1, 2), (2, 3))
+
+
+def _straddles(values, level):
+    """Celdas con todas las esquinas finitas y el nivel entre el mínimo y el máximo."""
+    v_min = values.min(axis=1)
+    v_max = values.max(axis=1)
+    return np.isfinite(values).all(axis=1) & (v_min <= level) & (v_max >= level) & (v_min < v_max)
+
+
+class _Lattice:
+    """
+    Retícula entera de la resolución más fina. Las celdas se describen con índices enteros,
+    así un mismo punto siempre se convierte a las mismas coordenadas y da el mismo valor.
+    """
+
+    def __init__(self, func_callable, bounds, cells):
+        self.func = func_callable
+        self.x_min, x_max, self.y_min, y_max = (float(b) for b in bounds)
+        self.size = cells + 1
+        self.dx = (x_max - self.x_min) / cells
+        self.dy = (y_max - self.y_min) / cells
+        self.evaluations = 0
+
+    def coords(self, i, j):
+        return self.x_min + i * self.dx, self.y_min + j * self.dy
+
+    def evaluate(self, i, j):
+        """Evalúa f en los puntos (i, j) de la retícula, una sola vez por punto distinto."""
+        keys, inverse = np.unique(j * self.size + i, return_inverse=True)
+        x, y = self.coords(keys % self.size, keys // self.size)
+        with np.errstate(all='ignore'):
+            values = np.broadcast_to(np.asarray(self.func(x, y), dtype=float), keys.shape)
+        self.evaluations += keys.size
+        return values[inverse.ravel()]
+
+
+def _refine(lattice, i0, j0, size, values, level, max_depth, min_cell):
+    """
+    Subdivide las celdas que atraviesa el nivel hasta max_depth veces o hasta que su ancho
+    sea menor o igual que min_cell. Devuelve las celdas finales (i0, j0, tamaño, valores de esquinas).
+    """
+    for _ in range(max_depth):
+        if size < 2 or size * lattice.dx <= min_cell or i0.size == 0:
+            break
+        h = size // 2
+        # Centro y puntos medios de las aristas: abajo, derecha, arriba, izquierda
+        new_i = np.concatenate([i0 + h, i0 + h, i0 + size, i0 + h, i0])
+        new_j = np.concatenate([j0 + h, j0, j0 + h, j0 + size, j0 + h])
+        vc, vb, vr, vt, vl = lattice.evaluate(new_i, new_j).reshape(5, -1)
+        v0, v1, v2, v3 = values.T
+        i0 = np.concatenate([i0, i0 + h, i0 + h, i0])
+        j0 = np.concatenate([j0, j0, j0 + h, j0 + h])
+        values = np.concatenate([
+            np.column_stack([v0, vb, vc, vl]),
+            np.column_stack([vb, v1, vr, vc]),
+            np.column_stack([vc, vr, v2, vt]),
+            np.column_stack([vl, vc, vt, v3]),
+        ])
+        keep = _straddles(values, level)
+        i0, j0, values = i0[keep], j0[keep], values[keep]
+        size = h
+    return i0, j0, size, values
+
+
+def _march(lattice, i0, j0, size, values, level):
+    """
+    Marching squares sobre las celdas finales. Devuelve los segmentos como
+    (claves de arista A, claves de arista B, puntos A, puntos B).
+    """
+    ci = np.stack([i0, i0 + size, i0 + size, i0], axis=1)
+    cj = np.stack([j0, j0, j0 + size, j0 + size], axis=1)
+    above = values >= level
+
+    a_idx = np.array([a for a, _ in _EDGES])
+    b_idx = np.array([b for _, b in _EDGES])
+    crossing = above[:, a_idx] != above[:, b_idx]
+    va, vb = values[:, a_idx], values[:, b_idx]
+    with np.errstate(all='ignore'):
+        t = np.where(crossing, (level - va) / (vb - va), 0.0)
+    xa, ya = lattice.coords(ci[:, a_idx], cj[:, a_idx])
+    xb, yb = lattice.coords(ci[:, b_idx], cj[:, b_idx])
+    points = np.stack([xa + t * (xb - xa), ya + t * (yb - ya)], axis=-1)
+    n = lattice.size
+    edge_keys = (cj[:, a_idx] * n + ci[:, a_idx]) * n * n + (cj[:, b_idx] * n + ci[:, b_idx])
+
+    # Celdas con dos cruces: un segmento entre las dos aristas cruzadas
+    count = crossing.sum(axis=1)
+    simple = np.flatnonzero(count == 2)
+    order = np.argsort(~crossing[simple], axis=1, kind='stable')
+    pairs = [(simple, order[:, 0], order[:, 1])]
+
+    # Puntos silla: se aíslan las esquinas del lado opuesto al valor del centro
+    saddle = np.flatnonzero(count == 4)
+    if saddle.size:
+        center_above = values[saddle].mean(axis=1) >= level
+        isolated = above[saddle] != center_above[:, None]
+        for corner, (e1, e2) in enumerate(_CORNER_EDGES):
+            rows = saddle[isolated[:, corner]]
+            pairs.append((rows, np.full(rows.size, e1), np.full(rows.size, e2)))
+
+    rows = np.concatenate([p[0] for p in pairs])
+    ea = np.concatenate([p[1] for p in pairs])
+    eb = np.concatenate([p[2] for p in pairs])
+    return edge_keys[rows, ea], edge_keys[rows, eb], points[rows, ea], points[rows, eb]
+
+
+def _chain(keys_a, keys_b, points_a, points_b):
+    """
+    Une los segmentos que comparten arista en polilíneas continuas.
+    Los segmentos vecinos calculan el cruce de una arista común con los mismos datos,
+    así que sus extremos coinciden exactamente.
+    """
+    ends = {}
+    for s, (ka, kb) in enumerate(zip(keys_a.tolist(), keys_b.tolist())):
+        ends.setdefault(ka, []).append(s)
+        ends.setdefault(kb, []).append(s)
+    used = np.zeros(len(keys_a), dtype=bool)
+    key_of = (keys_a.tolist(), keys_b.tolist())
+    point_of = (points_a, points_b)
+
+    def walk(s, side):
+        """Avanza desde el extremo 'side' del segmento s; devuelve los puntos recorridos."""
+        path = []
+        key = key_of[side][s]
+        while True:
+            following = [c for c in ends[key] if not used[c]]
+            if not following:
+                return path
+            c = following[0]
+            used[c] = True
+            side = 1 if key_of[0][c] == key else 0
+            path.append(point_of[side][c])
+            key = key_of[side][c]
+
+    lines = []
+    for s in range(len(keys_a)):
+        if used[s]:
+            continue
+        used[s] = True
+        forward = walk(s, 1)
+        backward = walk(s, 0)
+        line = backward[::-1] + [points_a[s], points_b[s]] + forward
+        lines.append(np.asarray(line))
+    return lines
+
+
+def adaptive_contours(func_callable, bounds, levels, coarse=128, max_depth=3, min_cell=0.0):
+    """
+    Calcula las curvas de nivel con refinamiento adaptativo por quadtree.
+
+    Args:
+        func_callable (callable): Función matemática f(x, y) ya parseada (acepta arreglos 1D).
+        bounds (tuple): (x_min, x_max, y_min, y_max).
+        levels (iterable): Niveles a extraer.
+        coarse (int): Celdas por eje de la malla inicial.
+        max_depth (int): Máximo de subdivisiones de cada celda.
+        min_cell (float): Ancho mínimo de celda; las celdas más chicas no se subdividen.
+
+    Returns:
+        tuple: (SegmentStore con las polilíneas por nivel, cantidad de evaluaciones de f).
+    """
+    scale = 2 ** max_depth
+    lattice = _Lattice(func_callable, bounds, coarse * scale)
+    ii, jj = np.meshgrid(np.arange(coarse + 1) * scale, np.arange(coarse + 1) * scale)
+    grid = lattice.evaluate(ii.ravel(), jj.ravel()).reshape(ii.shape)
+    i0 = ii[:-1, :-1].ravel()
+    j0 = jj[:-1, :-1].ravel()
+    corners = np.column_stack([grid[:-1, :-1].ravel(), grid[:-1, 1:].ravel(),
+                               grid[1:, 1:].ravel(), grid[1:, :-1].ravel()])
+
+    lines_by_level = []
+    for level in levels:
+        keep = _straddles(corners, level)
+        cells = _refine(lattice, i0[keep], j0[keep], scale, corners[keep], level, max_depth, min_cell)
+        segments = _march(lattice, *cells, level)
+        lines_by_level.append((level, _chain(*segments) if segments[0].size else []))
+    return SegmentStore.from_lines(lines_by_level), lattice.evaluations
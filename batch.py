@@ -0,0 +1,232 @@
+"""
+Renderizado por lotes sin interfaz gráfica.
+Genera figuras de curvas de nivel (PNG, SVG, PDF o GIF animado) a partir de una lista de trabajos, repartiéndolos
+entre varios procesos. Usa el mismo parser y la misma etapa de contorno que la aplicación, con el backend
+Agg de Matplotlib: no importa PyQt5, así que funciona en servidores sin pantalla.
+
+Ejemplos:
+    python batch.py --expr "x**2 + y**2" --expr "sin(x*y)" --levels 1,4,9 --format svg --out-dir figuras
+    python batch.py --jobs trabajos.json --processes 8
+
+Formato del archivo de trabajos (JSON, una lista de objetos):
+    [{"expression": "x**2 + y**2", "levels": [1, 4, 9], "bounds": [-5, 5, -5, 5],
+      "resolution": 400, "output": "circulos.gif", "mode": "grid", "trace": true, "interval": 100,
+      "dtype": "float32"}]
+
+Las mallas grandes (por ejemplo 8000² o más) se evalúan y contornean por franjas de filas que respetan --tile-mb,
+sin tener nunca el campo completo en memoria.
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import re
+import sys
+
+import matplotlib
+import numpy as np
+matplotlib.use('Agg')
+from matplotlib.collections import LineCollection
+
+from contouring import contour_field
+from disk_cache import DiskCache
+from exporter import AnimationSpec, export_animation
+from field_cache import FieldCache, resolve_workers
+from function_parse import parse_function
+from rendering import new_figure
+from vector_export import FORMATS as VECTOR_FORMATS, export_curves
+
+FORMATS = ('png', 'svg', 'pdf', 'gif')
+DEFAULT_BOUNDS = (-10.0, 10.0, -10.0, 10.0)
+DEFAULT_RESOLUTION = 400
+DTYPES = {'float64': np.float64, 'float32': np.float32}
+
+# Caché de campos propia de cada proceso del pool
+_field_cache = FieldCache()
+
+
+def contour_job(func_callable, bounds, levels, resolution, mode='grid', dtype=np.float64, gradient='symbolic',
+                tile_bytes=None, workers=None):
+    """
+    Calcula las polilíneas de los niveles con la misma etapa que la aplicación (contouring.contour_field), así
+    que la geometría y las entradas de la caché en disco coinciden con las de CurvePlotter.
+    En modo 'continuation' resolution es la malla de semillas y gradient elige la derivada ('symbolic' o 'fd');
+    el modo 'adaptive' usa el quadtree de la aplicación. Si el campo no cabe en tile_bytes se contornea por
+    franjas. Con caché en disco (--cache-dir) la geometría y el campo se reutilizan entre ejecuciones.
+
+    Args:
+        tile_bytes (int): Memoria de trabajo por franja del trabajo; None usa la de la caché del proceso.
+        workers (int): Hilos para evaluar el campo; None usa los de la caché del proceso.
+
+    Returns:
+        SegmentStore: Polilíneas por nivel.
+    """
+    return contour_field(func_callable, bounds, levels, _field_cache, mode=mode, resolution=resolution, dtype=dtype,
+                         continuation_seeds=resolution, gradient=gradient, tile_bytes=tile_bytes, workers=workers)
+
+
+def render_job(job):
+    """
+    Ejecuta un trabajo: parsea la expresión, contornea los niveles y guarda la figura.
+    Los PNG, SVG y PDF muestran todos los niveles juntos; el GIF muestra un nivel por frame. Los SVG y PDF se
+    escriben con las polilíneas unidas y simplificadas (ver vector_export).
+
+    Args:
+        job (dict): Trabajo con las claves expression, levels, bounds, resolution, output y opcionales
+            mode ('grid', 'adaptive' o 'continuation'), gradient ('symbolic' o 'fd', para 'continuation'),
+            trace (rastro en el GIF), interval (ms por frame del GIF), dtype ('float64' o 'float32'),
+            tile_mb (memoria por franja al evaluar), threads (hilos para evaluar el campo; 0 = uno por núcleo),
+            cache_dir (carpeta de la caché en disco) y tolerance (tolerancia de simplificación de SVG y PDF,
+            en unidades de x e y).
+
+    Returns:
+        tuple: (ruta de salida, mensaje de error o None).
+    """
+    output = job['output']
+    try:
+        func_callable, error_message = parse_function(job['expression'])
+        if func_callable is None:
+            return output, error_message
+        bounds = tuple(float(b) for b in job.get('bounds', DEFAULT_BOUNDS))
+        levels = [float(level) for level in job['levels']]
+        resolution = int(job.get('resolution', DEFAULT_RESOLUTION))
+        # Memoria por franja e hilos son de cada trabajo: se pasan en la llamada, sin tocar la caché del proceso
+        tile_bytes = int(float(job['tile_mb']) * 1024 * 1024) if 'tile_mb' in job else None
+        workers = resolve_workers(int(job.get('threads', 1)))
+        if job.get('cache_dir') and _field_cache.disk is None:
+            _field_cache.disk = DiskCache(job['cache_dir'])
+        store = contour_job(func_callable, bounds, levels, resolution, job.get('mode', 'grid'),
+                            DTYPES[job.get('dtype', 'float64')], job.get('gradient', 'symbolic'),
+                            tile_bytes, workers)
+        if _field_cache.disk is not None:
+            _field_cache.disk.flush()
+
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        title = f"{job['expression']}  |  N = {', '.join(f'{level:g}' for level in levels)}"
+        if store.unresolved:
+            # Continuación con zonas ambiguas (cerca de puntos críticos): se avisa en la figura y en la consola
+            title += f"  (pueden faltar ramas en {store.unresolved} zonas)"
+            print(f"AVISO {output}: pueden faltar ramas en {store.unresolved} zonas", file=sys.stderr)
+        extension = os.path.splitext(output)[1].lower()
+        if extension in VECTOR_FORMATS.values():
+            export_curves(output, bounds, [(None, store.lines(level), 'blue') for level in levels],
+                          job.get('tolerance'), title=title)
+        elif extension == '.gif':
+            # Un frame por nivel, codificado a medida que se dibuja
+            spec = AnimationSpec(bounds, lambda: levels, store.lines, job.get('trace', True), job.get('interval', 100),
+                                 title=title)
+            export_animation(spec, output, 'gif')
+        else:
+            figure, ax = new_figure(bounds)
+            segments = [line for level in levels for line in store.lines(level)]
+            ax.add_collection(LineCollection(segments, colors='blue'))
+            ax.set_title(title)
+            figure.savefig(output)
+        return output, None
+    except Exception as e:
+        return output, f"{type(e).__name__}: {e}"
+
+
+def _slug(text):
+    return re.sub(r'[^0-9A-Za-z]+', '_', text).strip('_')[:40] or 'expr'
+
+
+def jobs_from_args(args):
+    """
+    Arma la lista de trabajos combinando todas las expresiones, conjuntos de niveles, límites y resoluciones dados.
+    """
+    level_sets = args.levels or ['0']
+    bounds_list = args.bounds or [','.join(str(b) for b in DEFAULT_BOUNDS)]
+    resolutions = args.resolution or [DEFAULT_RESOLUTION]
+    jobs = []
+    combos = itertools.product(args.expr, level_sets, bounds_list, resolutions)
+    for index, (expression, level_set, bounds, resolution) in enumerate(combos):
+        name = f"{index:03d}_{_slug(expression)}.{args.format}"
+        jobs.append({
+            'expression': expression,
+            'levels': [float(v) for v in level_set.split(',')],
+            'bounds': [float(v) for v in bounds.split(',')],
+            'resolution': resolution,
+            'mode': args.mode,
+            'gradient': args.gradient,
+            'trace': not args.no_trace,
+            'dtype': args.dtype,
+            'tile_mb': args.tile_mb,
+            'threads': args.threads,
+            'tolerance': args.tolerance,
+            'output': os.path.join(args.out_dir, name),
+        })
+    return jobs
+
+
+def jobs_from_file(path, out_dir):
+    """Lee los trabajos de un archivo JSON; las rutas de salida relativas se ubican en out_dir."""
+    with open(path, encoding='utf-8') as f:
+        jobs = json.load(f)
+    for job in jobs:
+        job['output'] = os.path.join(out_dir, job['output'])
+    return jobs
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Renderiza curvas de nivel por lotes, sin interfaz gráfica.")
+    parser.add_argument('--jobs', help="Archivo JSON con la lista de trabajos.")
+    parser.add_argument('--expr', action='append', default=[], help="Función f(x, y). Se puede repetir.")
+    parser.add_argument('--levels', action='append', help="Niveles separados por comas, ej: 1,4,9. Se puede repetir.")
+    parser.add_argument('--bounds', action='append', help="Límites x_min,x_max,y_min,y_max. Se puede repetir.")
+    parser.add_argument('--resolution', action='append', type=int, help="Puntos por eje de la malla. Se puede repetir.")
+    parser.add_argument('--format', choices=FORMATS, default='png', help="Formato de salida para --expr.")
+    parser.add_argument('--mode', choices=('grid', 'adaptive', 'continuation'), default='grid',
+                        help="Modo de contorno; 'continuation' traza cada curva con vértices exactos (para publicar).")
+    parser.add_argument('--gradient', choices=('symbolic', 'fd'), default='symbolic',
+                        help="Gradiente del modo 'continuation': derivada simbólica o diferencias finitas.")
+    parser.add_argument('--dtype', choices=tuple(DTYPES), default='float64',
+                        help="Tipo de dato de la malla; float32 usa la mitad de memoria.")
+    parser.add_argument('--tile-mb', type=float, default=64, help="Memoria de trabajo por franja al evaluar (MB).")
+    parser.add_argument('--threads', type=int, default=1,
+                        help="Hilos por proceso para evaluar el campo (0 = uno por núcleo). "
+                             "Conviene combinarlo con --processes 1 en mallas grandes.")
+    parser.add_argument('--tolerance', type=float, default=None,
+                        help="Tolerancia de simplificación de SVG y PDF en unidades de x e y "
+                             "(por defecto, 1/2000 del lado mayor de la vista; 0 = sin simplificar).")
+    parser.add_argument('--cache-dir', help="Carpeta de una caché en disco de campos y curvas, reutilizada entre "
+                                           "ejecuciones (por defecto, sin caché en disco).")
+    parser.add_argument('--no-trace', action='store_true', help="Sin rastro de niveles anteriores en los GIF.")
+    parser.add_argument('--out-dir', default='.', help="Carpeta de salida.")
+    parser.add_argument('--processes', type=int, default=None, help="Procesos del pool (por defecto, uno por núcleo).")
+    return parser
+
+
+def main(argv=None):
+    """
+    Punto de entrada del modo por lotes. Devuelve 0 si todos los trabajos terminaron bien y 1 si alguno falló.
+    """
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    if not args.jobs and not args.expr:
+        parser.error("indica --jobs o al menos una --expr")
+    jobs = jobs_from_file(args.jobs, args.out_dir) if args.jobs else []
+    if args.expr:
+        jobs += jobs_from_args(args)
+    if args.cache_dir:
+        for job in jobs:
+            job.setdefault('cache_dir', args.cache_dir)
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    failures = 0
+    processes = max(1, min(args.processes or os.cpu_count() or 1, len(jobs)))
+    with multiprocessing.Pool(processes) as pool:
+        for output, error in pool.imap_unordered(render_job, jobs):
+            if error:
+                failures += 1
+                print(f"ERROR {output}: {error}", file=sys.stderr)
+            else:
+                print(f"OK    {output}")
+    print(f"{len(jobs) - failures}/{len(jobs)} figuras generadas.")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,353 @@
+"""
+Benchmarks reproducibles de cada etapa de la graficadora: parseo, evaluación del campo, extracción de contornos,
+draw_single_curve, un frame de animación, la exportación completa a GIF y el arranque de la aplicación.
+Los resultados se guardan en JSON y se pueden comparar contra una línea base para detectar regresiones.
+El arranque se compara además contra un presupuesto fijo (STARTUP_BUDGETS).
+
+Ejemplos:
+    python benchmark.py --quick --output resultados.json
+    python benchmark.py --save-baseline benchmark_baseline.json
+    python benchmark.py --baseline benchmark_baseline.json --threshold 1.25
+
+Las etapas de interfaz (draw_single_curve y frame de animación) necesitan PyQt5; sin él se omiten.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import matplotlib
+
+from contours import extract_contours, extract_contours_tiled, field_range
+from exporter import AnimationSpec, export_animation
+from field_cache import FieldCache, evaluate_grid, make_grid, resolve_workers
+from function_parse import parse_function
+
+# Expresiones representativas: polinomio, trigonométrica, logaritmo con errores de dominio y por partes
+EXPRESSIONS = {
+    'polinomio': "x**2 + y**2",
+    'trigonometrica': "sin(x)*cos(y) + sin(x*y)",
+    'logaritmo': "log(x) + log10(y)",
+    'por_partes': "max(abs(x), abs(y)) + min(x, y)",
+}
+GRID_SIZES = (100, 400, 1000, 2000, 4000)
+QUICK_SIZES = (100, 400)
+GUI_SIZES = (100, 400, 1000)  # draw_single_curve y frame de animación
+EXPORT_SIZES = (400,)        # exportación GIF completa
+BOUNDS = (-10.0, 10.0, -10.0, 10.0)
+NUM_LEVELS = 21
+# Presupuesto de arranque en segundos: importar gui y tener la ventana en pantalla no debe esperar a Matplotlib
+STARTUP_BUDGETS = {'import[gui]': 0.4, 'startup[ventana]': 0.8}
+# Se corre en un proceso nuevo por repetición (los módulos ya importados no cuentan) e imprime un JSON
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from PyQt5.QtCore import QEvent, QObject
+from PyQt5.QtWidgets import QApplication
+import gui
+imported = time.perf_counter()
+eager = sorted(name for name in ('matplotlib', 'plotter', 'exporter', 'PIL') if name in sys.modules)
+
+class FirstPaint(QObject):
+    painted = None
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and self.painted is None:
+            self.painted = time.perf_counter()
+        return False
+
+app = QApplication([])
+window = gui.MainWindow()
+first_paint = FirstPaint()
+window.installEventFilter(first_paint)
+window.show()
+while window._plotter is None:
+    app.processEvents()
+built = time.perf_counter()
+print(json.dumps({'import[gui]': imported - start, 'startup[ventana]': first_paint.painted - start,
+                  'startup[plotter]': built - start, 'eager': eager}))
+"""
+
+
+def measure(func, repeat, setup=None):
+    """
+    Ejecuta func 'repeat' veces y devuelve estadísticas en segundos. setup() corre antes de cada
+    repetición y no se mide.
+    """
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {'min': min(times), 'median': statistics.median(times), 'repeat': repeat}
+
+
+def _levels_for(Z):
+    """Niveles equiespaciados dentro del rango finito del campo (se excluyen los extremos)."""
+    z_range = field_range(Z)
+    if z_range is None:
+        return []
+    return list(np.linspace(z_range[0], z_range[1], NUM_LEVELS + 2)[1:-1])
+
+
+def bench_core(results, sizes, repeat, dtype=np.float64, threads=None):
+    """
+    Parseo, evaluación del campo y extracción de contornos (sin interfaz). Las mallas que la aplicación
+    contornea por franjas (ver FieldCache.fits) se miden también con extract_contours_tiled.
+    La evaluación se mide además en paralelo con 'threads' hilos (None = uno por núcleo), si son más de uno.
+    """
+    threads = resolve_workers(threads)
+    cache = FieldCache()
+    for name, expression in EXPRESSIONS.items():
+        results[f"parse[{name}]"] = measure(lambda: parse_function(expression), repeat * 20)
+        func, _ = parse_function(expression)
+        for size in sizes:
+            reps = max(1, repeat if size <= 1000 else repeat // 2)
+            x, y = make_grid(BOUNDS, size, dtype)
+            results[f"evaluate[{name},{size}]"] = measure(lambda: evaluate_grid(func, x, y), reps)
+            if threads > 1:
+                results[f"evaluate_threads{threads}[{name},{size}]"] = measure(
+                    lambda: evaluate_grid(func, x, y, workers=threads), reps)
+            Z = evaluate_grid(func, x, y)
+            levels = _levels_for(Z)
+            results[f"contour[{name},{size}]"] = measure(lambda: extract_contours(x, y, Z, levels), reps)
+            del Z
+            if not cache.fits(size, dtype):
+                results[f"contour_tiled[{name},{size}]"] = measure(
+                    lambda: extract_contours_tiled(func, BOUNDS, size, levels, dtype, cache.tile_bytes), reps)
+
+
+def bench_gui(results, sizes, repeat):
+    """
+    draw_single_curve (con las cachés en memoria y en disco vacías) y un frame de animación con blitting, sobre
+    un CurvePlotter real. La caché en disco va a una carpeta temporal, no a la del usuario.
+    """
+    try:
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        from PyQt5.QtWidgets import QApplication
+        app = QApplication.instance() or QApplication([])
+        from plotter import CurvePlotter
+    except ImportError as e:
+        print(f"Etapas de interfaz omitidas: {e}", file=sys.stderr)
+        return
+    with tempfile.TemporaryDirectory() as cache_dir:
+        previous = os.environ.get('GRAFICADORA_CACHE_DIR')
+        os.environ['GRAFICADORA_CACHE_DIR'] = cache_dir
+        try:
+            _bench_plotter(results, sizes, repeat, app, CurvePlotter())
+        finally:
+            if previous is None:
+                del os.environ['GRAFICADORA_CACHE_DIR']
+            else:
+                os.environ['GRAFICADORA_CACHE_DIR'] = previous
+
+
+def _bench_plotter(results, sizes, repeat, app, plotter):
+    """Mediciones de bench_gui sobre un plotter ya construido."""
+    plotter.resize(800, 600)
+    plotter.show()
+    app.processEvents()
+
+    def clear_caches():
+        plotter.field_cache.clear()
+        if plotter.field_cache.disk is not None:
+            plotter.field_cache.disk.clear()
+
+    for name, expression in EXPRESSIONS.items():
+        func, _ = parse_function(expression)
+        for size in sizes:
+            plotter.resolution = size
+            results[f"draw_single_curve[{name},{size}]"] = measure(
+                lambda: plotter.draw_single_curve(func, 1.0), repeat, setup=clear_caches)
+
+            plotter.animate_curves(func, 2.0, True, 50)
+            animation = plotter.animation
+            plan = animation.pipeline.plan()
+            # Se recorre el ciclo con el mismo paso que usa el temporizador de la animación
+            plotter.canvas.draw()
+            animation._init_draw()
+            frame_times = []
+            for frame in range(len(plan)):
+                while not animation.pipeline.ready(frame):  # geometría lista: se mide solo el dibujo
+                    time.sleep(0.001)
+                start = time.perf_counter()
+                animation._draw_next_frame(frame, blit=True)
+                frame_times.append(time.perf_counter() - start)
+            plotter.stop_animation()
+            results[f"animation_frame[{name},{size}]"] = {
+                'min': min(frame_times), 'median': statistics.median(frame_times), 'repeat': len(frame_times)}
+    plotter.shutdown()
+
+
+def bench_export(results, sizes, repeat):
+    """Exportación completa a GIF de un ciclo de niveles."""
+    for name, expression in EXPRESSIONS.items():
+        func, _ = parse_function(expression)
+        for size in sizes:
+            x, y = make_grid(BOUNDS, size)
+            X, Y = np.meshgrid(x, y)
+            Z = func(X, Y)
+            levels = _levels_for(Z)
+            store = extract_contours(x, y, Z, levels)
+            plan = levels + levels[::-1][1:]
+            spec = AnimationSpec(BOUNDS, lambda: plan, store.lines, True, 100)
+            with tempfile.TemporaryDirectory() as folder:
+                path = os.path.join(folder, 'bench.gif')
+                results[f"export_gif[{name},{size}]"] = measure(lambda: export_animation(spec, path), max(1, repeat // 2))
+
+
+def bench_startup(results, repeat):
+    """
+    Arranque en frío de la aplicación, cada repetición en un intérprete nuevo: importar gui, primer dibujo de
+    la ventana y plotter diferido ya construido, medidos desde el inicio. Devuelve los módulos pesados que gui importó de entrada (debería ser ninguno).
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    samples = {}
+    eager = []
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = dict(os.environ, QT_QPA_PLATFORM='offscreen', GRAFICADORA_CACHE_DIR=cache_dir)
+        for _ in range(repeat):
+            try:
+                completed = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT], cwd=here, env=env,
+                                           capture_output=True, text=True, check=True)
+            except subprocess.CalledProcessError as e:
+                print(f"Etapa de arranque omitida: {e.stderr.strip().splitlines()[-1:]}", file=sys.stderr)
+                return []
+            sample = json.loads(completed.stdout.strip().splitlines()[-1])
+            eager = sample.pop('eager')
+            for key, value in sample.items():
+                samples.setdefault(key, []).append(value)
+    for key, times in samples.items():
+        results[key] = {'min': min(times), 'median': statistics.median(times), 'repeat': len(times)}
+    return eager
+
+
+def check_budgets(results, eager):
+    """
+    Compara el arranque con STARTUP_BUDGETS.
+
+    Returns:
+        dict: Por cada clave, presupuesto, mediana y si se cumple; 'import[gui] perezoso' indica si gui evitó
+            importar Matplotlib y los exportadores.
+    """
+    budgets = {}
+    for key, budget in STARTUP_BUDGETS.items():
+        if key in results:
+            median = results[key]['median']
+            budgets[key] = {'budget': budget, 'median': median, 'ok': median <= budget}
+    if results.keys() & STARTUP_BUDGETS.keys():
+        budgets['import[gui] perezoso'] = {'eager': eager, 'ok': not eager}
+    return budgets
+
+
+def compare(results, baseline, threshold):
+    """
+    Compara las medianas con la línea base.
+
+    Returns:
+        list: (clave, mediana base, mediana actual, cociente) de las etapas más lentas que threshold veces la base.
+    """
+    regressions = []
+    for key, stats in results.items():
+        base = baseline.get('results', {}).get(key)
+        if base is None or base['median'] <= 0:
+            continue
+        ratio = stats['median'] / base['median']
+        if ratio > threshold:
+            regressions.append((key, base['median'], stats['median'], ratio))
+    return regressions
+
+
+def environment():
+    """Versiones y plataforma, para saber si dos resultados son comparables."""
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'matplotlib': matplotlib.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Benchmarks por etapa de la graficadora de curvas de nivel.")
+    parser.add_argument('--quick', action='store_true', help=f"Solo mallas {QUICK_SIZES}.")
+    parser.add_argument('--sizes', type=int, nargs='+', help="Tamaños de malla (puntos por eje) a medir.")
+    parser.add_argument('--stages', nargs='+', choices=('core', 'gui', 'export', 'startup'),
+                        default=['core', 'gui', 'export', 'startup'])
+    parser.add_argument('--dtype', choices=('float64', 'float32'), default='float64',
+                        help="Tipo de dato de la malla en las etapas sin interfaz.")
+    parser.add_argument('--threads', type=int, default=0,
+                        help="Hilos para medir la evaluación en paralelo (0 = uno por núcleo).")
+    parser.add_argument('--repeat', type=int, default=5, help="Repeticiones por medición.")
+    parser.add_argument('--output', default='benchmark_results.json', help="Archivo JSON de resultados.")
+    parser.add_argument('--baseline', help="Línea base JSON contra la que comparar.")
+    parser.add_argument('--save-baseline', help="Guarda los resultados también como línea base en este archivo.")
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help="Cociente actual/base a partir del cual se marca una regresión.")
+    return parser
+
+
+def main(argv=None):
+    """
+    Corre los benchmarks pedidos. Devuelve 1 si el arranque excede su presupuesto o si hubo regresiones
+    respecto de la línea base, 0 si no.
+    """
+    args = build_arg_parser().parse_args(argv)
+    sizes = args.sizes or (QUICK_SIZES if args.quick else GRID_SIZES)
+    results = {}
+    eager = []
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # log de valores negativos, etc.
+        with np.errstate(all='ignore'):
+            if 'core' in args.stages:
+                bench_core(results, sizes, args.repeat, np.dtype(args.dtype), args.threads or None)
+            if 'gui' in args.stages:
+                bench_gui(results, [s for s in sizes if s in GUI_SIZES] or sizes[:1], args.repeat)
+            if 'export' in args.stages:
+                bench_export(results, [s for s in sizes if s in EXPORT_SIZES] or sizes[:1], args.repeat)
+            if 'startup' in args.stages:
+                eager = bench_startup(results, args.repeat)
+
+    budgets = check_budgets(results, eager)
+    report = {'environment': dict(environment(), dtype=args.dtype), 'results': results, 'budgets': budgets}
+    for key, stats in results.items():
+        print(f"{key:45s} mediana {stats['median'] * 1000:10.3f} ms   mínimo {stats['min'] * 1000:10.3f} ms")
+    for key, check in budgets.items():
+        status = "OK" if check['ok'] else "EXCEDIDO"
+        if 'budget' in check:
+            print(f"PRESUPUESTO {key}: {check['median'] * 1000:.1f} ms de {check['budget'] * 1000:.0f} ms ({status})")
+        else:
+            print(f"PRESUPUESTO {key}: importados al inicio {check['eager'] or 'ninguno'} ({status})")
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    over_budget = not all(check['ok'] for check in budgets.values())
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for key, base, current, ratio in regressions:
+            print(f"REGRESIÓN {key}: {base * 1000:.3f} ms -> {current * 1000:.3f} ms (x{ratio:.2f})")
+        if regressions:
+            return 1
+        print(f"Sin regresiones respecto de {args.baseline} (umbral x{args.threshold}).")
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,452 @@
+"""
+Trazado de curvas de nivel por continuación (predictor-corrector).
+En lugar de contornear una malla, se buscan puntos semilla sobre f = N en una malla gruesa y desde cada uno
+se recorre la curva: el predictor avanza un paso sobre la tangente y el corrector (Newton a lo largo del
+gradiente) vuelve a la curva. Cada vértice queda sobre la curva con la tolerancia pedida, así que la precisión
+no depende de la resolución de una malla: sirve para exportar curvas nítidas sin evaluar mallas enormes.
+El paso se adapta a la curvatura (ángulo máximo entre tangentes sucesivas) y cada rama termina al cerrarse,
+al salir de la vista o al llegar a un punto donde el gradiente se anula.
+El gradiente sale de la derivada simbólica de la expresión (value_and_gradient de parse_function) o, para
+cualquier otra función, de diferencias centradas evaluadas en una sola llamada vectorizada.
+"""
+
+import math
+
+import numpy as np
+
+from contours import SegmentStore
+from field_cache import make_grid
+
+# Paso relativo de las diferencias centradas (~ raíz cúbica del épsilon de float64)
+FD_STEP = 6e-6
+# Distancia, en celdas de la malla de semillas, a la que una semilla se considera ya recorrida
+COVER_DISTANCE = 0.01
+# Iteraciones máximas del corrector de Newton (al avanzar sobre la curva y al llevar las semillas a ella;
+# las semillas pueden empezar lejos, por ejemplo en el centro de una celda junto a un punto de ensilladura)
+NEWTON_ITERATIONS = 6
+SEED_NEWTON_ITERATIONS = 30
+# Las celdas de la malla de semillas donde puede haber cruces que los signos de las esquinas no muestran se
+# subdividen en SEED_REFINE_FACTOR² subceldas, hasta SEED_REFINE_DEPTH veces
+SEED_REFINE_FACTOR = 4
+SEED_REFINE_DEPTH = 3
+
+
+def finite_difference_gradient(func_callable, bounds):
+    """
+    Devuelve value_and_gradient(x, y) -> (f, ∂f/∂x, ∂f/∂y) por diferencias centradas. Los cinco puntos
+    de cada consulta (el centro y sus vecinos en x e y) se evalúan en una sola llamada a la función.
+    """
+    x_min, x_max, y_min, y_max = bounds
+    hx = (x_max - x_min) * FD_STEP
+    hy = (y_max - y_min) * FD_STEP
+
+    def value_and_gradient(x, y):
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        xs = np.stack([x, x + hx, x - hx, x, x])
+        ys = np.stack([y, y, y, y + hy, y - hy])
+        values = np.broadcast_to(func_callable(xs, ys), xs.shape)
+        return values[0], (values[1] - values[2]) / (2 * hx), (values[3] - values[4]) / (2 * hy)
+
+    return value_and_gradient
+
+
+def gradient_function(func_callable, bounds, method='symbolic'):
+    """
+    Elige cómo calcular el gradiente. Con method='symbolic' se usa la derivada simbólica de la expresión si
+    la función la tiene y se puede derivar; si no (o con method='fd'), diferencias centradas.
+
+    Returns:
+        tuple: (value_and_gradient, puntos evaluados por consulta).
+    """
+    if method == 'symbolic':
+        value_and_gradient = getattr(func_callable, 'value_and_gradient', None)
+        if value_and_gradient is not None:
+            try:
+                with np.errstate(all='ignore'):
+                    value_and_gradient(0.0, 0.0)  # compila la derivada; falla si alguna operación no se deriva
+                return value_and_gradient, 1
+            except ValueError:
+                pass
+    elif method != 'fd':
+        raise ValueError(f"Método de gradiente desconocido: '{method}'. Usa 'symbolic' o 'fd'.")
+    return finite_difference_gradient(func_callable, bounds), 5
+
+
+class _Coverage:
+    """
+    Semillas agrupadas por celda de la malla de semillas. Cada curva trazada marca de una vez las semillas que
+    quedaron sobre ella, comparando cada semilla solo con los segmentos de su celda y de las ocho vecinas.
+    """
+
+    def __init__(self, seeds, x0, y0, dx, dy, nx):
+        self.x0, self.y0, self.dx, self.dy, self.nx = x0, y0, dx, dy, nx
+        self.radius = COVER_DISTANCE * min(dx, dy)
+        self.seeds = seeds
+        self.covered = np.zeros(len(seeds), dtype=bool)
+        self._seed_cells = self._cells(seeds)
+
+    def _cells(self, points):
+        i = np.floor((points[:, 0] - self.x0) / self.dx).astype(np.int64)
+        j = np.floor((points[:, 1] - self.y0) / self.dy).astype(np.int64)
+        return (j + 1) * (self.nx + 2) + (i + 1)  # se admite una celda de margen a cada lado
+
+    def add(self, line):
+        """Marca como cubiertas las semillas pendientes a menos de 'radius' de algún segmento de la polilínea."""
+        pending = np.flatnonzero(~self.covered)
+        if len(line) < 2 or not len(pending):
+            return
+        starts, ends = line[:-1], line[1:]
+        # Cada segmento se registra en las celdas de sus dos extremos (el paso nunca supera media celda)
+        cells = np.concatenate([self._cells(starts), self._cells(ends)])
+        segments = np.concatenate([np.arange(len(starts))] * 2)
+        order = np.argsort(cells, kind='stable')
+        cells, segments = cells[order], segments[order]
+        seed_cells = self._seed_cells[pending]
+        pairs_seed, pairs_segment = [], []
+        for di in (-1, 0, 1):
+            for dj in (-1, 0, 1):
+                target = seed_cells + dj * (self.nx + 2) + di
+                low = np.searchsorted(cells, target, 'left')
+                counts = np.searchsorted(cells, target, 'right') - low
+                total = int(counts.sum())
+                if not total:
+                    continue
+                offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+                pairs_seed.append(np.repeat(pending, counts))
+                pairs_segment.append(segments[np.repeat(low, counts) + offsets])
+        if not pairs_seed:
+            return
+        seed_index = np.concatenate(pairs_seed)
+        segment_index = np.concatenate(pairs_segment)
+        distance = _segment_distance(self.seeds[seed_index], starts[segment_index], ends[segment_index])
+        self.covered[seed_index[distance < self.radius]] = True
+
+
+def _segment_distance(points, starts, ends):
+    """Distancia de cada punto a su segmento (inicio, final)."""
+    direction = ends - starts
+    length2 = np.einsum('ij,ij->i', direction, direction)
+    with np.errstate(all='ignore'):
+        s = np.clip(np.einsum('ij,ij->i', points - starts, direction) / length2, 0.0, 1.0)
+    s = np.where(length2 > 0, s, 0.0)
+    closest = starts + s[:, None] * direction
+    return np.hypot(closest[:, 0] - points[:, 0], closest[:, 1] - points[:, 1])
+
+
+def _edges(ndim, axis):
+    """Índices (a, b) de los dos extremos de cada arista a lo largo de 'axis'."""
+    a = [slice(None)] * ndim
+    b = [slice(None)] * ndim
+    a[axis], b[axis] = slice(None, -1), slice(1, None)
+    return tuple(a), tuple(b)
+
+
+def _edge_crossings(X, Y, D):
+    """
+    Cruces de D = 0 sobre las aristas de una o varias mallas (..., filas, columnas), interpolados linealmente.
+    X e Y tienen la forma de D. Devuelve (k, 2).
+    """
+    finite = np.isfinite(D)
+    above = D >= 0
+    points = []
+    # Aristas horizontales (entre columnas vecinas) y verticales (entre filas vecinas)
+    for axis in (-1, -2):
+        a, b = _edges(D.ndim, axis)
+        crossing = (above[a] != above[b]) & finite[a] & finite[b]
+        da, db = D[a][crossing], D[b][crossing]
+        t = da / (da - db)
+        xa, ya = X[a][crossing], Y[a][crossing]
+        points.append(np.column_stack([xa + t * (X[b][crossing] - xa), ya + t * (Y[b][crossing] - ya)]))
+    return np.concatenate(points)
+
+
+def _ambiguous_cells(D, gx, gy, dx, dy):
+    """
+    Celdas (..., filas - 1, columnas - 1) cuyas esquinas pueden no mostrar todos los cruces con el nivel.
+    Una celda se descarta si desde alguna esquina f no alcanza a llegar al nivel dentro de ella: |D| supera
+    |∇f|·diagonal + H·diagonal²/2, con H estimada por la diferencia de gradientes entre esquinas. De las
+    restantes, son ambiguas aquellas donde f puede dar la vuelta adentro: la derivada a lo largo de alguna
+    arista cambia de signo, o las dos componentes del gradiente cambian de signo entre las esquinas.
+    Solo pueden ser ambiguas las celdas con f y el gradiente finitos en las cuatro esquinas: fuera del dominio
+    de la función (NaN o infinito) no hay curva que buscar.
+    """
+    def corners(A):
+        return A[..., :-1, :-1], A[..., :-1, 1:], A[..., 1:, :-1], A[..., 1:, 1:]
+
+    diagonal = math.hypot(dx, dy)
+    cx, cy = corners(gx), corners(gy)
+    hessian = np.maximum((np.maximum.reduce(cx) - np.minimum.reduce(cx)) / min(dx, dy),
+                         (np.maximum.reduce(cy) - np.minimum.reduce(cy)) / min(dx, dy))
+    finite = np.isfinite(D) & np.isfinite(gx) & np.isfinite(gy)
+    near = np.logical_and.reduce(corners(finite))
+    for d, g in zip(corners(D), corners(np.hypot(gx, gy))):
+        near &= np.abs(d) <= g * diagonal + 0.5 * hessian * diagonal ** 2
+    sx = [np.sign(c) for c in cx]
+    sy = [np.sign(c) for c in cy]
+    # Esquinas: 0 abajo a la izquierda, 1 abajo a la derecha, 2 arriba a la izquierda, 3 arriba a la derecha
+    turn = (sx[0] * sx[1] <= 0) | (sx[2] * sx[3] <= 0) | (sy[0] * sy[2] <= 0) | (sy[1] * sy[3] <= 0)
+    extremum = (np.maximum.reduce(sx) > np.minimum.reduce(sx)) & (np.maximum.reduce(sy) > np.minimum.reduce(sy))
+    return near & (turn | extremum)
+
+
+def _seeds(value_and_gradient, x, y, values, gx, gy, level):
+    """
+    Semillas sobre f = level: los cruces sobre las aristas de la malla de semillas y, dentro de las celdas
+    ambiguas (ver _ambiguous_cells), los de mallas cada vez más finas, hasta SEED_REFINE_DEPTH niveles.
+    Así no se pierden las ramas que entran y salen de una celda por la misma arista, ni los óvalos chicos.
+    Los centros de las celdas que siguen ambiguas en la malla más fina se agregan al final como semillas:
+    el corrector los lleva a la curva si está cerca.
+
+    Returns:
+        tuple: (semillas (k, 2), puntos evaluados al refinar, cuántas de las últimas semillas son esos centros).
+    """
+    X, Y = np.meshgrid(x, y)
+    D = values - level
+    seeds = [_edge_crossings(X, Y, D)]
+    dx, dy = x[1] - x[0], y[1] - y[0]
+    j, i = np.nonzero(_ambiguous_cells(D, gx, gy, dx, dy))
+    x0, y0 = x[i], y[j]
+    steps = np.arange(SEED_REFINE_FACTOR + 1)
+    queries = 0
+    for _ in range(SEED_REFINE_DEPTH):
+        if not len(x0):
+            break
+        dx, dy = dx / SEED_REFINE_FACTOR, dy / SEED_REFINE_FACTOR
+        # Una malla (SEED_REFINE_FACTOR + 1)² por celda ambigua, todas evaluadas en una sola llamada
+        X, Y = np.broadcast_arrays(x0[:, None, None] + steps[None, None, :] * dx,
+                                   y0[:, None, None] + steps[None, :, None] * dy)
+        values, gx, gy = (np.broadcast_to(v, X.shape) for v in value_and_gradient(X, Y))
+        queries += X.size
+        D = values - level
+        seeds.append(_edge_crossings(X, Y, D))
+        cell, j, i = np.nonzero(_ambiguous_cells(D, gx, gy, dx, dy))
+        x0, y0 = X[cell, j, i], Y[cell, j, i]
+    seeds.append(np.column_stack([x0 + dx / 2, y0 + dy / 2]))
+    return np.concatenate(seeds), queries, len(x0)
+
+
+def _project(value_and_gradient, x, y, level, tolerance, iterations=NEWTON_ITERATIONS):
+    """
+    Corrector de Newton sobre arreglos de puntos: cada punto se mueve a lo largo del gradiente hasta quedar
+    sobre f = level. Solo siguen iterando los puntos que todavía no convergieron.
+
+    Returns:
+        tuple: (x, y, gx, gy, convergió, puntos evaluados), con el gradiente en el último punto evaluado.
+    """
+    x = np.array(x, dtype=float)
+    y = np.array(y, dtype=float)
+    gx = np.zeros(x.shape)
+    gy = np.zeros(x.shape)
+    converged = np.zeros(x.shape, dtype=bool)
+    active = np.arange(len(x))
+    queries = 0
+    for _ in range(iterations):
+        if not len(active):
+            break
+        value, agx, agy = (np.broadcast_to(v, active.shape) for v in value_and_gradient(x[active], y[active]))
+        queries += len(active)
+        g2 = agx * agx + agy * agy
+        with np.errstate(all='ignore'):
+            delta = np.where(g2 > 0, (value - level) / g2, np.nan)
+        x[active] -= delta * agx
+        y[active] -= delta * agy
+        gx[active], gy[active] = agx, agy
+        done = np.abs(delta) * np.sqrt(g2) < tolerance
+        converged[active[done]] = True
+        # Los que ya convergieron o se fueron a infinito o NaN dejan de iterar
+        active = active[~done & np.isfinite(x[active]) & np.isfinite(y[active])]
+    return x, y, gx, gy, converged & np.isfinite(x) & np.isfinite(y), queries
+
+
+class _Tracer:
+    """Recorre una rama de la curva f = level desde un punto semilla, con paso adaptativo."""
+
+    def __init__(self, value_and_gradient, level, bounds, max_step, max_angle, tolerance, max_points):
+        self.value_and_gradient = value_and_gradient
+        self.level = level
+        self.x_min, self.x_max, self.y_min, self.y_max = bounds
+        self.max_step = max_step
+        self.min_step = max_step * 1e-6
+        self.cos_max = math.cos(max_angle)
+        self.cos_grow = math.cos(max_angle / 2)
+        self.tolerance = tolerance
+        self.max_points = max_points
+        self.queries = 0
+
+    def _correct(self, x, y):
+        """Newton escalar: devuelve (x, y, gx, gy, iteraciones) o None si no converge."""
+        level, tolerance = self.level, self.tolerance
+        for iteration in range(1, NEWTON_ITERATIONS + 1):
+            value, gx, gy = self.value_and_gradient(x, y)
+            self.queries += 1
+            value, gx, gy = float(value), float(gx), float(gy)
+            g2 = gx * gx + gy * gy
+            if not (g2 > 0 and math.isfinite(value) and math.isfinite(g2)):
+                return None
+            delta = (value - level) / g2
+            x -= delta * gx
+            y -= delta * gy
+            if abs(delta) * math.sqrt(g2) < tolerance:
+                return x, y, gx, gy, iteration
+        return None
+
+    def _clip(self, x0, y0, x1, y1):
+        """
+        Punto donde la curva sale de la vista entre (x0, y0) y (x1, y1): se corta el segmento con el borde
+        y el corte se lleva sobre la curva con Newton a lo largo de ese borde.
+        """
+        s, axis, edge = 1.0, None, None
+        for index, (start, end, low, high) in enumerate(((x0, x1, self.x_min, self.x_max),
+                                                         (y0, y1, self.y_min, self.y_max))):
+            for bound in (low, high):
+                if (end - bound) * (start - bound) < 0 and (bound - start) / (end - start) < s:
+                    s, axis, edge = (bound - start) / (end - start), index, bound
+        x, y = x0 + s * (x1 - x0), y0 + s * (y1 - y0)
+        if axis is None:
+            return x, y
+        free = [x, y]
+        free[axis] = edge
+        for _ in range(NEWTON_ITERATIONS):
+            value, gx, gy = self.value_and_gradient(*free)
+            self.queries += 1
+            slope = float(gy if axis == 0 else gx)
+            if not (slope != 0 and math.isfinite(slope) and math.isfinite(float(value))):
+                return x, y
+            delta = (float(value) - self.level) / slope
+            free[1 - axis] -= delta
+            if abs(delta * slope) < self.tolerance * max(1.0, abs(slope)):
+                break
+        # Solo se acepta si el punto sigue cerca del corte lineal (no saltó a otra rama)
+        if math.hypot(free[0] - x, free[1] - y) <= math.hypot(x1 - x0, y1 - y0):
+            return free[0], free[1]
+        return x, y
+
+    def trace(self, x, y, gx, gy, direction):
+        """
+        Avanza desde (x, y), donde el gradiente es (gx, gy), en el sentido 'direction' (+1 o -1) de la tangente.
+
+        Returns:
+            tuple: (puntos de la rama (k, 2), True si la curva se cerró sobre el punto de partida).
+        """
+        start_x, start_y = x, y
+        norm = math.hypot(gx, gy)
+        tx, ty = -direction * gy / norm, direction * gx / norm
+        points = [(x, y)]
+        h = self.max_step / 2
+        while len(points) < self.max_points:
+            predicted_x, predicted_y = x + h * tx, y + h * ty
+            corrected = self._correct(predicted_x, predicted_y)
+            accepted = False
+            if corrected is not None:
+                nx, ny, ngx, ngy, iterations = corrected
+                norm = math.hypot(ngx, ngy)
+                ntx, nty = -ngy / norm, ngx / norm
+                cosine = ntx * tx + nty * ty
+                if cosine < 0:
+                    ntx, nty, cosine = -ntx, -nty, -cosine
+                # Se rechaza el paso si la tangente gira demasiado o si el corrector se alejó mucho
+                # del predictor (podría haber saltado a otra rama de la curva)
+                drift = math.hypot(nx - predicted_x, ny - predicted_y)
+                accepted = cosine >= self.cos_max and drift <= 0.25 * h
+            if not accepted:
+                h /= 2
+                if h < self.min_step:
+                    return np.asarray(points), False  # gradiente nulo o curva singular
+                continue
+
+            # ¿Volvió al punto de partida? (el paso pasa junto a la semilla, que queda adelante)
+            if len(points) >= 3:
+                sx, sy = nx - x, ny - y
+                length2 = sx * sx + sy * sy
+                s = ((start_x - x) * sx + (start_y - y) * sy) / length2
+                if 0 <= s <= 1 and math.hypot(x + s * sx - start_x, y + s * sy - start_y) < 0.05 * h:
+                    points.append((start_x, start_y))
+                    return np.asarray(points), True
+            if not (self.x_min <= nx <= self.x_max and self.y_min <= ny <= self.y_max):
+                points.append(self._clip(x, y, nx, ny))
+                return np.asarray(points), False
+
+            points.append((nx, ny))
+            x, y, tx, ty = nx, ny, ntx, nty
+            if cosine >= self.cos_grow and iterations <= 2:
+                h = min(h * 1.5, self.max_step)
+        return np.asarray(points), False
+
+
+def continuation_contours(func_callable, bounds, levels, seed_resolution=64, gradient='symbolic',
+                          max_step=None, max_angle=0.05, tolerance=None, max_points=200000):
+    """
+    Calcula las curvas de nivel por continuación predictor-corrector.
+
+    Args:
+        func_callable (callable): Función matemática f(x, y) ya parseada.
+        bounds (tuple): (x_min, x_max, y_min, y_max).
+        levels (iterable): Niveles a trazar.
+        seed_resolution (int): Puntos por eje de la malla donde se buscan las semillas. Donde el gradiente
+            indica que una celda puede esconder cruces, la malla se refina dentro de ella (ver _seeds).
+        gradient (str): 'symbolic' (derivada de la expresión, si se puede) o 'fd' (diferencias centradas).
+        max_step (float): Paso máximo sobre la curva; por defecto 1/200 del lado menor de la vista.
+        max_angle (float): Giro máximo de la tangente por paso, en radianes; acota el error de la cuerda.
+        tolerance (float): Distancia máxima de cada vértice a la curva; por defecto 1e-10 del tamaño de la vista.
+        max_points (int): Máximo de vértices por rama.
+
+    Returns:
+        tuple: (SegmentStore con las polilíneas por nivel, cantidad de evaluaciones de f). store.unresolved
+            cuenta las celdas que siguieron ambiguas aun en la malla de semillas más fina y cuyo centro no se
+            pudo llevar a la curva: si no es 0, puede faltar alguna rama cerca de un punto donde el gradiente
+            se anula.
+    """
+    x_min, x_max, y_min, y_max = (float(b) for b in bounds)
+    bounds = (x_min, x_max, y_min, y_max)
+    value_and_gradient, points_per_query = gradient_function(func_callable, bounds, gradient)
+    x, y = make_grid(bounds, seed_resolution)
+    with np.errstate(all='ignore'):
+        # El gradiente en la malla de semillas decide dónde refinarla; no depende del nivel
+        grid = np.broadcast_arrays(x[None, :], y[:, None])
+        values, grid_gx, grid_gy = (np.broadcast_to(v, grid[0].shape) for v in value_and_gradient(*grid))
+    evaluations = values.size * points_per_query
+    unresolved = 0
+    dx, dy = x[1] - x[0], y[1] - y[0]
+    size = max(x_max - x_min, y_max - y_min)
+    # El paso nunca supera media celda: cada segmento toca a lo sumo celdas vecinas (ver _Coverage)
+    max_step = min(max_step or min(x_max - x_min, y_max - y_min) / 200, 0.5 * min(dx, dy))
+    tolerance = tolerance or 1e-10 * size
+
+    lines_by_level = []
+    for level in levels:
+        lines = []
+        with np.errstate(all='ignore'):
+            seeds, queries, ambiguous = _seeds(value_and_gradient, x, y, values, grid_gx, grid_gy, level)
+        evaluations += queries * points_per_query
+        with np.errstate(all='ignore'):
+            sx, sy, gx, gy, ok, queries = _project(value_and_gradient, seeds[:, 0], seeds[:, 1], level, tolerance,
+                                                   SEED_NEWTON_ITERATIONS)
+        evaluations += queries * points_per_query
+        ok &= (sx >= x_min) & (sx <= x_max) & (sy >= y_min) & (sy <= y_max) & (gx * gx + gy * gy > 0)
+        # Celdas ambiguas cuyo centro el corrector no pudo llevar a la curva (gradiente casi nulo); si el
+        # corrector salió del dominio de la función (NaN o infinito) no hay rama que pueda faltar
+        centers = slice(len(ok) - ambiguous, None)
+        unresolved += int(np.count_nonzero(~ok[centers] & np.isfinite(sx[centers]) & np.isfinite(sy[centers])))
+        sx, sy, gx, gy = sx[ok], sy[ok], gx[ok], gy[ok]
+        coverage = _Coverage(np.column_stack([sx, sy]), x_min, y_min, dx, dy, seed_resolution)
+        tracer = _Tracer(value_and_gradient, level, bounds, max_step, max_angle, tolerance, max_points)
+        with np.errstate(all='ignore'):
+            for k in range(len(sx)):
+                if coverage.covered[k]:
+                    continue  # ya está sobre una curva trazada
+                seed = (float(sx[k]), float(sy[k]))
+                forward, closed = tracer.trace(*seed, float(gx[k]), float(gy[k]), 1)
+                if closed:
+                    line = forward
+                else:
+                    backward, _ = tracer.trace(*seed, float(gx[k]), float(gy[k]), -1)
+                    line = np.concatenate([backward[::-1], forward[1:]])
+                if len(line) >= 2 and np.ptp(line, axis=0).any():  # se descartan las de longitud nula
+                    lines.append(line)
+                    coverage.add(line)
+        evaluations += tracer.queries * points_per_query
+        lines_by_level.append((level, lines))
+    store = SegmentStore.from_lines(lines_by_level)
+    store.unresolved = unresolved
+    return store, evaluations
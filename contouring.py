@@ -0,0 +1,102 @@
+"""
+Etapa de contorno compartida por la aplicación (CurvePlotter) y el modo por lotes (batch.py).
+Elige el motor según el modo ('grid', 'adaptive' o 'continuation'), arma la clave de la caché en disco
+y decide cuándo contornear por franjas, así que la interfaz y batch.py obtienen la misma geometría y
+comparten las entradas de la caché. No depende de PyQt5 ni de Matplotlib.
+"""
+
+from contextlib import nullcontext
+
+import numpy as np
+
+from adaptive import adaptive_contours
+from continuation import continuation_contours
+from contours import extract_contours, extract_contours_tiled
+
+MODES = ('grid', 'adaptive', 'continuation')
+
+
+def _stage(profiler, name, **details):
+    """Etapa del profiler, o un bloque sin medir si no hay profiler."""
+    return nullcontext() if profiler is None else profiler.stage(name, **details)
+
+
+def contour_field(func_callable, bounds, levels, field_cache, mode='grid', resolution=400, dtype=np.float64,
+                  preview=False, adaptive_coarse=128, adaptive_depth=3, continuation_seeds=64,
+                  gradient='symbolic', max_angle=0.05, tile_bytes=None, workers=None, profiler=None):
+    """
+    Calcula las polilíneas de todos los niveles con el motor del modo indicado.
+    En modo 'grid' se contornea el campo de field_cache (o por franjas si el campo es demasiado grande);
+    en modo 'adaptive' se refina un quadtree solo alrededor de cada curva y en modo 'continuation' cada curva
+    se recorre desde puntos semilla con un predictor-corrector. Con preview=True se responde rápido: el
+    quadtree parte de una malla más gruesa sin subdividir, la continuación (que no tiene una versión barata)
+    se reemplaza por la malla fija y no se usa la caché en disco. Los resultados completos se guardan en
+    field_cache.disk, si la hay.
+
+    Args:
+        func_callable (callable): Función matemática f(x, y) ya parseada.
+        bounds (tuple): (x_min, x_max, y_min, y_max).
+        levels (list): Valores de N.
+        field_cache (FieldCache): Caché de campos (y, en su atributo disk, la caché en disco opcional).
+        mode (str): 'grid', 'adaptive' o 'continuation'.
+        resolution (int): Puntos por eje de la malla fija (en una vista previa, la resolución de la vista previa).
+        dtype: Tipo de dato de la malla fija.
+        preview (bool): Vista previa barata, sin caché en disco.
+        adaptive_coarse (int): Celdas por eje de la malla inicial del quadtree.
+        adaptive_depth (int): Subdivisiones máximas por celda del quadtree.
+        continuation_seeds (int): Puntos por eje de la malla de semillas de la continuación.
+        gradient (str): Gradiente de la continuación: 'symbolic' o 'fd'.
+        max_angle (float): Ángulo máximo entre pasos consecutivos de la continuación (radianes).
+        tile_bytes (int): Memoria de trabajo por franja; None usa la de field_cache.
+        workers (int): Hilos para evaluar el campo; None usa los de field_cache.
+        profiler (StageProfiler): Profiler opcional donde medir las etapas.
+
+    Returns:
+        SegmentStore: Polilíneas por nivel (solo los niveles que tienen curva).
+    """
+    if mode not in MODES:
+        raise ValueError(f"Modo de contorno desconocido: {mode!r}")
+    tile_bytes = field_cache.tile_bytes if tile_bytes is None else tile_bytes
+    workers = field_cache.workers if workers is None else workers
+    disk = None if preview else field_cache.disk
+
+    if mode == 'adaptive':
+        coarse = max(8, adaptive_coarse // 4) if preview else adaptive_coarse
+        depth = 0 if preview else adaptive_depth
+
+        def compute():
+            with _stage(profiler, 'contorno adaptativo', niveles=len(levels)):
+                store, _ = adaptive_contours(func_callable, bounds, levels, coarse=coarse, max_depth=depth)
+            return store
+
+        if disk is None:
+            return compute()
+        return disk.geometry(func_callable, bounds, coarse, np.float64, levels, compute,
+                             mode='adaptive', depth=depth)
+
+    if mode == 'continuation' and not preview:
+        def compute():
+            with _stage(profiler, 'contorno por continuación', niveles=len(levels)):
+                store, _ = continuation_contours(func_callable, bounds, levels, seed_resolution=continuation_seeds,
+                                                 gradient=gradient, max_angle=max_angle)
+            return store
+
+        if disk is None:
+            return compute()
+        return disk.geometry(func_callable, bounds, continuation_seeds, np.float64, levels, compute,
+                             mode='continuation', gradient=gradient, max_angle=max_angle)
+
+    def compute():
+        if not field_cache.fits(resolution, dtype, tile_bytes):
+            # Campo demasiado grande: se evalúa y contornea por franjas, sin guardarlo entero
+            with _stage(profiler, 'contorno por franjas', niveles=len(levels)):
+                return extract_contours_tiled(func_callable, bounds, resolution, levels, dtype, tile_bytes, workers)
+        with _stage(profiler, 'campo', resolucion=resolution):
+            x, y, Z = field_cache.field(func_callable, bounds, resolution, dtype, persist=not preview,
+                                        tile_bytes=tile_bytes, workers=workers)
+        with _stage(profiler, 'contorno', niveles=len(levels)):
+            return extract_contours(x, y, Z, levels)
+
+    if disk is None:
+        return compute()
+    return disk.geometry(func_callable, bounds, resolution, dtype, levels, compute, mode='grid')
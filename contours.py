@@ -0,0 +1,255 @@
+"""
+Extracción de curvas de nivel directamente sobre el campo evaluado, sin crear artistas de Matplotlib.
+Usa contourpy (el motor que Matplotlib usa por dentro) para obtener en una sola pasada los segmentos
+de todos los niveles pedidos, y los guarda en un almacén compacto por nivel.
+No depende de PyQt5 ni de pyplot, así que puede usarse también fuera de la interfaz gráfica.
+"""
+
+import numpy as np
+import contourpy
+
+from field_cache import DEFAULT_TILE_BYTES, evaluate_grid, make_grid, tile_rows
+
+
+def field_range(Z):
+    """
+    Devuelve el mínimo y máximo de los valores finitos del campo, o None si no hay ninguno.
+    """
+    finite = Z[np.isfinite(Z)]
+    if finite.size == 0:
+        return None
+    return float(finite.min()), float(finite.max())
+
+
+def prune_levels(Z, levels):
+    """
+    Descarta los niveles que quedan fuera del rango finito [min(Z), max(Z)]: para ellos no puede existir curva.
+
+    Args:
+        Z (np.ndarray): Campo evaluado.
+        levels (iterable): Niveles candidatos.
+
+    Returns:
+        list: Niveles que pueden tener curva, en el mismo orden.
+    """
+    z_range = field_range(Z)
+    if z_range is None:
+        return []
+    z_min, z_max = z_range
+    return [level for level in levels if z_min <= level <= z_max]
+
+
+class SegmentStore:
+    """
+    Almacén compacto de las polilíneas de varios niveles.
+    Todos los puntos viven en un único arreglo (P, 2); 'line_offsets' marca dónde empieza cada
+    polilínea y 'level_offsets' qué polilíneas corresponden a cada nivel. Los niveles sin curva no se guardan.
+    'unresolved' cuenta las zonas donde el trazado por continuación pudo dejar alguna rama sin recorrer
+    (ver continuation_contours); los otros motores siempre dejan 0.
+    """
+
+    def __init__(self, levels, points, line_offsets, level_offsets, unresolved=0):
+        self.levels = levels                # niveles con al menos una polilínea
+        self.points = points                # arreglo (P, 2) con todos los vértices
+        self.line_offsets = line_offsets    # inicio de cada polilínea en 'points' (L + 1 valores)
+        self.level_offsets = level_offsets  # inicio de las polilíneas de cada nivel (len(levels) + 1 valores)
+        self.unresolved = unresolved
+        self._index = {level: i for i, level in enumerate(levels)}
+
+    @classmethod
+    def from_lines(cls, lines_by_level):
+        """
+        Construye el almacén a partir de pares (nivel, lista de polilíneas (k, 2)).
+        Los niveles sin polilíneas se omiten.
+        """
+        levels = []
+        points = []
+        line_offsets = [0]
+        level_offsets = [0]
+        for level, lines in lines_by_level:
+            if not lines:
+                continue
+            levels.append(level)
+            for line in lines:
+                points.append(line)
+                line_offsets.append(line_offsets[-1] + len(line))
+            level_offsets.append(len(line_offsets) - 1)
+        points = np.concatenate(points) if points else np.empty((0, 2))
+        return cls(levels, points, np.asarray(line_offsets, dtype=np.intp), np.asarray(level_offsets, dtype=np.intp))
+
+    def __contains__(self, level):
+        return level in self._index
+
+    def __len__(self):
+        return len(self.levels)
+
+    def lines(self, level):
+        """
+        Devuelve las polilíneas del nivel como lista de vistas (k, 2) sobre 'points'.
+        Si el nivel no tiene curva devuelve una lista vacía.
+        """
+        i = self._index.get(level)
+        if i is None:
+            return []
+        starts = self.line_offsets[self.level_offsets[i]:self.level_offsets[i + 1] + 1]
+        return [self.points[a:b] for a, b in zip(starts[:-1], starts[1:])]
+
+
+def extract_contours(x, y, Z, levels):
+    """
+    Calcula las curvas de nivel de Z para todos los niveles en una sola pasada de contourpy.
+    Los niveles fuera del rango del campo se descartan antes de contornear.
+
+    Args:
+        x (np.ndarray): Coordenadas X de la malla (1D o 2D).
+        y (np.ndarray): Coordenadas Y de la malla (1D o 2D).
+        Z (np.ndarray): Campo evaluado; los valores no finitos se enmascaran.
+        levels (iterable): Niveles a extraer.
+
+    Returns:
+        SegmentStore: Polilíneas agrupadas por nivel.
+    """
+    levels = prune_levels(Z, levels)
+    kept_levels = []
+    points = []
+    line_offsets = [0]
+    level_offsets = [0]
+    if levels:
+        generator = contourpy.contour_generator(x, y, Z, line_type='ChunkCombinedOffset', chunk_size=0)
+        total = 0
+        for level, (chunk_points, chunk_offsets) in zip(levels, generator.multi_lines(levels)):
+            if chunk_points[0] is None:
+                continue
+            kept_levels.append(level)
+            points.append(chunk_points[0])
+            line_offsets.extend(chunk_offsets[0][1:] + total)
+            total += len(chunk_points[0])
+            level_offsets.append(len(line_offsets) - 1)
+    points = np.concatenate(points) if points else np.empty((0, 2))
+    return SegmentStore(kept_levels, points, np.asarray(line_offsets, dtype=np.intp),
+                        np.asarray(level_offsets, dtype=np.intp))
+
+
+def _stitch(lines, boundaries, tolerance):
+    """
+    Une las polilíneas cortadas por los bordes entre franjas. Dos franjas vecinas comparten la fila del borde,
+    así que el punto donde una curva cruza el borde es idéntico en ambas y sirve de clave para unirlas.
+
+    Args:
+        lines (list): Polilíneas (k, 2) de un nivel, de todas las franjas.
+        boundaries (np.ndarray): Coordenadas Y de las filas compartidas, ordenadas.
+        tolerance (float): Distancia en Y hasta la que un extremo se considera sobre el borde
+            (la interpolación de contourpy puede no devolver exactamente la Y de la fila).
+
+    Returns:
+        list: Polilíneas unidas; las curvas cerradas terminan en su punto inicial.
+    """
+    # Si la curva toca el borde justo en un vértice de la malla, la franja de ese lado devuelve un lazo de
+    # longitud nula (todos sus puntos en el vértice); no tiene geometría y no debe quedar como curva aparte
+    lines = [line for line in lines if np.ptp(line, axis=0).max() > tolerance]
+
+    def on_boundary(y_value):
+        i = np.searchsorted(boundaries, y_value)
+        return any(abs(boundaries[j] - y_value) <= tolerance for j in (i - 1, i) if 0 <= j < len(boundaries))
+
+    ends = {}  # punto del borde -> [(índice de polilínea, True si es su inicio)]
+    for i, line in enumerate(lines):
+        for at_start, point in ((True, line[0]), (False, line[-1])):
+            if on_boundary(point[1]):
+                ends.setdefault((point[0], point[1]), []).append((i, at_start))
+
+    def partner(point, used):
+        for j, at_start in ends.get((point[0], point[1]), ()):
+            if not used[j]:
+                return j, at_start
+        return None
+
+    used = [False] * len(lines)
+    stitched = []
+    for i, line in enumerate(lines):
+        if used[i]:
+            continue
+        used[i] = True
+        chain = [line]
+        # Hacia adelante desde el final y hacia atrás desde el inicio
+        for forward in (True, False):
+            while True:
+                end = chain[-1][-1] if forward else chain[0][0]
+                found = partner(end, used)
+                if found is None:
+                    break
+                j, at_start = found
+                used[j] = True
+                piece = lines[j] if at_start == forward else lines[j][::-1]
+                if forward:
+                    chain.append(piece[1:])
+                else:
+                    chain.insert(0, piece[:-1])
+        stitched.append(np.concatenate(chain) if len(chain) > 1 else line)
+    return stitched
+
+
+def extract_contours_tiled(func_callable, bounds, resolution, levels, dtype=np.float64,
+                           max_bytes=DEFAULT_TILE_BYTES, workers=1):
+    """
+    Igual que extract_contours, pero sin tener nunca el campo completo en memoria: la malla se evalúa
+    y se contornea por franjas de filas que caben en max_bytes, y las curvas se unen en los bordes.
+    Sirve para mallas muy grandes (8000² o más) cuyo campo no entra en memoria.
+
+    Args:
+        func_callable (callable): Función matemática f(x, y) ya parseada.
+        bounds (tuple): (x_min, x_max, y_min, y_max).
+        resolution (int): Cantidad de puntos por eje.
+        levels (iterable): Niveles a extraer.
+        dtype: Tipo de dato de la malla y del campo (float64 o float32).
+        max_bytes (int): Memoria de trabajo por franja.
+        workers (int): Hilos para evaluar cada franja (ver evaluate_grid).
+
+    Returns:
+        SegmentStore: Polilíneas agrupadas por nivel.
+    """
+    return _contour_tiles(func_callable, bounds, resolution, [levels], dtype, max_bytes, workers)[0]
+
+
+def extract_layer_contours_tiled(batched_callable, bounds, resolution, level_sets, dtype=np.float64,
+                                 max_bytes=DEFAULT_TILE_BYTES, workers=1):
+    """
+    extract_contours_tiled para varias funciones a la vez (una función de parse_functions): cada franja se
+    evalúa una sola vez para todas las capas, compartiendo las subexpresiones comunes, y cada capa se
+    contornea con sus propios niveles.
+
+    Args:
+        level_sets (list): Niveles de cada capa, en el orden de las expresiones.
+
+    Returns:
+        list: Un SegmentStore por capa.
+    """
+    return _contour_tiles(batched_callable, bounds, resolution, level_sets, dtype, max_bytes, workers,
+                          layers=len(level_sets))
+
+
+def _contour_tiles(func_callable, bounds, resolution, level_sets, dtype, max_bytes, workers, layers=None):
+    """Evalúa y contornea la malla por franjas; con 'layers', cada franja es una pila con un campo por capa."""
+    level_sets = [list(levels) for levels in level_sets]
+    x, y = make_grid(bounds, resolution, dtype)
+    step = tile_rows(len(x) * (layers or 1), dtype, max_bytes)  # una fila ocupa una fila de cada capa
+    lines_by_layer = [{level: [] for level in levels} for levels in level_sets]
+    boundaries = []
+    start = 0
+    while start < len(y) - 1:
+        # Cada franja comparte su última fila con la siguiente
+        stop = min(start + step, len(y))
+        tile_y = y[start:stop]
+        Z = evaluate_grid(func_callable, x, tile_y, dtype, max_bytes, workers=workers, layers=layers)
+        for field, levels, lines_by_level in zip([Z] if layers is None else Z, level_sets, lines_by_layer):
+            store = extract_contours(x, tile_y, field, levels)
+            for level in store.levels:
+                lines_by_level[level].extend(line.copy() for line in store.lines(level))
+        if stop < len(y):
+            boundaries.append(float(y[stop - 1]))
+        start = stop - 1
+    boundaries = np.asarray(boundaries)
+    tolerance = 1e-6 * abs(float(y[1] - y[0])) if len(y) > 1 else 0.0
+    return [SegmentStore.from_lines((level, _stitch(lines, boundaries, tolerance))
+                                    for level, lines in lines_by_level.items())
+            for lines_by_level in lines_by_layer]
@@ -0,0 +1,283 @@
+"""
+Caché en disco de campos evaluados y de la geometría de las curvas, compartida entre sesiones.
+Cada entrada se identifica con un hash de la expresión canónica (la que genera parse_function), los límites,
+la resolución, el tipo de dato y, para la geometría, los niveles. Los arreglos se guardan como .npy y se
+leen con memoria mapeada (sin copiarlos), así que reabrir una curva o una animación ya calculada es casi
+instantáneo. Un índice JSON guarda el tamaño y el último uso de cada entrada; al superar el tamaño máximo
+se borran las menos usadas recientemente (LRU). Varios procesos pueden compartir la carpeta: el índice solo se
+reescribe releyéndolo del disco bajo un bloqueo de archivo. No depende de PyQt5.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from contours import SegmentStore
+
+# Tamaño máximo por defecto de la caché en disco
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+INDEX_FILE = 'index.json'
+LOCK_FILE = 'index.lock'
+# Los usos (aciertos) se anotan en memoria y se vuelcan al índice a lo sumo cada tantos segundos
+TOUCH_FLUSH_SECONDS = 30.0
+
+
+def default_directory():
+    """Carpeta de la caché: $GRAFICADORA_CACHE_DIR, o graficadora_curvas dentro de la caché del usuario."""
+    directory = os.environ.get('GRAFICADORA_CACHE_DIR')
+    if directory:
+        return directory
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'graficadora_curvas')
+
+
+def entry_key(kind, expression, bounds, resolution, dtype, levels=None, **extra):
+    """
+    Hash que identifica una entrada. Los números se representan con float.hex para que dos valores
+    distintos nunca compartan clave por redondeo.
+
+    Args:
+        kind (str): 'field' o 'geometry'.
+        expression (str): Expresión canónica de la función.
+        extra: Otros parámetros que cambian el resultado (por ejemplo, el modo de contorno).
+    """
+    description = {
+        'kind': kind,
+        'expression': expression,
+        'bounds': [float(b).hex() for b in bounds],
+        'resolution': int(resolution),
+        'dtype': np.dtype(dtype).str,
+        'levels': None if levels is None else [float(level).hex() for level in levels],
+        'extra': {name: repr(value) for name, value in sorted(extra.items())},
+    }
+    return hashlib.sha256(json.dumps(description, sort_keys=True).encode('utf-8')).hexdigest()[:32]
+
+
+class DiskCache:
+    """
+    Caché LRU en disco acotada por tamaño. Es segura entre hilos; entre procesos (por ejemplo, el modo por lotes)
+    cada archivo se escribe en un temporal y se renombra, así nunca se lee una entrada a medio escribir, y el
+    índice se modifica siempre releyéndolo bajo un bloqueo de archivo. Los aciertos no escriben el índice: el
+    último uso queda en memoria y se mezcla con el índice del disco al registrar, al desalojar o con flush().
+
+    Args:
+        directory (str): Carpeta de la caché (se crea si no existe); por defecto, default_directory().
+        max_bytes (int): Tamaño máximo total de las entradas.
+    """
+
+    key = staticmethod(entry_key)
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or default_directory()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._used = {}              # clave -> último uso aún no escrito en el índice
+        self._flushed = time.time()
+        os.makedirs(self.directory, exist_ok=True)
+        self._index = self._read_index()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _read_index(self):
+        try:
+            with open(self._path(INDEX_FILE), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_index(self):
+        self._atomic_write(INDEX_FILE, lambda f: f.write(json.dumps(self._index).encode('utf-8')))
+
+    @contextmanager
+    def _index_lock(self):
+        """Bloqueo exclusivo entre procesos para leer, modificar y reescribir el índice."""
+        with open(self._path(LOCK_FILE), 'a+b') as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _merge_index(self):
+        """
+        Relee el índice del disco y le aplica los usos anotados en memoria. Las entradas que otro proceso
+        borró no se recuperan. Se llama con ambos bloqueos tomados.
+        """
+        self._index = self._read_index()
+        for key, last_used in self._used.items():
+            entry = self._index.get(key)
+            if entry is not None and entry['last_used'] < last_used:
+                entry['last_used'] = last_used
+        self._used.clear()
+        self._flushed = time.time()
+
+    def flush(self):
+        """Escribe en el índice los usos anotados en memoria."""
+        with self._lock:
+            if not self._used:
+                return
+            with self._index_lock():
+                self._merge_index()
+                self._write_index()
+
+    def _atomic_write(self, name, write):
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                write(f)
+            os.replace(temporary, self._path(name))
+        except BaseException:
+            os.remove(temporary)
+            raise
+
+    @property
+    def nbytes(self):
+        """Tamaño total de las entradas registradas en el índice."""
+        with self._lock:
+            return sum(entry['bytes'] for entry in self._index.values())
+
+    def _touch(self, key):
+        """
+        Marca la entrada como usada. Devuelve sus archivos, o None si no existe o le falta alguno.
+        El uso se anota en memoria; el índice solo se reescribe cada TOUCH_FLUSH_SECONDS.
+        """
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                # Puede haberla agregado otro proceso después de la última lectura
+                self._index = self._read_index()
+                entry = self._index.get(key)
+            if entry is None or not all(os.path.exists(self._path(name)) for name in entry['files']):
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._used[key] = time.time()
+            if time.time() - self._flushed > TOUCH_FLUSH_SECONDS:
+                with self._index_lock():
+                    self._merge_index()
+                    self._write_index()
+            return entry['files']
+
+    def _register(self, key, files, description):
+        size = sum(os.path.getsize(self._path(name)) for name in files)
+        with self._lock, self._index_lock():
+            # Se parte del índice en disco por si otro proceso agregó o borró entradas
+            self._merge_index()
+            self._index[key] = dict(description, files=files, bytes=size, last_used=time.time())
+            self._evict()
+            self._write_index()
+
+    def _evict(self):
+        """
+        Borra las entradas usadas hace más tiempo hasta quedar dentro de max_bytes. Se llama con ambos
+        bloqueos tomados y el índice recién leído del disco.
+        """
+        total = sum(entry['bytes'] for entry in self._index.values())
+        for key in sorted(self._index, key=lambda k: self._index[k]['last_used']):
+            if total <= self.max_bytes:
+                break
+            entry = self._index.pop(key)
+            total -= entry['bytes']
+            for name in entry['files']:
+                try:
+                    os.remove(self._path(name))
+                except OSError:
+                    pass
+
+    def load_field(self, key):
+        """Devuelve el campo guardado con memoria mapeada (solo lectura), o None si no está."""
+        files = self._touch(key)
+        if files is None:
+            return None
+        try:
+            return np.load(self._path(files[0]), mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+
+    def save_field(self, key, Z, **description):
+        """Guarda el campo Z. 'description' (expresión, límites, ...) se anota en el índice como referencia."""
+        name = f"{key}.npy"
+        self._atomic_write(name, lambda f: np.save(f, np.ascontiguousarray(Z)))
+        self._register(key, [name], description)
+
+    def load_geometry(self, key):
+        """Devuelve el SegmentStore guardado (puntos con memoria mapeada), o None si no está."""
+        files = self._touch(key)
+        if files is None:
+            return None
+        try:
+            points = np.load(self._path(files[0]), mmap_mode='r')
+            with np.load(self._path(files[1])) as offsets:
+                unresolved = int(offsets['unresolved']) if 'unresolved' in offsets else 0
+                return SegmentStore(offsets['levels'].tolist(), points,
+                                    offsets['line_offsets'], offsets['level_offsets'], unresolved)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def save_geometry(self, key, store, **description):
+        """Guarda las polilíneas de un SegmentStore: los puntos en un .npy y los índices en un .npz."""
+        points_name, offsets_name = f"{key}.npy", f"{key}.npz"
+        self._atomic_write(points_name, lambda f: np.save(f, np.ascontiguousarray(store.points)))
+        self._atomic_write(offsets_name, lambda f: np.savez(f, levels=np.asarray(store.levels, dtype=np.float64),
+                                                            line_offsets=store.line_offsets,
+                                                            level_offsets=store.level_offsets,
+                                                            unresolved=store.unresolved))
+        self._register(key, [points_name, offsets_name], description)
+
+    def geometry(self, func_callable, bounds, resolution, dtype, levels, compute, **params):
+        """
+        Devuelve la geometría de los niveles desde el disco o, si no está, la calcula con compute()
+        y la guarda. Las funciones sin expresión canónica (no creadas por parse_function) no se guardan.
+
+        Args:
+            compute (callable): compute() -> SegmentStore.
+            params: Parámetros del cálculo que cambian el resultado (modo de contorno, profundidad, ...).
+        """
+        expression = getattr(func_callable, 'expression', None)
+        if not isinstance(expression, str):
+            return compute()
+        key = entry_key('geometry', expression, bounds, resolution, dtype, levels, **params)
+        store = self.load_geometry(key)
+        if store is None:
+            store = compute()
+            if len(store):
+                self.save_geometry(key, store, expression=expression, bounds=list(bounds),
+                                   resolution=int(resolution), levels=[float(level) for level in levels])
+        return store
+
+    def clear(self):
+        """Borra todas las entradas."""
+        with self._lock, self._index_lock():
+            self._index = self._read_index()
+            self._used.clear()
+            for entry in self._index.values():
+                for name in entry['files']:
+                    try:
+                        os.remove(self._path(name))
+                    except OSError:
+                        pass
+            self._index.clear()
+            self._write_index()
@@ -0,0 +1,265 @@
+"""
+Exportación de animaciones de curvas de nivel a GIF, APNG o MP4.
+Los frames se dibujan de a uno en una figura Agg propia (sin tocar el canvas de la interfaz) y se envían
+al codificador apenas se generan, así la memoria usada no depende de la cantidad de frames.
+El MP4 usa el ffmpeg instalado en el sistema, si lo hay. No depende de PyQt5.
+"""
+
+import io
+import os
+import shutil
+import struct
+import subprocess
+import zlib
+
+import numpy as np
+from PIL import GifImagePlugin, Image
+
+from rendering import LevelAnimationArtists, new_figure
+
+# Formato -> extensión del archivo
+FORMATS = {'gif': '.gif', 'apng': '.png', 'mp4': '.mp4'}
+
+
+def available_formats():
+    """Formatos que se pueden exportar en esta máquina (MP4 solo si hay ffmpeg)."""
+    return [fmt for fmt in FORMATS if fmt != 'mp4' or shutil.which('ffmpeg')]
+
+
+def format_from_path(path):
+    """Deduce el formato a partir de la extensión del archivo."""
+    extension = os.path.splitext(path)[1].lower()
+    for fmt, fmt_extension in FORMATS.items():
+        if extension == fmt_extension:
+            return fmt
+    raise ValueError(f"Extensión no soportada: '{extension}'. Usa .gif, .png (APNG) o .mp4.")
+
+
+class AnimationSpec:
+    """
+    Lo necesario para exportar una animación de niveles sin depender de la interfaz.
+
+    Args:
+        bounds (tuple): (x_min, x_max, y_min, y_max).
+        plan (callable): plan() -> lista con la clave de cada frame: el nivel N, o el instante t.
+        geometry (callable): geometry(clave) -> lista de polilíneas (k, 2), o None si el frame falló.
+        leave_trace (bool): Si True, se dibujan las curvas anteriores como rastro.
+        interval (int): Milisegundos por frame.
+        figsize (tuple): Tamaño de la figura en pulgadas.
+        dpi (float): Resolución de la figura.
+        label (str): Parámetro que recorre la animación ('N' o 't').
+        title (str): Título de la figura, el mismo que se ve en la reproducción.
+    """
+
+    def __init__(self, bounds, plan, geometry, leave_trace=True, interval=100, figsize=None, dpi=None, label='N',
+                 title="Animación Curva de Nivel"):
+        self.bounds = bounds
+        self.plan = plan
+        self.geometry = geometry
+        self.leave_trace = leave_trace
+        self.interval = interval
+        self.figsize = figsize
+        self.dpi = dpi
+        self.label = label
+        self.title = title
+
+
+class GifStreamWriter:
+    """
+    Escribe un GIF animado frame a frame con una paleta global, así cada frame se codifica y se escribe
+    sin guardar los anteriores. La paleta sale de set_palette (muestras con todos los colores de la
+    animación); si no se llamó, se calcula con el primer frame.
+    """
+
+    def __init__(self, path, interval):
+        self.path = path
+        self._duration = int(interval)
+        self._palette = None
+        self._fp = open(path, 'wb')
+
+    def set_palette(self, samples):
+        """
+        Calcula la paleta global con las imágenes RGBA de 'samples' (del mismo ancho), por ejemplo un frame
+        con el rastro completo y la etiqueta de error, para que ningún frame dependa de los colores del primero.
+        """
+        image = Image.fromarray(np.concatenate(samples), 'RGBA').convert('RGB')
+        self._palette = image.quantize(colors=256)
+
+    def write(self, rgba):
+        image = Image.fromarray(rgba, 'RGBA').convert('RGB')
+        if self._palette is None:
+            self._palette = image.quantize(colors=256)
+        first = self._fp.tell() == 0
+        frame = image.quantize(palette=self._palette, dither=Image.Dither.NONE)
+        if first:
+            header, _ = GifImagePlugin.getheader(frame, info={'loop': 0, 'optimize': False})
+            for chunk in header:
+                self._fp.write(chunk)
+        for chunk in GifImagePlugin.getdata(frame, duration=self._duration):
+            self._fp.write(chunk)
+
+    def close(self):
+        self._fp.write(b';')  # trailer del GIF
+        self._fp.close()
+
+    def abort(self):
+        self._fp.close()
+        os.remove(self.path)
+
+
+class ApngStreamWriter:
+    """
+    Escribe un PNG animado (APNG) frame a frame. Cada frame se comprime con Pillow como PNG y sus
+    datos se copian al archivo como IDAT (primer frame) o fdAT (el resto).
+    """
+
+    def __init__(self, path, interval, num_frames):
+        self.path = path
+        self._delay = (int(interval), 1000)
+        self._num_frames = num_frames
+        self._sequence = 0
+        self._fp = open(path, 'wb')
+
+    def _chunk(self, kind, data):
+        self._fp.write(struct.pack('>I', len(data)) + kind + data)
+        self._fp.write(struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+
+    @staticmethod
+    def _png_chunks(png):
+        position = 8  # se salta la firma PNG
+        while position < len(png):
+            length, = struct.unpack('>I', png[position:position + 4])
+            kind = png[position + 4:position + 8]
+            yield kind, png[position + 8:position + 8 + length]
+            position += 12 + length
+
+    def write(self, rgba):
+        buffer = io.BytesIO()
+        Image.fromarray(rgba, 'RGBA').save(buffer, 'PNG', compress_level=6)
+        chunks = list(self._png_chunks(buffer.getvalue()))
+        first = self._sequence == 0
+        if first:
+            self._fp.write(b'\x89PNG\r\n\x1a\n')
+            self._chunk(b'IHDR', next(data for kind, data in chunks if kind == b'IHDR'))
+            self._chunk(b'acTL', struct.pack('>II', self._num_frames, 0))  # 0 = repetir siempre
+        height, width = rgba.shape[:2]
+        self._chunk(b'fcTL', struct.pack('>IIIIIHHBB', self._sequence, width, height, 0, 0,
+                                         self._delay[0], self._delay[1], 0, 0))
+        self._sequence += 1
+        for kind, data in chunks:
+            if kind != b'IDAT':
+                continue
+            if first:
+                self._chunk(b'IDAT', data)
+            else:
+                self._chunk(b'fdAT', struct.pack('>I', self._sequence) + data)
+                self._sequence += 1
+
+    def close(self):
+        self._chunk(b'IEND', b'')
+        self._fp.close()
+
+    def abort(self):
+        self._fp.close()
+        os.remove(self.path)
+
+
+class FfmpegWriter:
+    """Envía los frames RGBA crudos a un proceso ffmpeg que codifica el MP4 (H.264)."""
+
+    def __init__(self, path, interval, size):
+        ffmpeg = shutil.which('ffmpeg')
+        if ffmpeg is None:
+            raise RuntimeError("No se encontró ffmpeg en el sistema; no se puede exportar a MP4.")
+        self.path = path
+        width, height = size
+        command = [ffmpeg, '-y', '-loglevel', 'error',
+                   '-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', f'{width}x{height}',
+                   '-framerate', f'{1000.0 / interval:g}', '-i', '-',
+                   # H.264 con yuv420p necesita ancho y alto pares
+                   '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-pix_fmt', 'yuv420p', path]
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def write(self, rgba):
+        self._process.stdin.write(rgba.tobytes())
+
+    def close(self):
+        self._process.stdin.close()
+        error = self._process.stderr.read().decode(errors='replace')
+        if self._process.wait() != 0:
+            raise RuntimeError(f"ffmpeg terminó con error: {error.strip()}")
+
+    def abort(self):
+        self._process.kill()
+        self._process.wait()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def open_writer(path, fmt, interval, num_frames, size):
+    """Crea el codificador adecuado para el formato."""
+    if fmt == 'gif':
+        return GifStreamWriter(path, interval)
+    if fmt == 'apng':
+        return ApngStreamWriter(path, interval, num_frames)
+    if fmt == 'mp4':
+        return FfmpegWriter(path, interval, size)
+    raise ValueError(f"Formato de exportación desconocido: {fmt}")
+
+
+def _palette_samples(spec, plan, artists, canvas):
+    """
+    Dibuja frames con todos los colores de la animación para calcular la paleta del GIF: el último frame
+    (rastro completo y curva actual) y el mismo con la etiqueta de error en rojo. El primer frame exportado
+    reconstruye el rastro desde cero, así que estos dibujos no quedan en la animación.
+    """
+    last = len(plan) - 1
+    artists.update(plan, last, spec.geometry(plan[last]) or [])
+    canvas.draw()
+    samples = [np.array(canvas.buffer_rgba())]
+    artists.update(plan, last, None)
+    canvas.draw()
+    samples.append(np.array(canvas.buffer_rgba()))
+    return samples
+
+
+def export_animation(spec, path, fmt=None, progress=None, is_cancelled=None):
+    """
+    Dibuja y codifica todos los frames de la animación, de a uno.
+
+    Args:
+        spec (AnimationSpec): Animación a exportar.
+        path (str): Archivo de salida.
+        fmt (str): 'gif', 'apng' o 'mp4'; por defecto se deduce de la extensión.
+        progress (callable): progress(frames_hechos, total), llamado tras cada frame.
+        is_cancelled (callable): Si devuelve True se aborta la exportación y se borra el archivo parcial.
+
+    Returns:
+        bool: True si se completó, False si fue cancelada.
+    """
+    fmt = fmt or format_from_path(path)
+    plan = list(spec.plan())
+    figure, ax = new_figure(spec.bounds, spec.figsize, spec.dpi)
+    ax.set_title(spec.title)
+    artists = LevelAnimationArtists(ax, spec.geometry, spec.leave_trace, label=spec.label)
+    canvas = figure.canvas
+    size = canvas.get_width_height()
+
+    writer = open_writer(path, fmt, spec.interval, len(plan), size)
+    try:
+        if fmt == 'gif' and plan:
+            writer.set_palette(_palette_samples(spec, plan, artists, canvas))
+        for frame, level in enumerate(plan):
+            if is_cancelled is not None and is_cancelled():
+                writer.abort()
+                return False
+            artists.update(plan, frame, spec.geometry(level))
+            canvas.draw()
+            writer.write(np.asarray(canvas.buffer_rgba()))
+            if progress is not None:
+                progress(frame + 1, len(plan))
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+    return True
@@ -0,0 +1,300 @@
+"""
+Caché de campos evaluados f(x, y) sobre la malla del plotter.
+El valor de la función no depende del nivel N, así que una misma malla sirve para todas las curvas
+de nivel, para cada frame de la animación y para la exportación a GIF.
+Los campos se guardan con política LRU y se descartan los más antiguos cuando se supera el presupuesto de memoria.
+La evaluación no arma las matrices X, Y de meshgrid: pasa un vector fila y uno columna que NumPy
+combina por broadcasting, y recorre la malla por franjas de filas para acotar los temporales.
+Las franjas se pueden repartir entre varios hilos: las ufuncs de NumPy liberan el GIL, así que la
+evaluación escala con los núcleos de la máquina.
+Las funciones que dependen de t se evalúan en varios instantes a la vez, como una pila 3-D (t, y, x).
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Presupuesto de memoria por defecto: unas 200 mallas de 400x400 en float64
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Memoria de trabajo por franja al evaluar: la franja y los temporales de la expresión
+DEFAULT_TILE_BYTES = 64 * 1024 * 1024
+# Arreglos del tamaño de la franja que puede necesitar a la vez una expresión típica
+TILE_TEMPORARIES = 8
+
+
+def expression_key(func_callable):
+    """
+    Devuelve la clave que identifica a la función dentro de la caché.
+    Las funciones creadas por parse_function tienen un atributo 'expression' canónico;
+    para cualquier otro callable se usa el propio objeto.
+    """
+    return getattr(func_callable, 'expression', func_callable)
+
+
+def make_grid(bounds, resolution, dtype=np.float64):
+    """
+    Crea los vectores x e y de la malla para los límites (x_min, x_max, y_min, y_max) dados.
+
+    Returns:
+        tuple: (x, y) arreglos 1D de tamaño resolution.
+    """
+    x_min, x_max, y_min, y_max = bounds
+    x = np.linspace(x_min, x_max, resolution, dtype=dtype)
+    y = np.linspace(y_min, y_max, resolution, dtype=dtype)
+    return x, y
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def evaluation_pool():
+    """Pool de hilos compartido para evaluar franjas en paralelo, con un hilo por núcleo. Se crea al primer uso."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix='campo')
+        return _pool
+
+
+def resolve_workers(workers):
+    """Cantidad de hilos a usar: None o 0 significa uno por núcleo."""
+    return max(1, workers or os.cpu_count() or 1)
+
+
+def tile_rows(width, dtype=np.float64, max_bytes=DEFAULT_TILE_BYTES):
+    """
+    Cantidad de filas por franja para que la franja y sus temporales quepan en max_bytes (al menos 2).
+    """
+    row_bytes = width * np.dtype(dtype).itemsize * TILE_TEMPORARIES
+    return max(2, int(max_bytes // max(1, row_bytes)))
+
+
+def evaluate_grid(func_callable, x, y, dtype=None, max_bytes=DEFAULT_TILE_BYTES, out=None, workers=1, layers=None):
+    """
+    Evalúa Z = f(x, y) sobre la malla de los vectores x e y sin crear las matrices de meshgrid.
+    Cada franja de filas recibe x como vector fila (1, nx) e y como vector columna (k, 1), y el
+    resultado se escribe en un único arreglo de salida. Con más de un hilo, las franjas se evalúan
+    en paralelo en evaluation_pool() y cada hilo escribe en su propia porción de la salida.
+
+    Args:
+        func_callable (callable): Función matemática f(x, y) ya parseada.
+        x (np.ndarray): Coordenadas X (1D).
+        y (np.ndarray): Coordenadas Y (1D).
+        dtype: Tipo de dato del resultado; por defecto, el de x.
+        max_bytes (int): Memoria de trabajo por franja.
+        out (np.ndarray): Arreglo (len(y), len(x)) donde escribir el resultado; si es None se crea. Con layers,
+            un arreglo (layers, len(y), len(x)) o una lista de arreglos (len(y), len(x)), uno por capa.
+        workers (int): Hilos a usar (1 = en el hilo actual; None = uno por núcleo). El presupuesto
+            max_bytes se reparte entre ellos.
+        layers (int): Para funciones de parse_functions, cantidad de expresiones; el resultado es una
+            pila (layers, len(y), len(x)) con un campo por expresión.
+
+    Returns:
+        np.ndarray: Campo Z de forma (len(y), len(x)), o (layers, len(y), len(x)) (o la lista 'out' recibida).
+    """
+    dtype = np.dtype(dtype or x.dtype)
+    if out is None:
+        out = np.empty((len(y), len(x)) if layers is None else (layers, len(y), len(x)), dtype=dtype)
+    row = x[np.newaxis, :]
+    workers = resolve_workers(workers)
+    width = len(x) * (layers or 1)  # una fila de la franja ocupa una fila de cada capa
+
+    def evaluate_rows(start, stop):
+        result = func_callable(row, y[start:stop, np.newaxis])
+        if layers is None:
+            out[start:stop] = result
+        else:
+            for layer, values in zip(out, result):
+                layer[start:stop] = values
+
+    if workers == 1:
+        step = tile_rows(width, dtype, max_bytes)
+        for start in range(0, len(y), step):
+            evaluate_rows(start, min(start + step, len(y)))
+        return out
+
+    # Franjas que respetan la memoria por hilo y que alcanzan para ocupar a todos los hilos
+    step = min(tile_rows(width, dtype, max_bytes // workers), -(-len(y) // workers))
+    step = max(1, step)
+    futures = [evaluation_pool().submit(evaluate_rows, start, min(start + step, len(y)))
+               for start in range(0, len(y), step)]
+    for future in futures:
+        future.result()  # relanza los errores de la evaluación
+    return out
+
+
+def time_chunk_steps(width, height, dtype=np.float64, max_bytes=DEFAULT_TILE_BYTES):
+    """
+    Cantidad de instantes que se pueden evaluar juntos en evaluate_time_stack sin que la pila y sus
+    temporales superen max_bytes (al menos 1).
+    """
+    step_bytes = width * height * np.dtype(dtype).itemsize * TILE_TEMPORARIES
+    return max(1, int(max_bytes // max(1, step_bytes)))
+
+
+def evaluate_time_stack(func_callable, x, y, t_values, dtype=None, out=None):
+    """
+    Evalúa f(x, y, t) en varios instantes con una sola llamada: x llega como (1, 1, nx), y como (1, ny, 1)
+    y t como (k, 1, 1), y NumPy arma la pila por broadcasting. Cada operación de la expresión recorre
+    todos los instantes juntos en lugar de repetirse en Python por frame. Conviene acotar la cantidad de
+    instantes con time_chunk_steps.
+
+    Args:
+        func_callable (callable): Función f(x, y, t) ya parseada.
+        x (np.ndarray): Coordenadas X (1D).
+        y (np.ndarray): Coordenadas Y (1D).
+        t_values (sequence): Instantes a evaluar.
+        dtype: Tipo de dato del resultado; por defecto, el de x.
+        out (np.ndarray): Arreglo (len(t_values), len(y), len(x)) donde escribir; si es None se crea.
+
+    Returns:
+        np.ndarray: Pila de campos de forma (len(t_values), len(y), len(x)).
+    """
+    dtype = np.dtype(dtype or x.dtype)
+    t = np.asarray(t_values, dtype=dtype)
+    if out is None:
+        out = np.empty((len(t), len(y), len(x)), dtype=dtype)
+    out[...] = func_callable(x[np.newaxis, np.newaxis, :], y[np.newaxis, :, np.newaxis],
+                             t[:, np.newaxis, np.newaxis])
+    return out
+
+
+class FieldCache:
+    """
+    Caché LRU de campos Z = f(X, Y) acotada por memoria.
+    La clave es (expresión, límites, resolución, dtype). Los arreglos devueltos son de solo lectura
+    porque se comparten entre todos los que piden el mismo campo.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, tile_bytes=DEFAULT_TILE_BYTES, workers=1, disk=None):
+        self.max_bytes = max_bytes
+        self.tile_bytes = tile_bytes
+        self.workers = workers  # hilos para evaluar los campos (1 = sin paralelismo; None = uno por núcleo)
+        self.disk = disk        # DiskCache opcional: segundo nivel, persistente entre sesiones
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # clave -> Z
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def fits(self, resolution, dtype=np.float64, tile_bytes=None, layers=1):
+        """
+        Indica si conviene trabajar con el campo completo: True si el campo y los temporales que crean
+        su evaluación y su contorno caben en la memoria de trabajo (tile_bytes; None usa la de la caché)
+        y en la caché. Si no, hay que evaluar y contornear por franjas. Con layers, para los campos de
+        varias funciones a la vez (ver fields).
+        """
+        tile_bytes = self.tile_bytes if tile_bytes is None else tile_bytes
+        field_bytes = layers * resolution * resolution * np.dtype(dtype).itemsize
+        return field_bytes * TILE_TEMPORARIES <= tile_bytes and field_bytes <= self.max_bytes
+
+    @property
+    def nbytes(self):
+        """Memoria ocupada actualmente por los campos guardados."""
+        return self._bytes
+
+    def field(self, func_callable, bounds, resolution, dtype=np.float64, persist=True, tile_bytes=None, workers=None):
+        """
+        Devuelve la malla y el campo evaluado, calculándolo solo si no estaba en la caché.
+        Si hay caché en disco, se busca allí antes de evaluar (el campo se lee con memoria mapeada) y los
+        campos nuevos se guardan en ella, salvo con persist=False (por ejemplo, las vistas previas).
+
+        Args:
+            func_callable (callable): Función matemática f(x, y) ya parseada.
+            bounds (tuple): (x_min, x_max, y_min, y_max).
+            resolution (int): Cantidad de puntos por eje.
+            dtype: Tipo de dato de la malla (por defecto float64).
+            persist (bool): Si False, no se usa la caché en disco.
+            tile_bytes (int): Memoria de trabajo por franja al evaluar; None usa la de la caché.
+            workers (int): Hilos para evaluar; None usa los de la caché.
+
+        Returns:
+            tuple: (x, y, Z) con x, y vectores 1D y Z de forma (resolution, resolution).
+        """
+        dtype = np.dtype(dtype)
+        bounds = tuple(float(b) for b in bounds)
+        key = (expression_key(func_callable), bounds, int(resolution), dtype.str)
+        x, y = make_grid(bounds, resolution, dtype)
+
+        with self._lock:
+            Z = self._entries.get(key)
+            if Z is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return x, y, Z
+            self.misses += 1
+
+        # Solo las funciones de parse_function tienen una expresión canónica que sirva de clave entre sesiones
+        disk_key = None
+        if self.disk is not None and persist and isinstance(key[0], str):
+            disk_key = self.disk.key('field', key[0], bounds, resolution, dtype)
+            Z = self.disk.load_field(disk_key)
+            if Z is not None:
+                self._store(key, Z)
+                return x, y, Z
+
+        # La evaluación se hace fuera del lock para no bloquear a otros hilos
+        tile_bytes = self.tile_bytes if tile_bytes is None else tile_bytes
+        workers = self.workers if workers is None else workers
+        Z = evaluate_grid(func_callable, x, y, dtype, tile_bytes, workers=workers)
+        Z.flags.writeable = False
+        self._store(key, Z)
+        if disk_key is not None:
+            self.disk.save_field(disk_key, Z, expression=key[0], bounds=bounds, resolution=int(resolution))
+        return x, y, Z
+
+    def fields(self, batched_callable, bounds, resolution, dtype=np.float64):
+        """
+        Devuelve la malla y los campos de varias funciones a la vez (una función de parse_functions).
+        Si falta alguno en la caché, todos se evalúan en una sola pasada sobre la misma malla, así las
+        subexpresiones compartidas se calculan una vez; cada función se escribe en su propio arreglo, que queda
+        en la caché con su propia clave (así cada uno ocupa y libera su propia memoria, sin una pila intermedia
+        que duplique el pico de memoria).
+
+        Returns:
+            tuple: (x, y, lista de campos Z en el orden de las expresiones).
+        """
+        dtype = np.dtype(dtype)
+        bounds = tuple(float(b) for b in bounds)
+        keys = [(expression, bounds, int(resolution), dtype.str) for expression in batched_callable.expressions]
+        x, y = make_grid(bounds, resolution, dtype)
+
+        with self._lock:
+            cached = [self._entries.get(key) for key in keys]
+            if all(Z is not None for Z in cached):
+                for key in keys:
+                    self._entries.move_to_end(key)
+                self.hits += len(keys)
+                return x, y, cached
+            self.misses += 1
+
+        fields = [np.empty((len(y), len(x)), dtype=dtype) for _ in keys]
+        evaluate_grid(batched_callable, x, y, dtype, self.tile_bytes, out=fields, workers=self.workers,
+                      layers=len(keys))
+        for key, Z in zip(keys, fields):
+            Z.flags.writeable = False
+            self._store(key, Z)
+        return x, y, fields
+
+    def _store(self, key, Z):
+        if Z.nbytes > self.max_bytes:
+            return  # no cabe: se devuelve sin guardar
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            self._entries[key] = Z
+            self._bytes += Z.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def clear(self):
+        """Vacía la caché."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
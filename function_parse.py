@@ -4,6 +4,9 @@ Permite al usuario ingresar expresiones como f(x, y) y las convierte en funcione
 Incluye validaciones para evitar el uso de funciones peligrosas y solo permite operaciones matemáticas estándar.
 """
 
+import ast
+import threading
+
 import numpy as np
 
 # Diccionario seguro de funciones matemáticas permitidas
@@ -34,55 +37,468 @@ SAFE_MATH_FUNCTIONS = {
     # Añade más si consideras que el usuario las necesitará
 }
 
+# Operadores de Python permitidos y el ufunc de NumPy que los implementa.
+_BINARY_OPERATORS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.true_divide,
+    ast.FloorDiv: np.floor_divide,
+    ast.Mod: np.mod,
+    ast.Pow: np.power,
+}
+_UNARY_OPERATORS = {
+    ast.USub: np.negative,
+    ast.UAdd: np.positive,
+}
+_COMPARE_OPERATORS = {
+    ast.Lt: np.less,
+    ast.LtE: np.less_equal,
+    ast.Gt: np.greater,
+    ast.GtE: np.greater_equal,
+    ast.Eq: np.equal,
+    ast.NotEq: np.not_equal,
+}
+# Operaciones donde el orden de los argumentos no cambia el resultado; se usan
+# para reconocer x*y e y*x como la misma subexpresión.
+_COMMUTATIVE = {np.add, np.multiply, np.minimum, np.maximum, np.equal, np.not_equal}
+
+# Nombres accesibles como np.<nombre>: los de la lista segura y el nombre real
+# del ufunc (np.sin, np.absolute, np.minimum, ...).
+_NUMPY_ATTRIBUTES = dict(SAFE_MATH_FUNCTIONS)
+_NUMPY_ATTRIBUTES.update({f.__name__: f for f in SAFE_MATH_FUNCTIONS.values() if isinstance(f, np.ufunc)})
+
+# Variables libres de la expresión, en el orden en que las recibe la función compilada.
+# 't' es opcional: vale 0 salvo que se pase, y permite animar el campo en el tiempo.
+VARIABLES = ('x', 'y', 't')
+
+
+class _ExpressionCompiler:
+    """
+    Recorre el AST de la expresión una sola vez y lo traduce a un grafo de operaciones.
+    Los nodos iguales se comparten (eliminación de subexpresiones comunes) y las
+    operaciones cuyos argumentos son todos constantes se calculan en el momento (plegado de constantes).
+    """
+
+    def __init__(self):
+        self.nodes = []   # ('var', índice) | ('const', valor) | ('op', ufunc, (hijos,))
+        self._index = {}  # clave estructural -> id de nodo
+
+    def _add(self, key, node):
+        node_id = self._index.get(key)
+        if node_id is None:
+            node_id = len(self.nodes)
+            self.nodes.append(node)
+            self._index[key] = node_id
+        return node_id
+
+    def const(self, value):
+        value = float(value)
+        # float.hex distingue 0.0 de -0.0 y agrupa los nan, cosa que == no hace
+        return self._add(('const', value.hex()), ('const', value))
+
+    def var(self, index):
+        return self._add(('var', index), ('var', index))
+
+    def op(self, ufunc, args):
+        if all(self.nodes[a][0] == 'const' for a in args):
+            with np.errstate(all='ignore'):
+                value = ufunc(*(np.float64(self.nodes[a][1]) for a in args))
+            return self.const(value)
+        key_args = tuple(sorted(args)) if ufunc in _COMMUTATIVE else tuple(args)
+        return self._add(('op', ufunc, key_args), ('op', ufunc, tuple(args)))
+
+    def visit(self, node):
+        if isinstance(node, ast.Constant):
+            if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+                raise ValueError(f"constante no numérica {node.value!r}")
+            return self.const(node.value)
+        if isinstance(node, ast.Name):
+            if node.id in VARIABLES:
+                return self.var(VARIABLES.index(node.id))
+            value = SAFE_MATH_FUNCTIONS.get(node.id)
+            if value is None:
+                raise NameError(f"name '{node.id}' is not defined")
+            if callable(value):
+                raise ValueError(f"'{node.id}' es una función y debe llamarse, ej: {node.id}(x)")
+            return self.const(value)
+        if isinstance(node, ast.Attribute):
+            value = self._numpy_attribute(node)
+            if callable(value):
+                raise ValueError(f"'np.{node.attr}' es una función y debe llamarse")
+            return self.const(value)
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+            return self.op(_BINARY_OPERATORS[type(node.op)], (self.visit(node.left), self.visit(node.right)))
+        if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPERATORS:
+            return self.op(_UNARY_OPERATORS[type(node.op)], (self.visit(node.operand),))
+        if isinstance(node, ast.Compare) and len(node.ops) == 1 and type(node.ops[0]) in _COMPARE_OPERATORS:
+            return self.op(_COMPARE_OPERATORS[type(node.ops[0])],
+                           (self.visit(node.left), self.visit(node.comparators[0])))
+        if isinstance(node, ast.Call):
+            return self._call(node)
+        raise ValueError(f"construcción no permitida: {ast.unparse(node)}")
+
+    def canonical(self, node_id):
+        """
+        Devuelve una forma textual canónica del nodo: dos expresiones que el compilador
+        considera equivalentes (ej. "x*y" e "y * x") producen la misma cadena.
+        """
+        node = self.nodes[node_id]
+        if node[0] == 'var':
+            return VARIABLES[node[1]]
+        if node[0] == 'const':
+            return repr(node[1])
+        args = [self.canonical(a) for a in node[2]]
+        if node[1] in _COMMUTATIVE:
+            args.sort()
+        return f"{node[1].__name__}({','.join(args)})"
+
+    def derivative(self, node_id, var, memo=None):
+        """
+        Deriva simbólicamente el nodo respecto de la variable 'var' (índice en VARIABLES) y devuelve el id
+        del nodo derivada, o None si la derivada es cero. Los nodos nuevos pasan por op(), así que la
+        derivada comparte subexpresiones con la función (por ejemplo, sin(x) aparece una sola vez en
+        f = sin(x)**2 y en su derivada) y sus constantes quedan plegadas. Las funciones escalonadas
+        (floor, ceil, comparaciones) tienen derivada cero salvo en sus saltos.
+
+        Raises:
+            ValueError: Si la expresión usa una operación sin regla de derivación.
+        """
+        memo = {} if memo is None else memo
+        if node_id in memo:
+            return memo[node_id]
+        node = self.nodes[node_id]
+        if node[0] == 'var':
+            result = self.const(1.0) if node[1] == var else None
+        elif node[0] == 'const':
+            result = None
+        else:
+            _, ufunc, args = node
+            result = self._derivative_rule(node_id, ufunc, args, [self.derivative(a, var, memo) for a in args])
+        memo[node_id] = result
+        return result
+
+    def _sum(self, a, b):
+        """a + b, donde None representa al cero."""
+        if a is None:
+            return b
+        if b is None:
+            return a
+        return self.op(np.add, (a, b))
+
+    def _times(self, a, b):
+        """a * b, donde None representa al cero."""
+        if a is None or b is None:
+            return None
+        return self.op(np.multiply, (a, b))
+
+    def _derivative_rule(self, node_id, ufunc, args, d):
+        """Regla de derivación de una operación: args son los operandos y d sus derivadas (None = 0)."""
+        op, const, times = self.op, self.const, self._times
+        a = args[0]
+        da = d[0]
+        if len(args) == 2:
+            b, db = args[1], d[1]
+            if ufunc is np.add:
+                return self._sum(da, db)
+            if ufunc is np.subtract:
+                return self._sum(da, None if db is None else op(np.negative, (db,)))
+            if ufunc is np.multiply:
+                return self._sum(times(da, b), times(a, db))
+            if ufunc is np.true_divide:
+                # (a/b)' = a'/b - (a/b) b'/b
+                left = None if da is None else op(np.true_divide, (da, b))
+                right = None if db is None else op(np.true_divide, (times(node_id, db), b))
+                return self._sum(left, None if right is None else op(np.negative, (right,)))
+            if ufunc is np.power:
+                # (a^b)' = b a^(b-1) a' + a^b log(a) b'
+                left = None
+                if da is not None:
+                    left = times(times(b, op(np.power, (a, op(np.subtract, (b, const(1.0)))))), da)
+                right = None if db is None else times(times(node_id, op(np.log, (a,))), db)
+                return self._sum(left, right)
+            if ufunc is np.arctan2:
+                # atan2(a, b)' = (b a' - a b') / (a² + b²)
+                numerator = self._sum(times(b, da), None if db is None else op(np.negative, (times(a, db),)))
+                if numerator is None:
+                    return None
+                return op(np.true_divide, (numerator, op(np.add, (times(a, a), times(b, b)))))
+            if ufunc in (np.minimum, np.maximum):
+                pick_a = op(np.less_equal if ufunc is np.minimum else np.greater_equal, (a, b))
+                pick_b = op(np.greater if ufunc is np.minimum else np.less, (a, b))
+                return self._sum(times(da, pick_a), times(db, pick_b))
+            if ufunc is np.mod:
+                # a mod b = a - b floor(a/b)
+                quotient = op(np.floor_divide, (a, b))
+                return self._sum(da, None if db is None else op(np.negative, (times(db, quotient),)))
+            if ufunc is np.floor_divide or ufunc in _COMPARE_OPERATORS.values():
+                return None
+        else:
+            if ufunc is np.negative:
+                return None if da is None else op(np.negative, (da,))
+            if ufunc is np.positive or da is None:
+                return da
+            if ufunc in (np.floor, np.ceil):
+                return None
+            one = const(1.0)
+
+            def root_one_minus_square():
+                return op(np.sqrt, (op(np.subtract, (one, times(a, a))),))
+
+            rules = {
+                np.sin: lambda: op(np.cos, (a,)),
+                np.cos: lambda: op(np.negative, (op(np.sin, (a,)),)),
+                np.tan: lambda: op(np.add, (one, times(node_id, node_id))),
+                np.arcsin: lambda: op(np.true_divide, (one, root_one_minus_square())),
+                np.arccos: lambda: op(np.true_divide, (const(-1.0), root_one_minus_square())),
+                np.arctan: lambda: op(np.true_divide, (one, op(np.add, (one, times(a, a))))),
+                np.sinh: lambda: op(np.cosh, (a,)),
+                np.cosh: lambda: op(np.sinh, (a,)),
+                np.tanh: lambda: op(np.subtract, (one, times(node_id, node_id))),
+                np.sqrt: lambda: op(np.true_divide, (const(0.5), node_id)),
+                np.log: lambda: op(np.true_divide, (one, a)),
+                np.log10: lambda: op(np.true_divide, (const(1.0 / np.log(10.0)), a)),
+                np.exp: lambda: node_id,
+                np.absolute: lambda: op(np.sign, (a,)),
+            }
+            rule = rules.get(ufunc)
+            if rule is not None:
+                return times(rule(), da)
+        raise ValueError(f"no se puede derivar '{ufunc.__name__}'")
+
+    def _numpy_attribute(self, node):
+        if not (isinstance(node.value, ast.Name) and node.value.id == 'np'):
+            raise ValueError(f"acceso a atributo no permitido: {ast.unparse(node)}")
+        value = _NUMPY_ATTRIBUTES.get(node.attr)
+        if value is None:
+            raise NameError(f"name 'np.{node.attr}' is not defined")
+        return value
+
+    def _call(self, node):
+        if isinstance(node.func, ast.Name):
+            name = node.func.id
+            func = SAFE_MATH_FUNCTIONS.get(name)
+            if func is None:
+                raise NameError(f"name '{name}' is not defined")
+        elif isinstance(node.func, ast.Attribute):
+            name = ast.unparse(node.func)
+            func = self._numpy_attribute(node.func)
+        else:
+            raise ValueError(f"llamada no permitida: {ast.unparse(node)}")
+        if not isinstance(func, np.ufunc):
+            raise ValueError(f"'{name}' no es una función")
+        if node.keywords or len(node.args) != func.nin:
+            raise ValueError(f"'{name}' espera {func.nin} argumento(s) posicional(es)")
+        return self.op(func, tuple(self.visit(arg) for arg in node.args))
+
+
+def _build_program(compiler, roots):
+    """
+    Ordena las operaciones alcanzables desde las raíces y les asigna registros.
+    Un registro temporal se reutiliza en cuanto su valor deja de necesitarse, así las
+    expresiones largas no mantienen vivos todos sus arreglos intermedios. Los registros de
+    las raíces (los resultados) nunca se reutilizan.
+
+    Returns:
+        tuple: (registros iniciales, lista de pasos (ufunc, a, b, salida), registros de los resultados, variables usadas)
+    """
+    nodes = compiler.nodes
+    reachable = set()
+    pending = list(roots)
+    while pending:
+        node_id = pending.pop()
+        if node_id in reachable:
+            continue
+        reachable.add(node_id)
+        if nodes[node_id][0] == 'op':
+            pending.extend(nodes[node_id][2])
+    order = sorted(reachable)  # los hijos siempre se crean antes que sus padres
+
+    # Registros fijos: variables primero, luego constantes
+    template = [None] * len(VARIABLES)
+    slot_of = {}
+    used_vars = set()
+    for node_id in order:
+        kind = nodes[node_id][0]
+        if kind == 'var':
+            slot_of[node_id] = nodes[node_id][1]
+            used_vars.add(nodes[node_id][1])
+        elif kind == 'const':
+            slot_of[node_id] = len(template)
+            template.append(nodes[node_id][1])
+    fixed = len(template)
+
+    ops = [node_id for node_id in order if nodes[node_id][0] == 'op']
+    last_use = {}
+    for step, node_id in enumerate(ops):
+        for arg in nodes[node_id][2]:
+            last_use[arg] = step
+
+    steps = []
+    free = []
+    for step, node_id in enumerate(ops):
+        _, ufunc, args = nodes[node_id]
+        arg_slots = [slot_of[a] for a in args]
+        for arg in set(args):
+            if last_use[arg] == step and slot_of[arg] >= fixed and arg not in roots:
+                free.append(slot_of[arg])
+        if free:
+            out = free.pop()
+        else:
+            out = len(template)
+            template.append(None)
+        slot_of[node_id] = out
+        steps.append((ufunc, arg_slots[0], arg_slots[1] if len(arg_slots) > 1 else -1, out))
+    return template, tuple(steps), [slot_of[root] for root in roots], used_vars
+
+
+def _batched_callable(template, steps, result_slots):
+    """
+    Función que ejecuta el programa de _build_program y devuelve una lista con el valor de cada raíz,
+    ya expandido a la forma de la malla.
+    """
+    broadcast_to = np.broadcast_to
+    broadcast = np.broadcast
+
+    def callable_funcs(x_array, y_array, t_array=0.0):
+        regs = template.copy()
+        regs[0] = x_array
+        regs[1] = y_array
+        regs[2] = t_array
+        for ufunc, a, b, out in steps:
+            regs[out] = ufunc(regs[a]) if b < 0 else ufunc(regs[a], regs[b])
+        shape = broadcast(x_array, y_array, t_array).shape
+        results = []
+        for slot in result_slots:
+            result = regs[slot]
+            if np.shape(result) != shape:
+                result = broadcast_to(result, shape).copy()
+            results.append(result)
+        return results
+
+    return callable_funcs
+
+
+class _GradientProgram:
+    """
+    f y su gradiente (∂f/∂x, ∂f/∂y) compilados en un único programa, de modo que comparten subexpresiones.
+    Se compila en la primera llamada, así parsear una función no paga el costo de derivarla.
+    Si la expresión no se puede derivar simbólicamente, la llamada lanza ValueError.
+    """
+
+    def __init__(self, compiler, root):
+        self._compiler = compiler
+        self._root = root
+        self._program = None
+        self._lock = threading.Lock()
+
+    def __call__(self, x_array, y_array, t_array=0.0):
+        """Devuelve (f, ∂f/∂x, ∂f/∂y) evaluados en los puntos dados."""
+        if self._program is None:
+            with self._lock:
+                if self._program is None:
+                    self._program = self._compile()
+        return self._program(x_array, y_array, t_array)
+
+    def _compile(self):
+        compiler = self._compiler
+        roots = [self._root]
+        for var in ('x', 'y'):
+            derivative = compiler.derivative(self._root, VARIABLES.index(var))
+            roots.append(compiler.const(0.0) if derivative is None else derivative)
+        template, steps, result_slots, _ = _build_program(compiler, tuple(roots))
+        return _batched_callable(template, steps, result_slots)
+
+
 def parse_function(func_str):
     """
     Recibe una cadena de texto que representa una función matemática f(x, y) y la convierte en una función evaluable con NumPy.
-    Solo permite el uso de variables x, y y funciones matemáticas seguras. Si la expresión es válida, devuelve una función lista para usar; si no, devuelve un mensaje de error explicativo.
+    La expresión se analiza una sola vez con el módulo ast: solo se aceptan x, y, el parámetro opcional t, números,
+    operadores aritméticos y las funciones de SAFE_MATH_FUNCTIONS. Las constantes se precalculan y las subexpresiones repetidas se evalúan
+    una sola vez. La función devuelta no usa eval() ni estado compartido, así que puede llamarse desde varios hilos a la vez.
 
     Args:
         func_str (str): Cadena de la función, por ejemplo "x**2 + y**2" o "np.sin(x) + np.cos(y)".
 
     Returns:
         tuple: (función evaluable, mensaje de error). Si todo está bien, el error es None.
+            La función se llama como f(x, y) o f(x, y, t) (t = 0 por defecto); x, y y t se combinan por
+            broadcasting, así que con t de forma (k, 1, 1) se evalúan k instantes de una vez. Su atributo
+            'uses_t' indica si la expresión depende de t, y 'value_and_gradient(x, y[, t])' devuelve
+            (f, ∂f/∂x, ∂f/∂y) con derivadas simbólicas exactas.
     """
-    # Preparar el entorno de ejecución para eval()
-    # Solo permitimos 'x', 'y' y las funciones seguras de numpy
-    local_vars = {
-        'x': None,  # Se reemplazará con el array x en tiempo de ejecución
-        'y': None,  # Se reemplazará con el array y en tiempo de ejecución
-        'np': np    # Permitimos el acceso a numpy como 'np'
-    }
-    # Añadimos las funciones seguras directamente al scope local_vars
-    local_vars.update(SAFE_MATH_FUNCTIONS)
-
     # Reemplazar operadores de potencia comunes si el usuario los escribe como ^
     # aunque Python usa **. numpy.power es más robusto.
     parsed_func_str = func_str.replace('^', '**')
 
     try:
-        # Intentamos compilar la expresión primero. Esto ayuda a detectar
-        # errores de sintaxis antes de la evaluación real.
-        code_obj = compile(parsed_func_str, '<string>', 'eval')
-
-        # Devolvemos una función lambda que evaluará la expresión con x e y (arrays de NumPy)
-        # La función eval() se ejecuta en un entorno controlado (globals=None para evitar acceso
-        # a globales del módulo, locals=local_vars para las variables permitidas).
-        def callable_func(x_array, y_array):
-            local_vars['x'] = x_array
-            local_vars['y'] = y_array
-            return eval(code_obj, {"__builtins__": {}}, local_vars)
-
-        return callable_func, None # No hay error
-
+        tree = ast.parse(parsed_func_str.strip(), mode='eval')
+        compiler = _ExpressionCompiler()
+        root = compiler.visit(tree.body)
+        template, steps, (result_slot,), used_vars = _build_program(compiler, (root,))
     except SyntaxError as e:
         return None, f"Error de sintaxis en la función: {e}"
     except NameError as e:
         # Esto ocurre si el usuario intenta usar una función no permitida (ej. 'os.system()')
         return None, f"Nombre no permitido o desconocido en la función: {e}. Asegúrate de usar funciones como np.sin, np.cos, etc."
     except Exception as e:
-        # Captura cualquier otro error durante la compilación o evaluación inicial
+        # Captura cualquier otro error durante el análisis de la expresión
         return None, f"Error al parsear la función: {e}"
 
+    # Si la expresión no depende de todas las variables recibidas (ej. "3", "x**2" o una t escalar),
+    # el resultado se expande a la forma de la malla para que el contorno reciba un campo completo.
+    broadcast_to = np.broadcast_to
+    broadcast = np.broadcast
+
+    def callable_func(x_array, y_array, t_array=0.0):
+        regs = template.copy()  # registros propios de cada llamada: reentrante
+        regs[0] = x_array
+        regs[1] = y_array
+        regs[2] = t_array
+        for ufunc, a, b, out in steps:
+            regs[out] = ufunc(regs[a]) if b < 0 else ufunc(regs[a], regs[b])
+        result = regs[result_slot]
+        shape = broadcast(x_array, y_array, t_array).shape
+        if np.shape(result) != shape:
+            result = broadcast_to(result, shape).copy()
+        return result
+
+    # Identificador estable de la expresión, usado como clave de caché
+    callable_func.expression = compiler.canonical(root)
+    callable_func.uses_t = VARIABLES.index('t') in used_vars
+    # (f, ∂f/∂x, ∂f/∂y) por derivación simbólica, para el trazado por continuación
+    callable_func.value_and_gradient = _GradientProgram(compiler, root)
+    return callable_func, None # No hay error
+
+def parse_functions(func_strs):
+    """
+    Parsea varias funciones f(x, y) y las compila en una sola función que las evalúa juntas sobre la
+    misma malla. Las subexpresiones que comparten (por ejemplo x**2 + y**2 en "sqrt(x**2 + y**2)" y
+    "x**2 + y**2 - 1") se calculan una sola vez por llamada.
+
+    Args:
+        func_strs (list): Cadenas de las funciones.
+
+    Returns:
+        tuple: (función evaluable, mensaje de error). La función recibe (x, y) o (x, y, t) y devuelve una lista con el
+            resultado de cada expresión, ya expandido a la forma de la malla; su atributo 'expressions'
+            tiene la forma canónica de cada una. Si alguna expresión es inválida, la función es None y el
+            mensaje indica cuál.
+    """
+    compiler = _ExpressionCompiler()
+    roots = []
+    for position, func_str in enumerate(func_strs, start=1):
+        # Se reutiliza parse_function para obtener exactamente los mismos mensajes de error
+        func_callable, error_message = parse_function(func_str)
+        if func_callable is None:
+            return None, f"Función {position} ({func_str}): {error_message}"
+        roots.append(compiler.visit(ast.parse(func_str.replace('^', '**').strip(), mode='eval').body))
+    template, steps, result_slots, used_vars = _build_program(compiler, tuple(roots))
+    callable_funcs = _batched_callable(template, steps, result_slots)
+    callable_funcs.expressions = [compiler.canonical(root) for root in roots]
+    callable_funcs.uses_t = VARIABLES.index('t') in used_vars
+    return callable_funcs, None
+
 if __name__ == "__main__":
     # Ejemplos de uso y pruebas para el parser de funciones
     print("--- Pruebas de function_parser.py ---")
@@ -126,7 +542,7 @@ if __name__ == "__main__":
         print(f"Error esperado al parsear '{func_str_4}': {error_4}")
 
     # Prueba 5: Uso de pow en lugar de np.power
-    func_str_5 = "pow(x, 2) + y" # pow es una built-in
+    func_str_5 = "pow(x, 2) + y" # pow es una built-in: se rechaza al parsear
     func_5, error_5 = parse_function(func_str_5)
     if func_5:
         x_test = np.array([2])
@@ -134,4 +550,44 @@ if __name__ == "__main__":
         result_5 = func_5(x_test, y_test)
         print(f"'{func_str_5}' -> Resultado para x={x_test}, y={y_test}: {result_5}")
     else:
-        print(f"Error esperado al parsear '{func_str_5}': {error_5}")
\ No newline at end of file
+        print(f"Error esperado al parsear '{func_str_5}': {error_5}")
+
+    # Prueba 6: Constantes plegadas y subexpresión repetida (sin(x) se evalúa una vez)
+    func_str_6 = "sin(x)**2 + sin(x)*cos(y) + pi/2"
+    func_6, error_6 = parse_function(func_str_6)
+    if func_6:
+        x_test = np.array([0, np.pi/2])
+        y_test = np.array([0, 0])
+        result_6 = func_6(x_test, y_test)
+        print(f"'{func_str_6}' -> Resultado para x={x_test}, y={y_test}: {result_6}")
+    else:
+        print(f"Error al parsear '{func_str_6}': {error_6}")
+
+    # Prueba 7: Varias funciones en una sola pasada (x**2 + y**2 se comparte)
+    funcs_7 = ["sqrt(x**2 + y**2)", "x**2 + y**2 - 1", "x"]
+    batch_7, error_7 = parse_functions(funcs_7)
+    if batch_7:
+        x_test = np.array([3.0, 0.0])
+        y_test = np.array([4.0, 1.0])
+        print(f"{funcs_7} -> Resultados para x={x_test}, y={y_test}: {batch_7(x_test, y_test)}")
+    else:
+        print(f"Error al parsear {funcs_7}: {error_7}")
+
+    # Prueba 8: Función con el parámetro t, evaluada en varios instantes de una sola vez
+    func_str_8 = "x**2 + y**2 - t"
+    func_8, error_8 = parse_function(func_str_8)
+    if func_8:
+        t_test = np.array([0.0, 1.0, 2.0])[:, np.newaxis, np.newaxis]
+        result_8 = func_8(np.array([[1.0, 2.0]]), np.array([[0.0]]), t_test)
+        print(f"'{func_str_8}' (usa t: {func_8.uses_t}) -> forma {result_8.shape}: {result_8.ravel()}")
+    else:
+        print(f"Error al parsear '{func_str_8}': {error_8}")
+
+    # Prueba 9: Valor y gradiente por derivación simbólica
+    func_str_9 = "sin(x)*y**2"
+    func_9, error_9 = parse_function(func_str_9)
+    if func_9:
+        value_9, dx_9, dy_9 = func_9.value_and_gradient(np.array([0.0, np.pi/2]), np.array([1.0, 2.0]))
+        print(f"'{func_str_9}' -> f = {value_9}, df/dx = {dx_9}, df/dy = {dy_9}")
+    else:
+        print(f"Error al parsear '{func_str_9}': {error_9}")
@@ -1,9 +1,21 @@
 # gui.py
-from PyQt5.QtWidgets import QMainWindow, QVBoxLayout, QWidget, QLabel, QLineEdit, QDoubleSpinBox, QCheckBox, QPushButton, QGridLayout, QGroupBox, QMessageBox
-from PyQt5.QtCore import Qt
+# Matplotlib, el plotter y los exportadores se importan recién al usarlos: la ventana aparece sin esperarlos
+import math
+import os
+
+from PyQt5.QtWidgets import QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QLabel, QLineEdit, QDoubleSpinBox, QSpinBox, QComboBox, QCheckBox, QPushButton, QGridLayout, QGroupBox, QMessageBox, QFileDialog, QProgressDialog, QTableWidget, QTableWidgetItem, QHeaderView
+from PyQt5.QtCore import Qt, QThread, QTimer
+
+from function_parse import parse_function, parse_functions # Importa tu parser
+
+# Vista inicial (x_min, x_max, y_min, y_max); es la misma con la que arranca CurvePlotter
+INITIAL_BOUNDS = (-10.0, 10.0, -10.0, 10.0)
+
+
+def bounds_decimals(span):
+    """Decimales de los campos de límites para un ancho de vista dado: al menos 3 y unas 4 cifras del ancho."""
+    return max(3, min(15, 3 - math.floor(math.log10(span))))
 
-from function_parse import parse_function # Importa tu parser
-from plotter import CurvePlotter # Importa tu plotter
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -20,12 +32,49 @@ class MainWindow(QMainWindow):
         self.setCentralWidget(self.central_widget)
         self.main_layout = QVBoxLayout(self.central_widget)
 
-        # Instancia el área de graficado (plotter)
-        self.plotter = CurvePlotter(self)
+        # El área de graficado (plotter) se construye cuando la ventana ya está en pantalla; hasta entonces
+        # ocupa su lugar un aviso. Ver la propiedad plotter.
+        self._plotter = None
+        self._plotter_scheduled = False
+        self.plot_placeholder = QLabel("Cargando el área de gráficos...")
+        self.plot_placeholder.setAlignment(Qt.AlignCenter)
+        # Exportación en segundo plano (hilo, worker y diálogo de progreso)
+        self.export_thread = None
+        self.export_worker = None
+        self.export_progress = None
+        # Vista previa en vivo: cada edición reinicia el temporizador y solo se grafica tras una pausa al escribir
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(300)
+        self.preview_timer.timeout.connect(self.run_live_preview)
 
         # Inicializa la interfaz de usuario
         self.init_ui()
 
+    @property
+    def plotter(self):
+        """
+        Área de graficado (CurvePlotter). Importar Matplotlib y armar la figura lleva más que mostrar los
+        controles, así que se construye al primer uso o, a más tardar, después del primer dibujo de la ventana.
+        """
+        if self._plotter is None:
+            from plotter import CurvePlotter
+            self._plotter = CurvePlotter(self)
+            self._plotter.view_changed.connect(self.on_view_changed)
+            self.main_layout.replaceWidget(self.plot_placeholder, self._plotter)
+            self.plot_placeholder.deleteLater()
+        return self._plotter
+
+    def paintEvent(self, event):
+        """
+        Tras el primer dibujo de la ventana se agenda la construcción del plotter para la siguiente vuelta del
+        bucle de eventos: los controles ya están en pantalla mientras se carga Matplotlib.
+        """
+        super().paintEvent(event)
+        if self._plotter is None and not self._plotter_scheduled:
+            self._plotter_scheduled = True
+            QTimer.singleShot(0, lambda: self.plotter)
+
     # ...existing code...
 
     def on_plot_button_clicked(self):
@@ -36,7 +85,8 @@ class MainWindow(QMainWindow):
         """
         func_str = self.function_input.text()
         n_value = self.n_value_input.value()
-        parsed_func, error_message = parse_function(func_str)
+        with self.plotter.profiler.stage('parseo'):
+            parsed_func, error_message = parse_function(func_str)
         if parsed_func:
             try:
                 self.plotter.draw_single_curve(parsed_func, n_value)
@@ -55,10 +105,9 @@ class MainWindow(QMainWindow):
         func_str = self.function_input.text()
         n_value = self.n_value_input.value()
         trace_enabled = self.leave_trace_checkbox.isChecked()
-        speed_str = self.speed_combo.currentText()
-        speed_map = {"x0.5": 200, "x1": 100, "x1.5": 66, "x2": 50}
-        interval = speed_map.get(speed_str, 100)
-        parsed_func, error_message = parse_function(func_str)
+        interval = self.animation_interval()
+        with self.plotter.profiler.stage('parseo'):
+            parsed_func, error_message = parse_function(func_str)
         if parsed_func:
             try:
                 self.plotter.animate_curves(parsed_func, n_value, trace_enabled, interval)
@@ -67,6 +116,214 @@ class MainWindow(QMainWindow):
         else:
             QMessageBox.critical(self, "Error de parseo", error_message)
 
+    def on_animate_time_button_clicked(self):
+        """
+        Evento del botón 'Animar en t'. Anima la curva f(x, y, t) = N mientras t va del valor inicial al final,
+        con la misma velocidad y el mismo rastro que la animación en N.
+        """
+        func_str = self.function_input.text()
+        with self.plotter.profiler.stage('parseo'):
+            parsed_func, error_message = parse_function(func_str)
+        if not parsed_func:
+            QMessageBox.critical(self, "Error de parseo", error_message)
+            return
+        if not parsed_func.uses_t:
+            QMessageBox.warning(self, "Animación en t", "La función no depende de t: usa t en la expresión, "
+                                                         "por ejemplo x**2 + y**2 - t.")
+            return
+        try:
+            self.plotter.animate_time(parsed_func, self.n_value_input.value(), self.t_start_input.value(),
+                                      self.t_end_input.value(), self.t_frames_input.value(),
+                                      self.leave_trace_checkbox.isChecked(), self.animation_interval())
+        except ValueError as e:
+            QMessageBox.warning(self, "Animación en t", str(e))
+        except Exception as e:
+            QMessageBox.critical(self, "Error de animación", f"Error: {e}")
+
+    def animation_interval(self):
+        """Milisegundos por frame según la velocidad elegida."""
+        speed_map = {"x0.5": 200, "x1": 100, "x1.5": 66, "x2": 50}
+        return speed_map.get(self.speed_combo.currentText(), 100)
+
+    def on_live_preview_toggled(self, checked):
+        """
+        Evento que se ejecuta al marcar o desmarcar 'Vista previa en vivo'.
+        Al activarla se grafica enseguida la función actual; al desactivarla se ocultan los errores en línea.
+        """
+        if checked:
+            self.run_live_preview()
+        else:
+            self.preview_timer.stop()
+            self.function_error_label.hide()
+
+    def on_function_edited(self):
+        """
+        Evento que se ejecuta al editar la función o el valor N. Con la vista previa en vivo activa,
+        reinicia el temporizador: las teclas seguidas se agrupan en un único redibujo.
+        """
+        if self.live_preview_checkbox.isChecked():
+            self.preview_timer.start()
+
+    def run_live_preview(self):
+        """
+        Parsea la función y, si es válida, pide al plotter que la dibuje en segundo plano.
+        Los errores de sintaxis se muestran debajo del campo, sin ventanas emergentes.
+        """
+        with self.plotter.profiler.stage('parseo'):
+            parsed_func, error_message = parse_function(self.function_input.text())
+        if parsed_func is None:
+            self.function_error_label.setText(error_message)
+            self.function_error_label.show()
+            return
+        self.function_error_label.hide()
+        self.plotter.preview_curve(parsed_func, self.n_value_input.value())
+
+    def on_overlay_add_row_clicked(self):
+        """Agrega una fila vacía a la tabla de funciones superpuestas, con el siguiente color de la paleta."""
+        row = self.overlay_table.rowCount()
+        self.overlay_table.insertRow(row)
+        for column, text in enumerate(("", "0", f"C{row % 10}")):
+            self.overlay_table.setItem(row, column, QTableWidgetItem(text))
+
+    def on_overlay_remove_row_clicked(self):
+        """Quita la fila seleccionada (o la última) de la tabla de funciones superpuestas."""
+        row = self.overlay_table.currentRow()
+        self.overlay_table.removeRow(row if row >= 0 else self.overlay_table.rowCount() - 1)
+
+    def on_overlay_button_clicked(self):
+        """
+        Evento que se ejecuta al presionar el botón 'Graficar superpuestas'.
+        Lee cada fila de la tabla (función, niveles separados por comas y color), compila todas las funciones
+        juntas y las dibuja en la misma figura con leyenda. Las filas sin función se ignoran.
+        """
+        from matplotlib.colors import is_color_like
+        expressions = []
+        layers = []
+        for row in range(self.overlay_table.rowCount()):
+            cells = [self.overlay_table.item(row, column) for column in range(3)]
+            func_str, levels_str, color = [(cell.text() if cell else "").strip() for cell in cells]
+            if not func_str:
+                continue
+            try:
+                levels = [float(value) for value in levels_str.split(',') if value.strip()]
+            except ValueError:
+                QMessageBox.warning(self, "Niveles inválidos",
+                                    f"Fila {row + 1}: los niveles deben ser números separados por comas.")
+                return
+            if not levels:
+                QMessageBox.warning(self, "Niveles inválidos", f"Fila {row + 1}: indica al menos un nivel N.")
+                return
+            if not is_color_like(color or "C0"):
+                QMessageBox.warning(self, "Color inválido",
+                                    f"Fila {row + 1}: '{color}' no es un color válido (ej: red, #1f77b4, C2).")
+                return
+            expressions.append(func_str)
+            layers.append((func_str, levels, color or f"C{len(layers) % 10}"))
+        if not expressions:
+            QMessageBox.warning(self, "Curvas superpuestas", "Agrega al menos una función a la tabla.")
+            return
+
+        with self.plotter.profiler.stage('parseo'):
+            batched_func, error_message = parse_functions(expressions)
+        if batched_func is None:
+            QMessageBox.critical(self, "Error de parseo", error_message)
+            return
+        try:
+            self.plotter.draw_overlay(batched_func, layers)
+        except Exception as e:
+            QMessageBox.critical(self, "Error al graficar", f"Error: {e}")
+
+    # Opciones del selector de motor de contorno: texto -> (modo del plotter, gradiente de la continuación)
+    CONTOUR_ENGINES = {
+        "Malla fija": ('grid', 'symbolic'),
+        "Adaptativo (quadtree)": ('adaptive', 'symbolic'),
+        "Continuación (gradiente simbólico)": ('continuation', 'symbolic'),
+        "Continuación (diferencias finitas)": ('continuation', 'fd'),
+    }
+
+    def on_contour_engine_changed(self, text):
+        """
+        Evento que se ejecuta al elegir el motor de contorno. Se aplica desde el próximo gráfico: malla fija,
+        refinamiento por quadtree o trazado por continuación (curvas de alta precisión para exportar).
+        """
+        self.plotter.contour_mode, self.plotter.continuation_gradient = self.CONTOUR_ENGINES[text]
+
+    def on_parallel_toggled(self, checked):
+        """
+        Evento que se ejecuta al marcar o desmarcar 'Evaluación en paralelo'.
+        Con la opción marcada el campo se evalúa por franjas en un hilo por núcleo.
+        """
+        self.plotter.field_cache.workers = None if checked else 1
+
+    def on_profiling_toggled(self, checked):
+        """
+        Evento que se ejecuta al marcar o desmarcar 'Mostrar rendimiento'.
+        Muestra u oculta sobre el gráfico los fps y los milisegundos de cada etapa.
+        """
+        self.plotter.set_profiling_overlay(checked)
+
+    def on_save_trace_button_clicked(self):
+        """
+        Evento que se ejecuta al presionar el botón 'Guardar traza de tiempos'.
+        Guarda la línea de tiempo de la sesión en formato Chrome trace (JSON), para abrirla en
+        chrome://tracing o en ui.perfetto.dev.
+        """
+        default_path = os.path.expanduser('~/Desktop/traza_curvas.json')
+        path, _ = QFileDialog.getSaveFileName(self, "Guardar traza de tiempos", default_path, "JSON (*.json)")
+        if not path:
+            return
+        try:
+            count = self.plotter.dump_profile(path)
+        except OSError as e:
+            QMessageBox.critical(self, "Error al guardar", f"No se pudo guardar la traza: {e}")
+            return
+        QMessageBox.information(self, "Guardar traza de tiempos", f"Se guardaron {count} eventos en:\n{path}")
+
+    def on_bounds_edited(self):
+        """
+        Evento que se ejecuta al terminar de editar alguno de los límites de la vista (o al salir del campo).
+        Aplica al plotter solo los límites que el usuario cambió; los demás conservan su valor exacto, no el
+        redondeado que muestra el campo. Si son inválidos, avisa y restaura los anteriores.
+        """
+        if not self.edited_bounds:
+            return
+        values = [spin.value() if index in self.edited_bounds else bound
+                  for index, (spin, bound) in enumerate(zip(self.bounds_inputs, self.plotter.bounds))]
+        self.edited_bounds.clear()
+        if tuple(values) == self.plotter.bounds:
+            return
+        try:
+            self.plotter.set_view(*values)
+        except ValueError as e:
+            QMessageBox.warning(self, "Límites inválidos", str(e))
+            self.on_view_changed(*self.plotter.bounds)
+
+    def on_view_changed(self, x_min, x_max, y_min, y_max):
+        """
+        Actualiza los campos de límites cuando la vista cambia (por ejemplo, al arrastrar o hacer zoom con el mouse),
+        con los decimales que pide el ancho de la vista en cada eje.
+        """
+        self.edited_bounds.clear()
+        spans = (x_max - x_min, x_max - x_min, y_max - y_min, y_max - y_min)
+        for spin, value, span in zip(self.bounds_inputs, (x_min, x_max, y_min, y_max), spans):
+            spin.blockSignals(True)
+            spin.setDecimals(bounds_decimals(span))
+            spin.setValue(value)
+            spin.blockSignals(False)
+
+    def closeEvent(self, event):
+        """
+        Al cerrar la ventana se detienen la animación y los cálculos en segundo plano del plotter.
+        """
+        self.preview_timer.stop()
+        if self.export_thread is not None:
+            self.export_worker.stop()
+            self.export_thread.quit()
+            self.export_thread.wait()
+        if self._plotter is not None:
+            self._plotter.shutdown()
+        super().closeEvent(event)
+
     def on_stop_button_clicked(self):
         """
         Evento que se ejecuta al presionar el botón 'Detener animación'.
@@ -76,20 +333,124 @@ class MainWindow(QMainWindow):
 
     def on_export_gif_button_clicked(self):
         """
-        Evento que se ejecuta al presionar el botón 'Exportar GIF'.
-        Guarda la animación actual como un archivo GIF en el escritorio del usuario.
+        Evento que se ejecuta al presionar el botón 'Exportar animación'.
+        Pide la ruta y el formato (GIF, APNG o MP4 si hay ffmpeg) y exporta la animación actual en segundo plano,
+        reutilizando las curvas ya calculadas. Muestra el progreso con opción de cancelar.
         Si no hay animación activa, informa al usuario. Si ocurre un error al guardar, lo muestra claramente.
         """
-        import os
-        desktop_path = os.path.expanduser('~/Desktop/curva_animada.gif')
-        if hasattr(self.plotter, 'animation') and self.plotter.animation:
+        from exporter import FORMATS, available_formats, format_from_path
+        from plotter import ExportWorker
+        spec = self.plotter.animation_spec()
+        if spec is None:
+            QMessageBox.warning(self, "Exportar animación", "No hay animación activa para exportar.")
+            return
+        if self.export_thread is not None:
+            QMessageBox.warning(self, "Exportar animación", "Ya hay una exportación en curso.")
+            return
+
+        filters = {'gif': "GIF (*.gif)", 'apng': "PNG animado (*.png)", 'mp4': "Video MP4 (*.mp4)"}
+        formats = available_formats()
+        default_path = os.path.expanduser('~/Desktop/curva_animada.gif')
+        path, selected_filter = QFileDialog.getSaveFileName(self, "Exportar animación", default_path,
+                                                            ";;".join(filters[fmt] for fmt in formats))
+        if not path:
+            return
+        try:
+            fmt = format_from_path(path)
+        except ValueError:
+            # Sin extensión reconocida: se usa el formato del filtro elegido
+            fmt = next((fmt for fmt in formats if filters[fmt] == selected_filter), 'gif')
+            path += FORMATS[fmt]
+        if fmt not in formats:
+            QMessageBox.warning(self, "Exportar animación", "No se encontró ffmpeg: no se puede exportar a MP4.")
+            return
+
+        self.export_progress = QProgressDialog("Exportando animación...", "Cancelar", 0, 0, self)
+        self.export_progress.setWindowTitle("Exportar animación")
+        self.export_progress.setMinimumDuration(0)
+        self.export_progress.setAutoClose(False)
+        self.export_progress.setAutoReset(False)
+
+        self.export_thread = QThread()
+        self.export_worker = ExportWorker(spec, path, fmt)
+        self.export_worker.moveToThread(self.export_thread)
+        self.export_thread.started.connect(self.export_worker.run)
+        self.export_worker.progress.connect(self.on_export_progress)
+        self.export_worker.finished.connect(self.on_export_finished)
+        self.export_worker.failed.connect(self.on_export_failed)
+        self.export_worker.cancelled.connect(self.on_export_cancelled)
+        self.export_progress.canceled.connect(self.on_export_cancel_requested)
+        self.export_thread.start()
+
+    def on_export_vector_button_clicked(self):
+        """
+        Evento del botón 'Exportar SVG/PDF'. Guarda como gráfico vectorial la curva actual, la familia de niveles
+        escrita en el campo (separados por comas) o las curvas superpuestas, simplificadas con la tolerancia elegida.
+        """
+        import vector_export
+        levels = None
+        levels_str = self.vector_levels_input.text().strip()
+        if levels_str:
             try:
-                self.plotter.animation.save(desktop_path, writer='pillow')
-                QMessageBox.information(self, "Exportar GIF", f"La animación se ha guardado en el escritorio como curva_animada.gif")
-            except Exception as e:
-                QMessageBox.critical(self, "Error al exportar GIF", f"No se pudo guardar el GIF: {e}")
-        else:
-            QMessageBox.warning(self, "Exportar GIF", "No hay animación activa para exportar.")
+                levels = [float(value) for value in levels_str.split(',') if value.strip()]
+            except ValueError:
+                QMessageBox.warning(self, "Niveles inválidos", f"No se pudieron leer los niveles '{levels_str}'.")
+                return
+        filters = {'svg': "SVG (*.svg)", 'pdf': "PDF (*.pdf)"}
+        default_path = os.path.expanduser('~/Desktop/curvas_de_nivel.svg')
+        path, selected_filter = QFileDialog.getSaveFileName(self, "Exportar curvas", default_path,
+                                                            ";;".join(filters.values()))
+        if not path:
+            return
+        try:
+            vector_export.format_from_path(path)
+        except ValueError:
+            fmt = next((fmt for fmt in filters if filters[fmt] == selected_filter), 'svg')
+            path += vector_export.FORMATS[fmt]
+        tolerance = self.vector_tolerance_input.value() or None  # 0 = automática
+        try:
+            stats = self.plotter.export_vector(path, levels, tolerance)
+        except ValueError as e:
+            QMessageBox.warning(self, "Exportar curvas", str(e))
+            return
+        except Exception as e:
+            QMessageBox.critical(self, "Error al exportar", f"No se pudieron guardar las curvas: {e}")
+            return
+        QMessageBox.information(self, "Exportar curvas",
+                                f"Las curvas se han guardado en:\n{path}\n\n{stats['vertices_out']} vértices "
+                                f"(de {stats['vertices_in']}) en {stats['paths']} caminos.")
+
+    def on_export_cancel_requested(self):
+        """
+        Evento del botón 'Cancelar' del diálogo de progreso. Se marca el worker directamente desde este hilo,
+        porque el hilo de exportación está ocupado codificando y no atendería una señal.
+        """
+        if self.export_worker is not None:
+            self.export_worker.stop()
+
+    def on_export_progress(self, done, total):
+        """Actualiza la barra de progreso de la exportación."""
+        self.export_progress.setMaximum(total)
+        self.export_progress.setValue(done)
+
+    def on_export_finished(self, path):
+        self._finish_export()
+        QMessageBox.information(self, "Exportar animación", f"La animación se ha guardado en:\n{path}")
+
+    def on_export_failed(self, message):
+        self._finish_export()
+        QMessageBox.critical(self, "Error al exportar", f"No se pudo guardar la animación: {message}")
+
+    def on_export_cancelled(self):
+        self._finish_export()
+
+    def _finish_export(self):
+        """Cierra el diálogo de progreso y libera el hilo de exportación."""
+        self.export_progress.close()
+        self.export_thread.quit()
+        self.export_thread.wait()
+        self.export_thread = None
+        self.export_worker = None
 
     def init_ui(self):
         """
@@ -103,23 +464,37 @@ class MainWindow(QMainWindow):
         # Fila 0: Función f(x, y)
         control_layout.addWidget(QLabel("Función f(x, y):"), 0, 0)
         self.function_input = QLineEdit("x**2 + y**2")
-        self.function_input.setPlaceholderText("Ej: x**2 + y**2")
-        control_layout.addWidget(self.function_input, 0, 1)
+        self.function_input.setPlaceholderText("Ej: x**2 + y**2, o x**2 + y**2 - t para animar en t")
+        self.function_input.textEdited.connect(self.on_function_edited)
+        function_layout = QVBoxLayout()
+        function_layout.addWidget(self.function_input)
+        # Error de parseo en línea (vista previa en vivo)
+        self.function_error_label = QLabel()
+        self.function_error_label.setStyleSheet("color: red;")
+        self.function_error_label.setWordWrap(True)
+        self.function_error_label.hide()
+        function_layout.addWidget(self.function_error_label)
+        control_layout.addLayout(function_layout, 0, 1)
 
         # Fila 1: Valor constante para N
         control_layout.addWidget(QLabel("Valor constante N:"), 1, 0)
         self.n_value_input = QDoubleSpinBox()
         self.n_value_input.setRange(-1000.0, 1000.0)
         self.n_value_input.setValue(0.0)
+        self.n_value_input.valueChanged.connect(self.on_function_edited)
         control_layout.addWidget(self.n_value_input, 1, 1)
 
         # Fila 2: Checkbox Mantener Rastro
         self.leave_trace_checkbox = QCheckBox("Mantener rastro (para animación)")
         self.leave_trace_checkbox.setChecked(True)
-        control_layout.addWidget(self.leave_trace_checkbox, 2, 0, 1, 2)
+        control_layout.addWidget(self.leave_trace_checkbox, 2, 0)
+        self.contour_engine_combo = QComboBox()
+        self.contour_engine_combo.addItems(list(self.CONTOUR_ENGINES))
+        self.contour_engine_combo.setToolTip("Motor de contorno")
+        self.contour_engine_combo.currentTextChanged.connect(self.on_contour_engine_changed)
+        control_layout.addWidget(self.contour_engine_combo, 2, 1)
 
         # Fila 3: Control de velocidad de animación
-        from PyQt5.QtWidgets import QComboBox
         control_layout.addWidget(QLabel("Velocidad animación:"), 3, 0)
         self.speed_combo = QComboBox()
         self.speed_combo.addItems(["x0.5", "x1", "x1.5", "x2"])
@@ -137,14 +512,113 @@ class MainWindow(QMainWindow):
         # Fila 5: Botón de Detener animación y Exportar GIF
         self.stop_button = QPushButton("Detener animación")
         self.stop_button.clicked.connect(self.on_stop_button_clicked)
-        self.export_gif_button = QPushButton("Exportar GIF")
+        self.export_gif_button = QPushButton("Exportar animación")
         self.export_gif_button.clicked.connect(self.on_export_gif_button_clicked)
         control_layout.addWidget(self.stop_button, 5, 0)
         control_layout.addWidget(self.export_gif_button, 5, 1)
 
+        # Fila 6: Límites de la vista (también se cambian arrastrando y con la rueda del mouse)
+        control_layout.addWidget(QLabel("Vista (x mín, x máx, y mín, y máx):"), 6, 0)
+        bounds_layout = QHBoxLayout()
+        self.bounds_inputs = []
+        self.edited_bounds = set()  # índices de los límites que el usuario cambió desde el último cambio de vista
+        for index, value in enumerate(INITIAL_BOUNDS):
+            spin = QDoubleSpinBox()
+            spin.setRange(-1e6, 1e6)
+            spin.setDecimals(bounds_decimals(INITIAL_BOUNDS[1] - INITIAL_BOUNDS[0]))
+            spin.setValue(value)
+            # on_view_changed bloquea las señales, así que solo cuentan los cambios hechos por el usuario
+            spin.valueChanged.connect(lambda _, index=index: self.edited_bounds.add(index))
+            spin.editingFinished.connect(self.on_bounds_edited)
+            bounds_layout.addWidget(spin)
+            self.bounds_inputs.append(spin)
+        control_layout.addLayout(bounds_layout, 6, 1)
+
+        # Fila 7: Rendimiento (superposición con fps y ms por etapa, y traza de la sesión)
+        self.profiling_checkbox = QCheckBox("Mostrar rendimiento (fps y ms por etapa)")
+        self.profiling_checkbox.setChecked(False)
+        self.profiling_checkbox.toggled.connect(self.on_profiling_toggled)
+        self.save_trace_button = QPushButton("Guardar traza de tiempos")
+        self.save_trace_button.clicked.connect(self.on_save_trace_button_clicked)
+        control_layout.addWidget(self.profiling_checkbox, 7, 0)
+        control_layout.addWidget(self.save_trace_button, 7, 1)
+
+        # Fila 8: Evaluación del campo en varios hilos
+        self.parallel_checkbox = QCheckBox("Evaluación en paralelo (todos los núcleos)")
+        self.parallel_checkbox.setChecked(False)
+        self.parallel_checkbox.toggled.connect(self.on_parallel_toggled)
+        control_layout.addWidget(self.parallel_checkbox, 8, 0)
+        self.live_preview_checkbox = QCheckBox("Vista previa en vivo (al escribir)")
+        self.live_preview_checkbox.setChecked(False)
+        self.live_preview_checkbox.toggled.connect(self.on_live_preview_toggled)
+        control_layout.addWidget(self.live_preview_checkbox, 8, 1)
+
+        # Fila 9: Animación del campo f(x, y, t) en el tiempo
+        control_layout.addWidget(QLabel("Animar en t (t inicial, t final, frames):"), 9, 0)
+        time_layout = QHBoxLayout()
+        self.t_start_input = QDoubleSpinBox()
+        self.t_end_input = QDoubleSpinBox()
+        for spin, value in ((self.t_start_input, 0.0), (self.t_end_input, 10.0)):
+            spin.setRange(-1e6, 1e6)
+            spin.setDecimals(3)
+            spin.setValue(value)
+            time_layout.addWidget(spin)
+        self.t_frames_input = QSpinBox()
+        self.t_frames_input.setRange(2, 2000)
+        self.t_frames_input.setValue(60)
+        time_layout.addWidget(self.t_frames_input)
+        self.animate_time_button = QPushButton("Animar en t")
+        self.animate_time_button.clicked.connect(self.on_animate_time_button_clicked)
+        time_layout.addWidget(self.animate_time_button)
+        control_layout.addLayout(time_layout, 9, 1)
+
+        # Fila 10: Exportación vectorial de la curva o de una familia de niveles
+        control_layout.addWidget(QLabel("Exportar vectorial (niveles, tolerancia):"), 10, 0)
+        vector_layout = QHBoxLayout()
+        self.vector_levels_input = QLineEdit()
+        self.vector_levels_input.setPlaceholderText("Vacío = N actual; ej: -2, -1, 0, 1, 2")
+        vector_layout.addWidget(self.vector_levels_input, stretch=1)
+        self.vector_tolerance_input = QDoubleSpinBox()
+        self.vector_tolerance_input.setRange(0.0, 1000.0)
+        self.vector_tolerance_input.setDecimals(5)
+        self.vector_tolerance_input.setSingleStep(0.001)
+        self.vector_tolerance_input.setSpecialValueText("automática")
+        self.vector_tolerance_input.setToolTip("Distancia máxima (en unidades de x, y) entre la curva y su versión "
+                                               "simplificada")
+        vector_layout.addWidget(self.vector_tolerance_input)
+        self.export_vector_button = QPushButton("Exportar SVG/PDF")
+        self.export_vector_button.clicked.connect(self.on_export_vector_button_clicked)
+        vector_layout.addWidget(self.export_vector_button)
+        control_layout.addLayout(vector_layout, 10, 1)
+
         # Asignar el layout al group box
         self.controls_group_box.setLayout(control_layout)
 
+        # Funciones superpuestas: cada fila es una función con sus niveles y su color
+        self.overlay_group_box = QGroupBox("Superponer funciones")
+        overlay_layout = QHBoxLayout()
+        self.overlay_table = QTableWidget(0, 3)
+        self.overlay_table.setHorizontalHeaderLabels(["Función f(x, y)", "Niveles N (separados por comas)", "Color"])
+        self.overlay_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.overlay_table.setMaximumHeight(110)
+        for row, values in enumerate((("x**2 + y**2", "1, 4, 9", "C0"), ("x*y", "-2, 2", "C3"))):
+            self.overlay_table.insertRow(row)
+            for column, text in enumerate(values):
+                self.overlay_table.setItem(row, column, QTableWidgetItem(text))
+        overlay_layout.addWidget(self.overlay_table, stretch=1)
+        overlay_buttons = QVBoxLayout()
+        self.overlay_add_button = QPushButton("Agregar fila")
+        self.overlay_add_button.clicked.connect(self.on_overlay_add_row_clicked)
+        self.overlay_remove_button = QPushButton("Quitar fila")
+        self.overlay_remove_button.clicked.connect(self.on_overlay_remove_row_clicked)
+        self.overlay_button = QPushButton("Graficar superpuestas")
+        self.overlay_button.clicked.connect(self.on_overlay_button_clicked)
+        overlay_buttons.addWidget(self.overlay_add_button)
+        overlay_buttons.addWidget(self.overlay_remove_button)
+        overlay_buttons.addWidget(self.overlay_button)
+        overlay_layout.addLayout(overlay_buttons)
+        self.overlay_group_box.setLayout(overlay_layout)
+
         # Limpiar el layout principal antes de agregar widgets (por si se reinicializa)
         while self.main_layout.count():
             item = self.main_layout.takeAt(0)
@@ -154,6 +628,7 @@ class MainWindow(QMainWindow):
 
         # Agregar los widgets al layout principal
         self.main_layout.addWidget(self.controls_group_box)
-        self.main_layout.addWidget(self.plotter, stretch=1)
+        self.main_layout.addWidget(self.overlay_group_box)
+        self.main_layout.addWidget(self.plot_placeholder, stretch=1)
         # No es necesario addStretch si el plotter tiene stretch
         # ...existing code...
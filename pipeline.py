@@ -0,0 +1,118 @@
+"""
+Pipeline productor/consumidor para precalcular la geometría de los frames de una animación.
+Un pool de hilos calcula los frames próximos mientras el hilo de la interfaz solo consume los que ya están listos.
+La cantidad de frames calculados por adelantado está acotada (backpressure): un frame nuevo se encarga
+recién cuando la interfaz consume uno. No depende de PyQt5.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PipelineCancelled(Exception):
+    """Se lanza al pedir un frame de un pipeline que ya fue cancelado."""
+
+
+class FramePipeline:
+    """
+    Calcula en segundo plano el plan de la animación y la geometría de cada frame.
+
+    Args:
+        prepare (callable): prepare() -> lista con la clave de cada frame (por ejemplo, el nivel N).
+            Se ejecuta una sola vez en el pool, antes que cualquier frame.
+        compute_frame (callable): compute_frame(clave) -> geometría del frame.
+        max_ahead (int): Máximo de frames encargados o listos sin consumir.
+        workers (int): Hilos del pool; por defecto, según la cantidad de núcleos.
+    """
+
+    def __init__(self, prepare, compute_frame, max_ahead=8, workers=None):
+        self.compute_frame = compute_frame
+        self.max_ahead = max_ahead
+        self._executor = ThreadPoolExecutor(max_workers=workers or min(4, os.cpu_count() or 1),
+                                            thread_name_prefix='frames')
+        self._lock = threading.Lock()
+        self._futures = {}     # índice de frame -> Future
+        self._next_submit = 0  # próximo frame a encargar
+        self._consumed = 0     # frames ya entregados en orden
+        self._keys = None
+        self._cancelled = False
+        self._plan = self._executor.submit(prepare)
+        self._plan.add_done_callback(self._on_plan_ready)
+
+    def _on_plan_ready(self, future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        with self._lock:
+            self._keys = list(future.result())
+            self._fill()
+
+    def _fill(self):
+        """Encarga frames hasta completar la ventana permitida. Se llama con el lock tomado."""
+        if self._cancelled or self._keys is None:
+            return
+        limit = min(len(self._keys), self._consumed + self.max_ahead)
+        while self._next_submit < limit:
+            i = self._next_submit
+            self._futures[i] = self._executor.submit(self._run_frame, self._keys[i])
+            self._next_submit += 1
+
+    def _run_frame(self, key):
+        if self._cancelled:
+            raise PipelineCancelled()
+        return self.compute_frame(key)
+
+    def plan(self, wait=True):
+        """
+        Devuelve la lista de claves de los frames, o None si todavía no está lista y wait=False.
+        Si prepare() falló, relanza su excepción.
+        """
+        if not wait and not self._plan.done():
+            return None
+        return list(self._plan.result())
+
+    def ready(self, index):
+        """Indica si la geometría del frame ya está calculada (sin bloquear)."""
+        with self._lock:
+            future = self._futures.get(index)
+        return future is not None and future.done()
+
+    def frame(self, index):
+        """
+        Devuelve la geometría del frame, esperando si hace falta. Al consumir un frame se libera
+        lugar en la ventana y se encargan los siguientes. Pedir un frame anterior al último consumido
+        (por ejemplo, al reiniciar para exportar) reinicia la ventana desde ese frame.
+        """
+        keys = self.plan()
+        if self._cancelled:
+            raise PipelineCancelled()
+        with self._lock:
+            if self._keys is None:
+                self._keys = keys  # el callback del plan todavía no corrió
+            if index < self._consumed or index >= self._next_submit:
+                # Salto fuera de la ventana: se descartan los encargos y se empieza desde index
+                for future in self._futures.values():
+                    future.cancel()
+                self._futures.clear()
+                self._consumed = self._next_submit = index
+                self._fill()
+            future = self._futures.get(index)
+        if future is None:
+            raise IndexError(f"el frame {index} no existe (hay {len(keys)})")
+        result = future.result()
+        with self._lock:
+            for i in [i for i in self._futures if i <= index]:
+                del self._futures[i]
+            self._consumed = max(self._consumed, index + 1)
+            self._fill()
+        return result
+
+    def cancel(self):
+        """Cancela los frames pendientes y libera el pool sin esperar a los que están en curso."""
+        with self._lock:
+            self._cancelled = True
+            for future in self._futures.values():
+                future.cancel()
+            self._futures.clear()
+        self._plan.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
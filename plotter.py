@@ -1,13 +1,28 @@
 # plotter.py
-import matplotlib
-matplotlib.use('Qt5Agg')
-import matplotlib
-matplotlib.use('Qt5Agg')
+import threading
+from collections import defaultdict
+
 import numpy as np
-import matplotlib.pyplot as plt
+from matplotlib.animation import FuncAnimation
+from matplotlib.collections import LineCollection
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+from matplotlib.ticker import MaxNLocator
 from PyQt5.QtWidgets import QWidget, QVBoxLayout
-from PyQt5.QtCore import QThread, pyqtSignal, QObject
+from PyQt5.QtCore import QThread, QTimer, pyqtSignal, QObject
+
+from contouring import contour_field
+from contours import extract_contours, extract_contours_tiled, extract_layer_contours_tiled, prune_levels
+from disk_cache import DiskCache
+from exporter import AnimationSpec, export_animation
+from field_cache import FieldCache, evaluate_time_stack, make_grid, time_chunk_steps
+from pipeline import FramePipeline, PipelineCancelled
+from profiling import StageProfiler
+from rendering import LevelAnimationArtists
+from vector_export import export_curves
+
+# Niveles consecutivos de la animación en N que se contornean juntos: una pasada y una entrada en disco por bloque
+LEVEL_CHUNK = 8
 
 # Clase worker para animación en hilo separado
 class AnimationWorker(QObject):
@@ -32,8 +47,122 @@ class AnimationWorker(QObject):
     def stop(self):
         self._running = False
 
+# Clase worker para calcular la curva de la vista en un hilo separado: opcionalmente una vista previa
+# gruesa y después la versión a resolución completa
+class RefineWorker(QObject):
+    result_ready = pyqtSignal(int, object, bool)  # generación de la vista, SegmentStore o excepción, es final
+    done = pyqtSignal()
+
+    def __init__(self, generation, compute, preview=None, parent=None):
+        super().__init__(parent)
+        self.generation = generation
+        self.compute = compute
+        self.preview = preview
+        self._running = True
+
+    def run(self):
+        try:
+            for final, compute in ((False, self.preview), (True, self.compute)):
+                # Si la vista cambió, no se empieza la etapa siguiente
+                if compute is None or not self._running:
+                    continue
+                try:
+                    result = compute()
+                except Exception as e:
+                    print(f"Error al refinar la vista: {e}")
+                    result = e
+                # Si la vista cambió mientras se calculaba, el resultado ya no sirve
+                if self._running:
+                    self.result_ready.emit(self.generation, result, final or isinstance(result, Exception))
+                if isinstance(result, Exception):
+                    break
+        finally:
+            self.done.emit()
+
+    def stop(self):
+        self._running = False
+
+# Clase worker para exportar una animación en un hilo separado
+class ExportWorker(QObject):
+    progress = pyqtSignal(int, int)  # frames hechos, total
+    finished = pyqtSignal(str)       # ruta del archivo generado
+    failed = pyqtSignal(str)         # mensaje de error
+    cancelled = pyqtSignal()
+
+    def __init__(self, spec, path, fmt=None, parent=None):
+        super().__init__(parent)
+        self.spec = spec
+        self.path = path
+        self.fmt = fmt
+        self._running = True
+
+    def run(self):
+        try:
+            completed = export_animation(self.spec, self.path, self.fmt, progress=self.progress.emit,
+                                         is_cancelled=lambda: not self._running)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        if completed:
+            self.finished.emit(self.path)
+        else:
+            self.cancelled.emit()
+
+    def stop(self):
+        self._running = False
+
+# Animación cuyos frames vienen de un FramePipeline
+class PipelineAnimation(FuncAnimation):
+    """
+    FuncAnimation que en pantalla avanza solo cuando el frame siguiente está listo y que mide cada frame
+    en el profiler. El rastro de level_artists (LevelAnimationArtists) forma parte del fondo del blitting:
+    cada nivel nuevo se dibuja una vez sobre el fondo guardado, así cada frame solo copia el fondo y dibuja
+    la curva actual y la etiqueta. La exportación no pasa por aquí: usa export_spec con exporter.export_animation.
+    """
+
+    def __init__(self, fig, func, pipeline, profiler=None, level_artists=None, **kwargs):
+        self.pipeline = pipeline
+        self.profiler = profiler
+        self.level_artists = level_artists
+        super().__init__(fig, func, cache_frame_data=False, **kwargs)
+
+    def _draw_frame(self, framedata):
+        super()._draw_frame(framedata)
+        if self._blit and self.level_artists is not None:
+            self._update_background()
+
+    def _update_background(self):
+        """Lleva al fondo guardado del blitting los niveles que se agregaron al rastro en este frame."""
+        rebuilt, collections = self.level_artists.take_new_trace()
+        if not rebuilt and not collections:
+            return
+        ax = self.level_artists.ax
+        cached = self._blit_cache.get(ax)
+        if rebuilt or cached is None or cached[0] != ax._get_view():
+            # Rastro reconstruido o fondo inválido: se redibuja la figura sin los artistas animados y
+            # _blit_draw vuelve a capturar el fondo
+            self._blit_cache.pop(ax, None)
+            self._fig.canvas.draw()
+            return
+        # El canvas tiene el fondo restaurado por _blit_clear: se dibujan encima solo los niveles nuevos
+        for collection in collections:
+            ax.draw_artist(collection)
+        self._blit_cache[ax] = (cached[0], self._fig.canvas.copy_from_bbox(ax.bbox))
+
+    def _draw_next_frame(self, framedata, blit):
+        # Se mide el frame completo: actualizar los artistas y copiarlos al canvas con blitting
+        if self.profiler is None or framedata is None:
+            super()._draw_next_frame(framedata, blit)
+            return
+        with self.profiler.stage('frame'):
+            super()._draw_next_frame(framedata, blit)
+        self.profiler.frame_done()
+
 # Clase principal para graficar curvas
 class CurvePlotter(QWidget):
+    # Se emite con (x_min, x_max, y_min, y_max) cada vez que cambia la vista
+    view_changed = pyqtSignal(float, float, float, float)
+
     def stop_animation(self):
         """
         Detiene la animación actual si está activa. Esto permite al usuario pausar la animación en cualquier momento.
@@ -43,6 +172,8 @@ class CurvePlotter(QWidget):
                 self.animation.event_source.stop()
             except Exception:
                 pass
+            if isinstance(self.animation, PipelineAnimation):
+                self.animation.pipeline.cancel()
             self.animation = None
 
     def __init__(self, parent=None):
@@ -51,7 +182,7 @@ class CurvePlotter(QWidget):
         Aquí se configuran los ejes, límites y el layout para mostrar las curvas de nivel.
         """
         super().__init__(parent)
-        self.figure = plt.Figure()
+        self.figure = Figure()
         self.canvas = FigureCanvas(self.figure)
         self.ax = self.figure.add_subplot(111) # 1x1 grid, primer subplot
 
@@ -69,9 +200,285 @@ class CurvePlotter(QWidget):
         self.ax.set_xlim(self.x_min, self.x_max)
         self.ax.set_ylim(self.y_min, self.y_max)
         self.ax.set_aspect('equal', adjustable='box') # Escalas iguales
+        # Resolución de la malla de evaluación (puntos por eje) y tipo de dato (np.float32 usa la mitad de memoria)
+        self.resolution = 400
+        self.dtype = np.float64
+        # Campos f(x, y) ya evaluados; los comparten la curva única, la animación y el GIF.
+        # field_cache.workers elige la evaluación: 1 = un hilo, None = franjas en paralelo en todos los núcleos
+        self.field_cache = FieldCache(disk=self._open_disk_cache())
+        # Modo de contorno: 'grid' (malla fija), 'adaptive' (quadtree refinado cerca de la curva) o
+        # 'continuation' (trazado predictor-corrector, con vértices exactos sobre la curva)
+        self.contour_mode = 'grid'
+        self.adaptive_coarse = 128 # celdas por eje de la malla inicial del quadtree
+        self.adaptive_depth = 3    # subdivisiones máximas por celda
+        self.continuation_seeds = 64             # puntos por eje de la malla de semillas
+        self.continuation_gradient = 'symbolic'  # 'symbolic' (derivada de la expresión) o 'fd'
+        # Tiempos por etapa y superposición opcional con fps y milisegundos sobre el gráfico
+        self.profiler = StageProfiler()
+        self.show_profiling = False
+        self._profile_text = None
 
         self.animation = None # Referencia a la animación
 
+        # Navegación: arrastrar con el botón izquierdo para mover, rueda para hacer zoom.
+        # Cada cambio de vista dibuja al instante una vista previa de baja resolución y,
+        # tras una breve pausa, la refina a resolución completa en un QThread.
+        self.preview_resolution = 80
+        self._view_plot = None        # (función, N) de la curva mostrada
+        self._overlay = None          # (funciones de parse_functions, capas) de las curvas superpuestas
+        self._view_generation = 0     # aumenta con cada cambio de vista; invalida refinamientos viejos
+        self._refine_jobs = {}        # QThread -> RefineWorker en curso
+        self._refine_pending = None   # cálculo que espera a que termine el anterior (None: ninguno)
+        self._pan_start = None
+        self._refine_timer = QTimer(self)
+        self._refine_timer.setSingleShot(True)
+        self._refine_timer.setInterval(150)
+        self._refine_timer.timeout.connect(self._start_refine)
+        self.canvas.mpl_connect('scroll_event', self._on_scroll)
+        self.canvas.mpl_connect('button_press_event', self._on_press)
+        self.canvas.mpl_connect('motion_notify_event', self._on_motion)
+        self.canvas.mpl_connect('button_release_event', self._on_release)
+
+    @staticmethod
+    def _open_disk_cache():
+        """Caché en disco de campos y curvas entre sesiones; None si la carpeta no se puede usar."""
+        try:
+            return DiskCache()
+        except OSError as e:
+            print(f"Caché en disco desactivada: {e}")
+            return None
+
+    @property
+    def bounds(self):
+        """Límites actuales de la vista como tupla (x_min, x_max, y_min, y_max)."""
+        return (self.x_min, self.x_max, self.y_min, self.y_max)
+
+    def evaluate_field(self, func_callable, bounds=None, resolution=None, persist=True):
+        """
+        Devuelve la malla y el campo Z = f(X, Y) para los límites y la resolución indicados
+        (por defecto, los actuales). El campo se toma de la caché (en memoria o en disco) si ya fue
+        evaluado antes con la misma función y la misma vista. Con persist=False no se usa el disco.
+
+        Returns:
+            tuple: (x, y, Z) con x, y vectores 1D.
+        """
+        bounds = self.bounds if bounds is None else bounds
+        resolution = self.resolution if resolution is None else resolution
+        with self.profiler.stage('campo', resolucion=resolution):
+            return self.field_cache.field(func_callable, bounds, resolution, self.dtype, persist)
+
+    def contour_levels(self, func_callable, levels, bounds=None, preview=False):
+        """
+        Calcula las polilíneas de todos los niveles pedidos según el modo de contorno actual (ver
+        contouring.contour_field, la misma etapa que usa batch.py). Con preview=True se usa una
+        resolución baja para responder rápido; la continuación no tiene una versión barata, así que su vista
+        previa es la de la malla fija. Los resultados a resolución completa se guardan en la caché
+        en disco, así que una curva o animación ya vista se reabre sin volver a calcularla.
+
+        Returns:
+            SegmentStore: Polilíneas por nivel (solo los niveles que tienen curva).
+        """
+        return contour_field(func_callable, self.bounds if bounds is None else bounds, levels, self.field_cache,
+                             mode=self.contour_mode,
+                             resolution=self.preview_resolution if preview else self.resolution,
+                             dtype=self.dtype, preview=preview, adaptive_coarse=self.adaptive_coarse,
+                             adaptive_depth=self.adaptive_depth, continuation_seeds=self.continuation_seeds,
+                             gradient=self.continuation_gradient, profiler=self.profiler)
+
+    # Etapas que se muestran en la superposición de rendimiento, en este orden
+    PROFILE_STAGES = ('parseo', 'campo', 'campo en t', 'contorno', 'contorno adaptativo', 'contorno por continuación',
+                      'contorno por franjas', 'geometría', 'artistas', 'dibujo', 'frame')
+
+    def profile_summary(self):
+        """Texto de la superposición: fps, milisegundos por etapa y aciertos/fallos de la caché de campos."""
+        cache = self.field_cache
+        return (f"{self.profiler.summary(self.PROFILE_STAGES)}\n"
+                f"caché: {cache.hits} aciertos / {cache.misses} fallos")
+
+    def _add_profile_overlay(self, animated=False):
+        """Crea la superposición de rendimiento en el eje actual (ax.clear() la borra en cada dibujo)."""
+        self._profile_text = self.ax.text(0.98, 0.02, self.profile_summary(), transform=self.ax.transAxes,
+                                          horizontalalignment='right', verticalalignment='bottom',
+                                          fontsize=8, family='monospace', visible=self.show_profiling,
+                                          bbox=dict(facecolor='lightyellow', edgecolor='gray', alpha=0.85),
+                                          animated=animated, zorder=10)
+        return self._profile_text
+
+    def _record_counters(self):
+        self.profiler.counter('caché de campos', aciertos=self.field_cache.hits, fallos=self.field_cache.misses)
+
+    def set_profiling_overlay(self, visible):
+        """Muestra u oculta la superposición con fps y milisegundos por etapa."""
+        self.show_profiling = visible
+        if self._profile_text is not None and self._profile_text.axes is self.ax:
+            self._profile_text.set_text(self.profile_summary())
+            self._profile_text.set_visible(visible)
+            if not isinstance(self.animation, PipelineAnimation):
+                self.canvas.draw_idle()  # durante la animación se actualiza con el próximo frame
+
+    def dump_profile(self, path):
+        """Guarda la línea de tiempo de la sesión (Chrome trace JSON). Devuelve la cantidad de eventos."""
+        self._record_counters()
+        return self.profiler.dump_trace(path)
+
+    def set_view(self, x_min, x_max, y_min, y_max):
+        """
+        Cambia los límites de la vista y vuelve a dibujar la curva actual de forma progresiva:
+        primero una vista previa gruesa y luego la versión refinada calculada en segundo plano.
+        Si hay una animación en curso se detiene, porque sus curvas corresponden a la vista anterior.
+
+        Raises:
+            ValueError: Si algún mínimo no es menor que su máximo.
+        """
+        if not (x_min < x_max and y_min < y_max):
+            raise ValueError("Los límites mínimos deben ser menores que los máximos.")
+        self.x_min, self.x_max = float(x_min), float(x_max)
+        self.y_min, self.y_max = float(y_min), float(y_max)
+        self.stop_animation()
+        self.view_changed.emit(*self.bounds)
+
+        self._view_generation += 1
+        self._cancel_refine()
+        if self._overlay is not None:
+            batched_callable, layers = self._overlay
+            try:
+                stores = self.overlay_levels(batched_callable, layers, preview=True)
+            except Exception as e:
+                self._draw_curve(0.0, error=e, idle=True)
+                return
+            self._draw_overlay_layers(layers, stores, refining=True, idle=True)
+            self._refine_timer.start()
+            return
+        if self._view_plot is None:
+            self.ax.set_xlim(self.x_min, self.x_max)
+            self.ax.set_ylim(self.y_min, self.y_max)
+            self.canvas.draw_idle()
+            return
+        func_callable, n_value = self._view_plot
+        try:
+            store = self.contour_levels(func_callable, [n_value], preview=True)
+        except Exception as e:
+            self._draw_curve(n_value, error=e, idle=True)
+            return
+        self._draw_curve(n_value, store, refining=True, idle=True)
+        self._refine_timer.start()  # se reinicia con cada cambio: agrupa movimientos rápidos
+
+    def preview_curve(self, func_callable, n_value):
+        """
+        Vista previa en vivo: dibuja la curva f(x, y) = n_value calculándola por completo en segundo plano,
+        primero a baja resolución y después a resolución completa. Nunca evalúa en el hilo de la interfaz;
+        si llega otra curva antes de terminar, el resultado viejo se descarta.
+        """
+        self.stop_animation()
+        self._view_plot = (func_callable, n_value)
+        self._overlay = None
+        self._view_generation += 1
+        self._cancel_refine()
+        self._start_refine(preview=True)
+
+    def _start_refine(self, preview=False):
+        """
+        Lanza el cálculo a resolución completa de la vista actual (la curva o las curvas superpuestas) en un
+        QThread (con preview=True, también una vista previa gruesa antes). Si todavía hay un cálculo en curso,
+        ya cancelado, el nuevo espera a que termine: así no se acumulan hilos evaluando curvas desactualizadas.
+        """
+        if self._view_plot is None and self._overlay is None:
+            return
+        self._cancel_refine()
+        if self._refine_jobs:
+            self._refine_pending = preview or bool(self._refine_pending)
+            return
+        bounds = self.bounds
+        if self._view_plot is not None:
+            func_callable, n_value = self._view_plot
+
+            def compute(coarse=False):
+                return self.contour_levels(func_callable, [n_value], bounds=bounds, preview=coarse)
+        else:
+            batched_callable, layers = self._overlay
+
+            def compute(coarse=False):
+                return self.overlay_levels(batched_callable, layers, bounds=bounds, preview=coarse)
+        worker = RefineWorker(self._view_generation, compute,
+                              preview=(lambda: compute(coarse=True)) if preview else None)
+        thread = QThread()
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.result_ready.connect(self._on_refined)
+        worker.done.connect(thread.quit)
+        thread.finished.connect(self._on_refine_thread_finished)
+        self._refine_jobs[thread] = worker
+        thread.start()
+
+    def _cancel_refine(self):
+        """Marca como cancelados todos los refinamientos en curso y descarta el que estaba en espera."""
+        self._refine_timer.stop()
+        self._refine_pending = None
+        for worker in self._refine_jobs.values():
+            worker.stop()
+
+    def _on_refined(self, generation, store, final):
+        if generation != self._view_generation:
+            return  # resultado de una vista que ya no se muestra
+        if self._overlay is not None:
+            if isinstance(store, Exception):
+                self._draw_curve(0.0, error=store, idle=True)
+            else:
+                self._draw_overlay_layers(self._overlay[1], store, refining=not final, idle=True)
+            return
+        if self._view_plot is None:
+            return
+        _, n_value = self._view_plot
+        if isinstance(store, Exception):
+            self._draw_curve(n_value, error=store, idle=True)
+        else:
+            self._draw_curve(n_value, store, refining=not final, idle=True)
+
+    def _on_refine_thread_finished(self):
+        thread = self.sender()
+        self._refine_jobs.pop(thread, None)
+        thread.deleteLater()
+        if self._refine_pending is not None and not self._refine_jobs:
+            preview = self._refine_pending
+            self._refine_pending = None
+            self._start_refine(preview)
+
+    def shutdown(self):
+        """Detiene la animación y espera a que terminen los hilos de refinamiento (al cerrar la ventana)."""
+        self.stop_animation()
+        self._cancel_refine()
+        for thread in list(self._refine_jobs):
+            thread.quit()
+            thread.wait()
+        if self.field_cache.disk is not None:
+            self.field_cache.disk.flush()
+
+    def _on_scroll(self, event):
+        """Zoom con la rueda del mouse, centrado en la posición del cursor."""
+        if event.inaxes is not self.ax or event.xdata is None:
+            return
+        factor = 0.8 if event.button == 'up' else 1.25
+        x, y = event.xdata, event.ydata
+        self.set_view(x - (x - self.x_min) * factor, x + (self.x_max - x) * factor,
+                      y - (y - self.y_min) * factor, y + (self.y_max - y) * factor)
+
+    def _on_press(self, event):
+        if event.button == 1 and event.inaxes is self.ax:
+            self._pan_start = (event.x, event.y, self.bounds)
+
+    def _on_motion(self, event):
+        """Desplaza la vista mientras se arrastra con el botón izquierdo."""
+        if self._pan_start is None:
+            return
+        px, py, (x_min, x_max, y_min, y_max) = self._pan_start
+        bbox = self.ax.bbox
+        dx = (event.x - px) * (x_max - x_min) / bbox.width
+        dy = (event.y - py) * (y_max - y_min) / bbox.height
+        self.set_view(x_min - dx, x_max - dx, y_min - dy, y_max - dy)
+
+    def _on_release(self, event):
+        self._pan_start = None
+
     def draw_single_curve(self, func_callable, n_value):
         """
         Dibuja una única curva de nivel f(x, y) = n_value en el área de graficado.
@@ -82,33 +489,173 @@ class CurvePlotter(QWidget):
             func_callable (callable): Función matemática f(x, y) ya parseada.
             n_value (float): Valor constante de la curva de nivel.
         """
-        # Limpiar los ejes antes de dibujar una nueva curva
+        # Recordar la curva para poder redibujarla al mover o hacer zoom
+        self._view_plot = (func_callable, n_value)
+        self._overlay = None
+        self._view_generation += 1
+        self._cancel_refine()
+        with self.profiler.stage('draw_single_curve', n=n_value):
+            try:
+                # En modo malla el campo sale de la caché: cambiar solo N no vuelve a evaluar f
+                store = self.contour_levels(func_callable, [n_value])
+            except Exception as e:
+                self._draw_curve(n_value, error=e)
+                return
+            self._draw_curve(n_value, store)
+
+    def _draw_curve(self, n_value, store=None, error=None, refining=False, idle=False):
+        """
+        Limpia el eje y dibuja las polilíneas del nivel n_value (o el mensaje de error).
+        Con refining=True el título indica que se trata de una vista previa.
+        """
+        self._reset_axes()
+        if error is None:
+            self.ax.add_collection(LineCollection(store.lines(n_value), colors='blue'))
+            suffix = " (refinando...)" if refining else ""
+            if store.unresolved:
+                suffix += f" (pueden faltar ramas en {store.unresolved} zonas)"
+            self.ax.set_title(f"Curva de Nivel: N = {n_value:.2f} | X:[{self.x_min:.4g},{self.x_max:.4g}] "
+                              f"Y:[{self.y_min:.4g},{self.y_max:.4g}]{suffix}")
+        else:
+            self.ax.text(0.5, 0.5, f"Error al graficar:\n{error}",
+                         horizontalalignment='center', verticalalignment='center',
+                         transform=self.ax.transAxes, color='red', fontsize=12)
+            print(f"Error en draw_single_curve: {error}")
+        self._finish_draw(idle)
+
+    def _reset_axes(self):
+        """Limpia los ejes antes de dibujar y vuelve a poner etiquetas, grilla, límites y aspecto."""
         self.ax.clear()
-        self.ax.set_xlabel(f"X  [{self.x_min}, {self.x_max}]")
-        self.ax.set_ylabel(f"Y  [{self.y_min}, {self.y_max}]")
+        self.ax.set_xlabel(f"X  [{self.x_min:.4g}, {self.x_max:.4g}]")
+        self.ax.set_ylabel(f"Y  [{self.y_min:.4g}, {self.y_max:.4g}]")
         self.ax.grid(True, which='both', color='gray', linestyle='--', linewidth=0.7, alpha=0.5)
         self.ax.set_xlim(self.x_min, self.x_max)
         self.ax.set_ylim(self.y_min, self.y_max)
         self.ax.set_aspect('equal', adjustable='box') # Mantener aspecto igual
-        self.ax.xaxis.set_major_locator(plt.MaxNLocator(10))
-        self.ax.yaxis.set_major_locator(plt.MaxNLocator(10))
+        self.ax.xaxis.set_major_locator(MaxNLocator(10))
+        self.ax.yaxis.set_major_locator(MaxNLocator(10))
+
+    def _finish_draw(self, idle=False):
+        """Agrega la superposición de rendimiento y dibuja el canvas (o lo programa, con idle=True)."""
+        # Muestra los tiempos de esta curva; el de 'dibujo' es el del dibujo anterior
+        self._add_profile_overlay()
+        if idle:
+            self.canvas.draw_idle()
+        else:
+            with self.profiler.stage('dibujo'):
+                self.canvas.draw()
+        self.profiler.frame_done()
+        self._record_counters()
 
-        # Crear malla de puntos para graficar
-        x = np.linspace(self.x_min, self.x_max, 400)
-        y = np.linspace(self.y_min, self.y_max, 400)
-        X, Y = np.meshgrid(x, y)
+    def overlay_levels(self, batched_callable, layers, bounds=None, preview=False):
+        """
+        Calcula las curvas de varias funciones sobre una misma malla: los campos se evalúan juntos en una
+        sola pasada (ver FieldCache.fields) y cada uno se contornea con sus propios niveles. Siempre usa
+        la malla fija, también en modo adaptativo, para que todas las capas compartan la evaluación.
+        Con preview=True se usa la resolución de la vista previa.
+
+        Args:
+            batched_callable (callable): Funciones compiladas con parse_functions.
+            layers (list): (etiqueta, niveles, color) de cada función, en el mismo orden.
 
+        Returns:
+            list: Un SegmentStore por capa.
+        """
+        bounds = self.bounds if bounds is None else bounds
+        resolution = self.preview_resolution if preview else self.resolution
+        if not self.field_cache.fits(resolution, self.dtype, layers=len(layers)):
+            # Malla demasiado grande para tener todos los campos: se evalúa por franjas (todas las capas en una
+            # pasada por franja) y cada capa se contornea con sus niveles
+            level_sets = [levels for _, levels, _ in layers]
+            with self.profiler.stage('contorno por franjas', niveles=sum(len(levels) for levels in level_sets)):
+                return extract_layer_contours_tiled(batched_callable, bounds, resolution, level_sets,
+                                                    self.dtype, self.field_cache.tile_bytes,
+                                                    self.field_cache.workers)
+        with self.profiler.stage('campo', resolucion=resolution, capas=len(layers)):
+            x, y, fields = self.field_cache.fields(batched_callable, bounds, resolution, self.dtype)
+        stores = []
+        for Z, (_, levels, _) in zip(fields, layers):
+            with self.profiler.stage('contorno', niveles=len(levels)):
+                stores.append(extract_contours(x, y, Z, levels))
+        return stores
+
+    def draw_overlay(self, batched_callable, layers):
+        """
+        Dibuja varias familias de curvas de nivel superpuestas en la misma figura, cada una con su color
+        y una entrada en la leyenda. Al mover o hacer zoom se vuelven a calcular para la nueva vista.
+
+        Args:
+            batched_callable (callable): Funciones compiladas con parse_functions.
+            layers (list): (etiqueta, niveles, color) de cada función, en el mismo orden.
+        """
+        self.stop_animation()
+        self._view_plot = None
+        self._overlay = (batched_callable, layers)
+        self._view_generation += 1
+        self._cancel_refine()
         try:
-            Z = func_callable(X, Y)
-            self.ax.contour(X, Y, Z, levels=[n_value], colors='blue')
-            self.ax.set_title(f"Curva de Nivel: N = {n_value:.2f} | X:[{self.x_min},{self.x_max}] Y:[{self.y_min},{self.y_max}]")
+            stores = self.overlay_levels(batched_callable, layers)
         except Exception as e:
-            self.ax.text(0.5, 0.5, f"Error al graficar:\n{e}",
-                         horizontalalignment='center', verticalalignment='center',
-                         transform=self.ax.transAxes, color='red', fontsize=12)
-            print(f"Error en draw_single_curve: {e}")
+            self._draw_curve(0.0, error=e)
+            return
+        self._draw_overlay_layers(layers, stores)
 
-        self.canvas.draw()
+    def _draw_overlay_layers(self, layers, stores, refining=False, idle=False):
+        """
+        Limpia el eje y dibuja las capas superpuestas con su leyenda.
+        Con refining=True el título indica que se trata de una vista previa.
+        """
+        self._reset_axes()
+        for (label, levels, color), store in zip(layers, stores):
+            segments = [line for level in levels for line in store.lines(level)]
+            self.ax.add_collection(LineCollection(segments, colors=color, label=self._overlay_label(label, levels)))
+        self.ax.legend(loc='upper right', fontsize=9)
+        suffix = " (refinando...)" if refining else ""
+        self.ax.set_title(f"Curvas superpuestas | X:[{self.x_min:.4g},{self.x_max:.4g}] "
+                          f"Y:[{self.y_min:.4g},{self.y_max:.4g}]{suffix}")
+        self._finish_draw(idle)
+
+    @staticmethod
+    def _overlay_label(label, levels):
+        """Entrada de la leyenda de una capa superpuesta: la función y sus niveles."""
+        return f"{label}  (N = {', '.join(f'{level:g}' for level in levels)})"
+
+    def export_vector(self, path, levels=None, tolerance=None, fmt=None):
+        """
+        Exporta a SVG o PDF las curvas del gráfico: la curva actual o, con 'levels', la familia de esos niveles
+        de la función actual; si se muestran curvas superpuestas, todas sus capas. Se calculan con el motor de
+        contorno elegido (con 'continuation' los vértices quedan sobre la curva) y se simplifican antes de escribir.
+
+        Args:
+            path (str): Archivo de salida (.svg o .pdf).
+            levels (list): Niveles a exportar; por defecto, el N de la curva actual.
+            tolerance (float): Tolerancia de simplificación en unidades de x e y; por defecto, automática.
+            fmt (str): 'svg' o 'pdf'; por defecto se deduce de la extensión.
+
+        Returns:
+            dict: Vértices antes y después de simplificar y caminos escritos (ver export_curves).
+
+        Raises:
+            ValueError: Si no hay ninguna curva para exportar.
+        """
+        if self._overlay is not None:
+            batched_callable, overlay_layers = self._overlay
+            stores = self.overlay_levels(batched_callable, overlay_layers)
+            layers = [(self._overlay_label(label, layer_levels), [line for level in layer_levels
+                                                                  for line in store.lines(level)], color)
+                      for (label, layer_levels, color), store in zip(overlay_layers, stores)]
+            title = "Curvas superpuestas"
+        elif self._view_plot is not None:
+            func_callable, n_value = self._view_plot
+            levels = [n_value] if not levels else [float(level) for level in levels]
+            store = self.contour_levels(func_callable, levels)
+            layers = [(None, store.lines(level), 'blue') for level in levels]
+            title = f"Curvas de nivel: N = {', '.join(f'{level:g}' for level in levels)}"
+        else:
+            raise ValueError("No hay ninguna curva para exportar: grafica una función primero.")
+        with self.profiler.stage('exportación vectorial'):
+            return export_curves(path, self.bounds, layers, tolerance, fmt, title,
+                                 self.figure.get_size_inches(), self.figure.dpi)
 
     def animate_curves(self, func_callable, n_value, leave_trace, interval):
         """
@@ -122,18 +669,12 @@ class CurvePlotter(QWidget):
             leave_trace (bool): Si True, se dibujan las curvas anteriores como rastro.
             interval (int): Intervalo de tiempo entre frames en milisegundos.
         """
-        import matplotlib.animation as animation
-        self.ax.clear()
-        self.ax.set_xlabel(f"X  [{self.x_min}, {self.x_max}]")
-        self.ax.set_ylabel(f"Y  [{self.y_min}, {self.y_max}]")
-        self.ax.grid(True, which='both', color='gray', linestyle='--', linewidth=0.7, alpha=0.5)
-        self.ax.set_xlim(self.x_min, self.x_max)
-        self.ax.set_ylim(self.y_min, self.y_max)
-        self.ax.set_aspect('equal', adjustable='box')
-
-        x = np.linspace(self.x_min, self.x_max, 400)
-        y = np.linspace(self.y_min, self.y_max, 400)
-        X, Y = np.meshgrid(x, y)
+        self.stop_animation()
+        self._view_plot = (func_callable, n_value)
+        self._overlay = None
+        self._view_generation += 1
+        self._cancel_refine()
+        self._reset_axes()
 
         # Definir el ciclo de valores de N para la animación
         num_frames = 20
@@ -145,54 +686,207 @@ class CurvePlotter(QWidget):
         n_values_return = np.arange(n_min, 0 + step, step)
         n_values = np.concatenate([n_values_forward, n_values_backward, n_values_return])
 
-        # Filtrar solo los valores de N que generan curvas válidas
-        valid_n_values = []
-        seen = set()
-        for n in n_values:
-            n_rounded = round(n, 3)
-            if n_rounded in seen:
-                continue
+        candidates = sorted(set(round(float(n), 3) for n in n_values))
+        bounds = self.bounds
+
+        # El plan (ciclo de N) y la geometría de cada frame se calculan en segundo plano con un
+        # FramePipeline: la animación arranca enseguida y la interfaz solo dibuja frames ya listos.
+        def prepare():
+            # Filtrar solo los valores de N que pueden generar curvas: el campo se evalúa una sola
+            # vez y los niveles fuera de su rango se descartan.
             try:
-                Z = func_callable(X, Y)
-                cs = self.ax.contour(X, Y, Z, levels=[n])
-                if len(cs.allsegs[0]) > 0:
-                    valid_n_values.append(n_rounded)
-                    seen.add(n_rounded)
-                plt.close(cs.figure)
+                _, _, Z = self.evaluate_field(func_callable, bounds)
+                valid_n_values = prune_levels(Z, candidates)
             except Exception:
-                continue
-        valid_n_values = sorted(valid_n_values)
-        if 0 not in valid_n_values:
-            valid_n_values.append(0)
-        valid_n_values = sorted(set(valid_n_values))
-        ciclo = valid_n_values + valid_n_values[::-1][1:]
-        self.ax.clear()
+                valid_n_values = []
+            if 0 not in valid_n_values:
+                valid_n_values.append(0)
+            valid_n_values = sorted(set(valid_n_values))
+            return valid_n_values + valid_n_values[::-1][1:]
+
+        def contour_block(levels):
+            store = self.contour_levels(func_callable, levels, bounds=bounds)
+            return [store.lines(level) for level in levels]
+
+        geometry = []  # se arma en prepare(), cuando se conocen los niveles del ciclo
+
+        def plan():
+            cycle = prepare()
+            # Cada bloque de niveles consecutivos se contornea en una sola pasada (y una sola entrada en disco);
+            # los niveles se repiten a la vuelta y reutilizan la geometría ya calculada
+            geometry.append(self._chunked_geometry(sorted(set(cycle)), LEVEL_CHUNK, contour_block, 'n'))
+            return cycle
+
+        def level_geometry(level):
+            return geometry[0](level)
+
+        self._play_animation(plan, level_geometry, leave_trace, interval, bounds, "Animación Curva de Nivel")
+
+    def animate_time(self, func_callable, n_value, t_min, t_max, num_frames, leave_trace, interval):
+        """
+        Anima la curva f(x, y, t) = n_value mientras t recorre [t_min, t_max]: cambia el campo, no el nivel.
+        Los instantes se evalúan por bloques como una sola pila 3-D (ver evaluate_time_stack) y cada bloque
+        se contornea entero, en lugar de llamar a la función una vez por frame. La reproducción, el rastro
+        y la exportación son los mismos de animate_curves.
+
+        Args:
+            func_callable (callable): Función f(x, y, t) ya parseada.
+            n_value (float): Nivel de la curva.
+            t_min (float): Primer instante.
+            t_max (float): Último instante.
+            num_frames (int): Cantidad de instantes (al menos 2).
+            leave_trace (bool): Si True, se dibujan las curvas de los instantes anteriores como rastro.
+            interval (int): Intervalo de tiempo entre frames en milisegundos.
+
+        Raises:
+            ValueError: Si t_min no es menor que t_max o hay menos de 2 frames.
+        """
+        if not t_min < t_max:
+            raise ValueError("El t inicial debe ser menor que el t final.")
+        if num_frames < 2:
+            raise ValueError("La animación en t necesita al menos 2 frames.")
+        self.stop_animation()
+        self._view_plot = (func_callable, n_value)  # al mover la vista se muestra la curva en t = 0
+        self._overlay = None
+        self._view_generation += 1
+        self._cancel_refine()
+        self._reset_axes()
+
+        t_values = [float(t) for t in np.linspace(t_min, t_max, num_frames)]
+        bounds, resolution, dtype = self.bounds, self.resolution, self.dtype
+        tile_bytes, workers = self.field_cache.tile_bytes, self.field_cache.workers
+        tiled = not self.field_cache.fits(resolution, dtype)
+        # Instantes por bloque: los que entran en la memoria de trabajo, sin pasar de la ventana del pipeline
+        chunk = 1 if tiled else min(8, time_chunk_steps(resolution, resolution, dtype, tile_bytes))
+        x, y = make_grid(bounds, resolution, dtype)
+
+        def contour_chunk(times):
+            if tiled:
+                # Un solo instante que no entra entero en memoria: se evalúa y contornea por franjas
+                t = times[0]
+                with self.profiler.stage('contorno por franjas', t=t):
+                    store = extract_contours_tiled(lambda xs, ys: func_callable(xs, ys, t), bounds, resolution,
+                                                   [n_value], dtype, tile_bytes, workers)
+                return [store.lines(n_value)]
+            with self.profiler.stage('campo en t', instantes=len(times)):
+                stack = evaluate_time_stack(func_callable, x, y, times, dtype)
+            with self.profiler.stage('contorno', niveles=len(times)):
+                return [extract_contours(x, y, Z, [n_value]).lines(n_value) for Z in stack]
+
+        time_geometry = self._chunked_geometry(t_values, chunk, contour_chunk, 't')
+        self._play_animation(lambda: t_values, time_geometry, leave_trace, interval, bounds,
+                             f"Animación en t: f(x, y, t) = {n_value:.2f}", label='t')
+
+    def _chunked_geometry(self, keys, chunk, compute_block, name):
+        """
+        Geometría por frame calculada por bloques de 'chunk' claves consecutivas. Los hilos del pipeline piden
+        frames del mismo bloque a la vez: el primero calcula el bloque entero y los demás lo esperan.
+
+        Args:
+            keys (list): Claves de los frames (niveles o instantes), sin repetir, en el orden del ciclo.
+            compute_block (callable): compute_block(claves) -> polilíneas de cada clave.
+            name (str): Nombre de la clave en la etapa 'geometría' del perfil.
+
+        Returns:
+            callable: geometry(clave) -> polilíneas del frame, o None si su bloque falló.
+        """
+        position = {key: i for i, key in enumerate(keys)}
+        block_lines = {}  # índice de bloque -> polilíneas de cada clave
+        block_locks = defaultdict(threading.Lock)
+        locks_guard = threading.Lock()
+
+        def geometry(key):
+            index = position[key] // chunk
+            with locks_guard:
+                lock = block_locks[index]
+            with lock:
+                if index not in block_lines:
+                    block = keys[index * chunk:(index + 1) * chunk]
+                    with self.profiler.stage('geometría', **{name: key}):
+                        try:
+                            block_lines[index] = compute_block(block)
+                        except Exception:
+                            block_lines[index] = [None] * len(block)
+            return block_lines[index][position[key] - index * chunk]
+
+        return geometry
+
+    def _play_animation(self, prepare, frame_geometry, leave_trace, interval, bounds, title, label='N'):
+        """
+        Reproduce una animación cuyos frames calcula un FramePipeline en segundo plano. La comparten
+        animate_curves (un nivel N por frame) y animate_time (un instante t por frame).
+
+        Args:
+            prepare (callable): prepare() -> lista con la clave de cada frame.
+            frame_geometry (callable): frame_geometry(clave) -> polilíneas del frame, o None si falló.
+            title (str): Título del gráfico; la exportación usa el mismo.
+            label (str): Parámetro que recorre la animación, para la etiqueta ('N' o 't').
+        """
+        self.ax.set_title(title)
+        # El plan y la geometría de cada frame se calculan en segundo plano: la animación
+        # arranca enseguida y la interfaz solo dibuja frames ya listos.
+        pipeline = FramePipeline(prepare, frame_geometry)
+
+        def frame_source():
+            """Entrega el siguiente frame solo cuando su geometría está lista; mientras tanto, None."""
+            frame = 0
+            while True:
+                ciclo = pipeline.plan(wait=False)
+                if ciclo is not None and frame >= len(ciclo):
+                    return
+                if ciclo is not None and pipeline.ready(frame):
+                    yield frame
+                    frame += 1
+                else:
+                    yield None
+
+        # Artistas persistentes: en cada frame solo se cambian sus datos. La curva actual y la etiqueta se
+        # marcan como 'animated' para que FuncAnimation las redibuje con blitting sobre el fondo guardado
+        # (ejes, grilla, título y rastro), sin volver a dibujar toda la figura.
+        frame_artists = LevelAnimationArtists(self.ax, frame_geometry, leave_trace, animated=True, label=label)
+        # La superposición de rendimiento también es animada para refrescarse en cada frame
+        profile_text = self._add_profile_overlay(animated=True)
+        artists = frame_artists.artists + (profile_text,)
 
         def update(frame):
             """
             Función interna que actualiza el gráfico en cada frame de la animación.
-            Dibuja la curva actual y, si corresponde, el rastro de las anteriores.
+            Cambia los segmentos de la curva actual y, si corresponde, agrega al rastro
+            solo el nivel del frame anterior (que PipelineAnimation pasa al fondo del blitting);
+            el costo por frame no crece con el número de frames.
+            Con frame None (geometría todavía no lista) se mantiene el frame anterior.
             """
-            if frame >= len(ciclo):
-                return
-            self.ax.clear()
-            n_actual = ciclo[frame]
+            if frame is None:
+                return artists
             try:
-                Z = func_callable(X, Y)
-                if leave_trace:
-                    levels_rastro = sorted(set(ciclo[:frame]))
-                    if levels_rastro:
-                        self.ax.contour(X, Y, Z, levels=levels_rastro, colors='blue', alpha=0.3, linewidths=1)
-                    self.ax.contour(X, Y, Z, levels=[n_actual], colors='blue', alpha=1.0, linewidths=2)
-                    self.ax.set_title(f"Animación Curva de Nivel: N = {n_actual:.2f}")
-                else:
-                    self.ax.contour(X, Y, Z, levels=[n_actual], colors='blue', alpha=1.0, linewidths=2)
-                    self.ax.set_title(f"Animación Curva de Nivel: N = {n_actual:.2f}")
-            except Exception:
-                self.ax.text(0.5, 0.5, f"No existe curva para N = {n_actual:.2f}",
-                             horizontalalignment='center', verticalalignment='center',
-                             transform=self.ax.transAxes, color='red', fontsize=12)
-            self.canvas.draw()
+                ciclo = pipeline.plan()
+                if frame >= len(ciclo):
+                    return artists
+                lines = pipeline.frame(frame)
+            except PipelineCancelled:
+                return artists
+            with self.profiler.stage('artistas', frame=frame):
+                frame_artists.update(ciclo, frame, lines)
+            profile_text.set_visible(self.show_profiling)
+            if self.show_profiling:
+                profile_text.set_text(self.profile_summary())
+                self._record_counters()
+            return artists
 
-        self.animation = animation.FuncAnimation(self.figure, update, frames=len(ciclo), interval=interval, repeat=False)
-        self.canvas.draw()
\ No newline at end of file
+        # El intervalo es el ritmo real: cada tick solo copia geometría ya calculada al canvas
+        # init_func evita que el dibujo inicial consuma el primer frame del pipeline
+        self.animation = PipelineAnimation(self.figure, update, pipeline, profiler=self.profiler,
+                                           level_artists=frame_artists, frames=frame_source,
+                                           init_func=lambda: artists, interval=interval, repeat=False, blit=True)
+        # Datos para exportar reutilizando la geometría ya calculada para la reproducción
+        self.animation.export_spec = AnimationSpec(bounds, pipeline.plan, frame_geometry, leave_trace, interval,
+                                                   self.figure.get_size_inches(), self.figure.dpi, label, title)
+        self.canvas.draw()
+
+    def animation_spec(self):
+        """
+        Devuelve la AnimationSpec de la animación actual para exportarla, o None si no hay animación.
+        """
+        if isinstance(self.animation, PipelineAnimation):
+            return self.animation.export_spec
+        return None
@@ -0,0 +1,134 @@
+"""
+Medición de tiempos por etapa (parseo, evaluación del campo, contorno, dibujo) sin un profiler externo.
+Cada etapa se mide con perf_counter y queda en una línea de tiempo que se puede guardar en formato
+Chrome trace (JSON), para abrirla en chrome://tracing o en https://ui.perfetto.dev.
+No depende de PyQt5 ni de Matplotlib.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class StageProfiler:
+    """
+    Registra la duración de cada etapa, los frames por segundo y contadores (por ejemplo, aciertos de caché).
+    Es seguro usarlo desde varios hilos: las etapas calculadas en el pool de la animación aparecen en la
+    línea de tiempo con su propio hilo.
+
+    Args:
+        max_events (int): Eventos guardados para la línea de tiempo; al superarlos se descartan los más viejos.
+        fps_window (float): Segundos de historia usados para calcular los fps.
+    """
+
+    def __init__(self, max_events=200000, fps_window=2.0):
+        self.enabled = True
+        self.fps_window = fps_window
+        self.last = {}  # etapa -> milisegundos de su última ejecución
+        self._events = deque(maxlen=max_events)
+        self._frames = deque()
+        self._threads = {}  # id de hilo -> nombre
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+
+    def _timestamp(self, instant):
+        """Microsegundos desde la creación del profiler (unidad de Chrome trace)."""
+        return (instant - self._origin) * 1e6
+
+    @contextmanager
+    def stage(self, name, **details):
+        """
+        Mide el bloque como la etapa 'name'. Los argumentos extra se guardan en el evento de la línea de tiempo.
+
+        Ejemplo:
+            with profiler.stage('contorno', niveles=3):
+                store = extract_contours(x, y, Z, levels)
+        """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            thread = threading.current_thread()
+            event = {'name': name, 'ph': 'X', 'pid': self._pid, 'tid': thread.ident,
+                     'ts': self._timestamp(start), 'dur': (end - start) * 1e6}
+            if details:
+                event['args'] = details
+            with self._lock:
+                self.last[name] = (end - start) * 1000.0
+                self._events.append(event)
+                self._threads.setdefault(thread.ident, thread.name)
+
+    def counter(self, name, **values):
+        """Guarda el valor actual de uno o más contadores (aparecen como gráfico en la línea de tiempo)."""
+        if not self.enabled:
+            return
+        event = {'name': name, 'ph': 'C', 'pid': self._pid, 'ts': self._timestamp(time.perf_counter()),
+                 'args': values}
+        with self._lock:
+            self._events.append(event)
+
+    def frame_done(self):
+        """Marca que se terminó de mostrar un frame (una curva o un paso de la animación)."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        with self._lock:
+            self._frames.append(now)
+            while self._frames and now - self._frames[0] > self.fps_window:
+                self._frames.popleft()
+
+    @property
+    def fps(self):
+        """Frames por segundo en la ventana reciente (0 si hay menos de dos frames)."""
+        with self._lock:
+            if len(self._frames) < 2 or self._frames[-1] == self._frames[0]:
+                return 0.0
+            return (len(self._frames) - 1) / (self._frames[-1] - self._frames[0])
+
+    def summary(self, stages=None):
+        """
+        Texto con los fps y los milisegundos de la última ejecución de cada etapa.
+
+        Args:
+            stages (list): Etapas a mostrar, en ese orden; por defecto todas las registradas.
+        """
+        with self._lock:
+            last = dict(self.last)
+        names = stages if stages is not None else sorted(last)
+        names = [name for name in names if name in last]
+        width = max([len(name) for name in names] + [3]) + 1
+        lines = [f"{'fps:':<{width}} {self.fps:7.1f}"]
+        lines += [f"{name + ':':<{width}} {last[name]:7.1f} ms" for name in names]
+        return "\n".join(lines)
+
+    def reset(self):
+        """Borra la línea de tiempo, los fps y los últimos tiempos."""
+        with self._lock:
+            self.last.clear()
+            self._events.clear()
+            self._frames.clear()
+            self._origin = time.perf_counter()
+
+    def dump_trace(self, path):
+        """
+        Guarda la línea de tiempo de la sesión en formato Chrome trace (JSON).
+
+        Returns:
+            int: Cantidad de eventos guardados.
+        """
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+        metadata = [{'name': 'thread_name', 'ph': 'M', 'pid': self._pid, 'tid': tid, 'args': {'name': name}}
+                    for tid, name in threads.items()]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': metadata + events, 'displayTimeUnit': 'ms'}, f)
+        return len(events)
@@ -0,0 +1,137 @@
+"""
+Dibujo de curvas de nivel sobre ejes de Matplotlib, compartido por la interfaz, la exportación y el modo por lotes.
+Solo usa objetos de Matplotlib (sin pyplot ni PyQt5), así que sirve tanto para el canvas de Qt como para figuras Agg.
+"""
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+
+
+def setup_axes(ax, bounds):
+    """Configura etiquetas, grilla, límites y aspecto de los ejes para los límites dados."""
+    x_min, x_max, y_min, y_max = bounds
+    ax.set_xlabel(f"X  [{x_min:.4g}, {x_max:.4g}]")
+    ax.set_ylabel(f"Y  [{y_min:.4g}, {y_max:.4g}]")
+    ax.grid(True, which='both', color='gray', linestyle='--', linewidth=0.7, alpha=0.5)
+    ax.set_xlim(x_min, x_max)
+    ax.set_ylim(y_min, y_max)
+    ax.set_aspect('equal', adjustable='box')
+
+
+def new_figure(bounds, figsize=None, dpi=None):
+    """
+    Crea una figura con canvas Agg (sin ventana) y un único eje ya configurado.
+
+    Returns:
+        tuple: (figura, eje)
+    """
+    figure = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot(111)
+    setup_axes(ax, bounds)
+    return figure, ax
+
+
+class LevelAnimationArtists:
+    """
+    Artistas de una animación de niveles: la curva actual, el rastro de las anteriores y la etiqueta con N
+    (o con t, en las animaciones del campo en el tiempo).
+    La curva actual y la etiqueta se crean una vez y en cada frame solo cambian sus datos. El rastro no es
+    animado: cada nivel se agrega una sola vez como una colección propia que queda en el fondo del blitting
+    (ver take_new_trace), así el costo por frame no depende del largo del rastro.
+
+    Args:
+        ax: Eje de Matplotlib donde dibujar.
+        geometry (callable): geometry(nivel) -> lista de polilíneas (k, 2), o None si el nivel falló.
+        leave_trace (bool): Si True, se dibujan las curvas anteriores como rastro.
+        animated (bool): Marca la curva actual y la etiqueta como animadas (para blitting).
+        label (str): Nombre del parámetro que recorre la animación ('N' o 't'), para la etiqueta.
+    """
+
+    def __init__(self, ax, geometry, leave_trace, animated=False, label='N'):
+        self.ax = ax
+        self.geometry = geometry
+        self.leave_trace = leave_trace
+        self.label = label
+        # zorder entre el rastro (2) y la etiqueta (3): la curva actual queda sobre el rastro también al dibujar
+        # la figura completa, aunque las colecciones del rastro se agreguen después
+        self.current_collection = LineCollection([], colors='blue', alpha=1.0, linewidths=2, animated=animated,
+                                                 zorder=2.5)
+        self.n_label = ax.text(0.02, 0.97, "", transform=ax.transAxes,
+                               horizontalalignment='left', verticalalignment='top', fontsize=11,
+                               bbox=dict(facecolor='white', edgecolor='none', alpha=0.8), animated=animated)
+        ax.add_collection(self.current_collection, autolim=False)
+        self.artists = (self.current_collection, self.n_label)
+        # Estado del rastro: último frame dibujado, niveles ya agregados y una colección por nivel (o por
+        # reconstrucción); las colecciones nuevas esperan en _new_trace a pasar al fondo
+        self._frame = -1
+        self._trace_levels = set()
+        self._trace_collections = []
+        self._new_trace = []
+        self._trace_rebuilt = False
+
+    def _trace_collection(self, segments):
+        collection = LineCollection(segments, colors='blue', alpha=0.3, linewidths=1)
+        self.ax.add_collection(collection, autolim=False)
+        self._trace_collections.append(collection)
+        self._new_trace.append(collection)
+
+    def _add_to_trace(self, level):
+        if level in self._trace_levels:
+            return
+        self._trace_levels.add(level)
+        segments = self.geometry(level)
+        if segments:
+            self._trace_collection(segments)
+
+    def _rebuild_trace(self, levels):
+        for collection in self._trace_collections:
+            collection.remove()
+        self._trace_collections = []
+        self._new_trace = []
+        self._trace_rebuilt = True
+        self._trace_levels = set(levels)
+        segments = [line for level in self._trace_levels for line in (self.geometry(level) or [])]
+        if segments:
+            self._trace_collection(segments)
+
+    def take_new_trace(self):
+        """
+        Devuelve lo que cambió en el rastro desde la llamada anterior, para actualizar el fondo del blitting.
+
+        Returns:
+            tuple: (reconstruido, colecciones nuevas). Si reconstruido es True hay que volver a dibujar el fondo
+            completo; si no, basta con dibujar las colecciones nuevas sobre el fondo guardado.
+        """
+        changes = (self._trace_rebuilt, self._new_trace)
+        self._trace_rebuilt = False
+        self._new_trace = []
+        return changes
+
+    def update(self, plan, frame, lines):
+        """
+        Dibuja el frame 'frame' del ciclo 'plan' con las polilíneas 'lines' del nivel (o instante) actual.
+
+        Returns:
+            tuple: Los artistas animados (curva actual y etiqueta).
+        """
+        n_actual = plan[frame]
+        if lines is None:
+            self.current_collection.set_segments([])
+            self.n_label.set_text(f"No existe curva para {self.label} = {n_actual:.2f}")
+            self.n_label.set_color('red')
+            return self.artists
+
+        if self.leave_trace:
+            if frame != self._frame + 1:
+                # Salto en la secuencia (reinicio o exportación): se reconstruye el rastro
+                self._rebuild_trace(plan[:frame])
+            elif frame > 0:
+                self._add_to_trace(plan[frame - 1])
+        self._frame = frame
+
+        self.current_collection.set_segments(lines)
+        self.n_label.set_text(f"{self.label} = {n_actual:.2f}")
+        self.n_label.set_color('black')
+        return self.artists
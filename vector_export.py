@@ -0,0 +1,199 @@
+"""
+Exportación vectorial (SVG o PDF) de una curva de nivel o de una familia de niveles.
+Las polilíneas del contorno tienen un vértice por cada celda que cruzan, así que un SVG directo de una malla
+de 400² pesa megas. Antes de escribir, las polilíneas que se tocan por los extremos se unen en caminos
+continuos y cada camino se simplifica con Douglas-Peucker a la tolerancia pedida; cada nivel se escribe
+como un único camino compuesto. No depende de PyQt5.
+"""
+
+import os
+
+import matplotlib
+import numpy as np
+from matplotlib.patches import PathPatch
+from matplotlib.path import Path
+
+from rendering import new_figure
+
+# Formato -> extensión del archivo
+FORMATS = {'svg': '.svg', 'pdf': '.pdf'}
+# Tolerancia por defecto: esta fracción del lado mayor de la vista (medio píxel en una figura de ~1000 px)
+DEFAULT_TOLERANCE_FRACTION = 1 / 2000
+
+
+def format_from_path(path):
+    """Deduce el formato vectorial a partir de la extensión del archivo."""
+    extension = os.path.splitext(path)[1].lower()
+    for fmt, fmt_extension in FORMATS.items():
+        if extension == fmt_extension:
+            return fmt
+    raise ValueError(f"Extensión no soportada: '{extension}'. Usa .svg o .pdf.")
+
+
+def default_tolerance(bounds):
+    """Tolerancia de simplificación por defecto para la vista dada, en unidades de x e y."""
+    x_min, x_max, y_min, y_max = bounds
+    return max(x_max - x_min, y_max - y_min) * DEFAULT_TOLERANCE_FRACTION
+
+
+def simplify_polyline(points, tolerance):
+    """
+    Simplifica una polilínea con Douglas-Peucker: se conservan los extremos y, recursivamente, el vértice
+    más alejado de la cuerda mientras esa distancia supere la tolerancia. Ningún punto de la polilínea
+    original queda a más de 'tolerance' de la simplificada. Las polilíneas cerradas siguen cerradas.
+
+    Args:
+        points (np.ndarray): Vértices (k, 2).
+        tolerance (float): Distancia máxima permitida, en unidades de x e y.
+
+    Returns:
+        np.ndarray: Los vértices conservados, en el mismo orden.
+    """
+    points = np.asarray(points, dtype=float)
+    if len(points) < 3 or tolerance <= 0:
+        return points
+    if np.array_equal(points[0], points[-1]):
+        # Curva cerrada: los extremos coinciden y la cuerda no sirve de referencia. Se corta en el
+        # vértice más lejano al inicio y se simplifica cada mitad.
+        far = int(np.argmax(np.hypot(points[:, 0] - points[0, 0], points[:, 1] - points[0, 1])))
+        if far == 0:
+            return points[:1]
+        first = simplify_polyline(points[:far + 1], tolerance)
+        second = simplify_polyline(points[far:], tolerance)
+        return np.concatenate([first, second[1:]])
+
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    pending = [(0, len(points) - 1)]
+    while pending:
+        a, b = pending.pop()
+        if b - a < 2:
+            continue
+        inner = points[a + 1:b] - points[a]
+        chord = points[b] - points[a]
+        length = np.hypot(*chord)
+        if length == 0:
+            distance = np.hypot(inner[:, 0], inner[:, 1])
+        else:
+            distance = np.abs(chord[0] * inner[:, 1] - chord[1] * inner[:, 0]) / length
+        i = int(np.argmax(distance))
+        if distance[i] > tolerance:
+            k = a + 1 + i
+            keep[k] = True
+            pending.append((a, k))
+            pending.append((k, b))
+    return points[keep]
+
+
+def merge_polylines(lines, tolerance=0.0):
+    """
+    Une en caminos continuos las polilíneas cuyos extremos coinciden (a menos de 'tolerance', o exactamente
+    con tolerance=0), como las que se cortan en los bordes de las franjas o las del contorno adaptativo.
+    Un camino que vuelve a su punto de partida se cierra exactamente.
+
+    Returns:
+        list: Polilíneas (k, 2) unidas.
+    """
+    lines = [np.asarray(line, dtype=float) for line in lines if len(line) >= 2]
+    if tolerance > 0:
+        def key(point):
+            return (round(point[0] / tolerance), round(point[1] / tolerance))
+    else:
+        def key(point):
+            return (float(point[0]), float(point[1]))
+
+    ends = {}
+    for index, line in enumerate(lines):
+        ends.setdefault(key(line[0]), []).append(index)
+        ends.setdefault(key(line[-1]), []).append(index)
+    used = [False] * len(lines)
+
+    def walk(point):
+        """Polilíneas que siguen desde 'point', orientadas para continuar el camino."""
+        following = []
+        while True:
+            candidates = [i for i in ends.get(key(point), ()) if not used[i]]
+            if not candidates:
+                return following
+            i = candidates[0]
+            used[i] = True
+            line = lines[i] if key(lines[i][0]) == key(point) else lines[i][::-1]
+            following.append(line[1:])
+            point = line[-1]
+
+    merged = []
+    for index, line in enumerate(lines):
+        if used[index]:
+            continue
+        used[index] = True
+        if key(line[0]) == key(line[-1]):
+            merged.append(line)
+            continue
+        forward = walk(line[-1])
+        backward = walk(line[0])
+        parts = [part[::-1] for part in backward[::-1]] + [line] + forward
+        path = np.concatenate(parts)
+        if len(path) > 2 and key(path[0]) == key(path[-1]):
+            path[-1] = path[0]
+        merged.append(path)
+    return merged
+
+
+def compound_path(lines):
+    """Un único Path de Matplotlib con todas las polilíneas; las cerradas terminan con CLOSEPOLY."""
+    vertices = []
+    codes = []
+    for line in lines:
+        line_codes = np.full(len(line), Path.LINETO, dtype=Path.code_type)
+        line_codes[0] = Path.MOVETO
+        if len(line) > 2 and np.array_equal(line[0], line[-1]):
+            line_codes[-1] = Path.CLOSEPOLY
+        vertices.append(line)
+        codes.append(line_codes)
+    if not vertices:
+        return None
+    return Path(np.concatenate(vertices), np.concatenate(codes))
+
+
+def export_curves(path, bounds, layers, tolerance=None, fmt=None, title=None, figsize=None, dpi=None):
+    """
+    Exporta curvas de nivel a SVG o PDF. Cada capa (un nivel, o las curvas de una función) se une,
+    se simplifica y se escribe como un solo camino.
+
+    Args:
+        path (str): Archivo de salida.
+        bounds (tuple): (x_min, x_max, y_min, y_max).
+        layers (list): (etiqueta o None, polilíneas (k, 2), color) de cada capa. Las etiquetas van a la leyenda.
+        tolerance (float): Tolerancia de Douglas-Peucker en unidades de x e y; por defecto default_tolerance(bounds).
+            Con 0 no se simplifica.
+        fmt (str): 'svg' o 'pdf'; por defecto se deduce de la extensión.
+        title (str): Título de la figura.
+
+    Returns:
+        dict: Vértices antes ('vertices_in') y después ('vertices_out') y caminos escritos ('paths').
+    """
+    fmt = fmt or format_from_path(path)
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato vectorial desconocido: {fmt}")
+    tolerance = default_tolerance(bounds) if tolerance is None else tolerance
+    stats = {'vertices_in': 0, 'vertices_out': 0, 'paths': 0}
+    # Texto como texto (no como curvas) para que el SVG sea liviano y editable
+    with matplotlib.rc_context({'svg.fonttype': 'none'}):
+        figure, ax = new_figure(bounds, figsize, dpi)
+        if title:
+            ax.set_title(title)
+        labelled = False
+        for label, lines, color in layers:
+            stats['vertices_in'] += sum(len(line) for line in lines)
+            simplified = [simplify_polyline(line, tolerance) for line in merge_polylines(lines, tolerance / 10)]
+            compound = compound_path([line for line in simplified if len(line) >= 2])
+            if compound is None:
+                continue
+            stats['vertices_out'] += len(compound.vertices)
+            stats['paths'] += 1
+            ax.add_patch(PathPatch(compound, fill=False, edgecolor=color, linewidth=1, label=label))
+            labelled = labelled or label is not None
+        if labelled:
+            ax.legend(loc='upper right', fontsize=9)
+        figure.savefig(path, format=fmt)
+    return stats